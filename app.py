@@ -10,14 +10,29 @@ import os
 # Disable Flask's automatic dotenv loading to prevent Unicode errors
 os.environ['FLASK_SKIP_DOTENV'] = '1'
 
-from flask import Flask, render_template, request, jsonify, send_file, redirect, url_for
+from flask import Flask, Response, render_template, request, jsonify, send_file, redirect, stream_with_context, url_for
 from urllib.parse import unquote
+from werkzeug.exceptions import RequestedRangeNotSatisfiable
 from werkzeug.utils import secure_filename
+import io
 import json
+import stat
+import time
+from functools import lru_cache
+from card_deadline import CARD_DEADLINE_SECONDS, Deadline
+from card_encoders import encoder_stats, negotiate_format, transcode_card, variant_filename
+from card_index import card_index, parse_timestamp
+from card_jobs import FINAL_STAGES, JobQueueFull, job_runner, job_store
+from card_output import recent_cards
+from card_storage import CARD_PRESIGN_EXPIRES, card_store, content_digest, photo_store
+from card_uploads import UploadRejected
+from card_styles import CUSTOM_TYPES
+from card_variants import VARIANT_WIDTHS, ensure_variant, prune_stale_variants, srcset_widths
+from llm_cache import CACHE_BYPASS, CACHE_REROLL, CACHE_USE, llm_cache
 
 # Try to import make_card module, but don't fail if it's not available
 try:
-    from make_card import generate_card_web
+    from make_card import generate_card_from_photo, generate_card_web, save_uploaded_image
     CARD_GENERATION_AVAILABLE = True
     print("Card generation module loaded successfully")
 except ImportError as e:
@@ -26,6 +41,21 @@ except ImportError as e:
     # Create a dummy function for when card generation is not available
     def generate_card_web(uploaded_file, traits, custom_descriptor=None):
         return {'success': False, 'error': 'Card generation not available - API keys not configured'}
+
+# Resolve card fonts once at startup so the chosen faces are logged and shown on /debug.
+# Cards are drawn in the render pool's processes, which are spawned fresh and load fonts and
+# card chrome themselves (batch_render.init_render_worker); the chrome is only worth rendering
+# here when this process draws cards itself (RENDER_POOL_WORKERS=0)
+if CARD_GENERATION_AVAILABLE:
+    from card_fonts import font_registry, preload_fonts
+    from card_graphics import preload_card_chrome
+    from llm_clients import llm_clients
+    from llm_dispatch import llm_dispatcher
+    from render_pool import render_pool
+    preload_fonts()
+    if not render_pool.max_workers:
+        preload_card_chrome()
+
 # Load API keys from environment variables (required for Render deployment)
 OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY')
 GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
@@ -49,6 +79,25 @@ if not OPENAI_API_KEY or not GEMINI_API_KEY:
     print("WARNING: API keys not found. Set OPENAI_API_KEY and GEMINI_API_KEY environment variables.")
     print("For Render deployment, add these as environment variables in your Render service settings.")
 
+# Drop thumbnails made for an older card style so they are regenerated
+removed_variants = prune_stale_variants()
+if removed_variants:
+    print(f"Removed {removed_variants} card variants from an older style version")
+
+# Move cards and photos saved flat by older versions into the content stores
+for store in (card_store, photo_store):
+    imported = store.import_legacy()
+    if imported:
+        print(f"Moved {imported} files into the content store in {store.root}")
+
+# Pick up cards stored by other instances sharing the storage backend
+synced_names = card_store.sync_names()
+if synced_names:
+    print(f"Found {synced_names} cards stored by other instances")
+
+# Index any cards generated before the gallery index existed
+card_index.ensure_built()
+
 app = Flask(__name__)
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 
@@ -66,6 +115,23 @@ def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def cache_mode_from_form(form):
+    """
+    Read the optional LLM cache flags of a /generate request.
+
+    Args:
+        form: Request form data; 'no_cache' leaves the cache alone and 'reroll' asks
+            the LLM for new card text even when the traits were seen before
+
+    Returns:
+        str: CACHE_BYPASS, CACHE_REROLL or CACHE_USE
+    """
+    if form.get('no_cache', '').lower() in ('1', 'true', 'yes', 'on'):
+        return CACHE_BYPASS
+    if form.get('reroll', '').lower() in ('1', 'true', 'yes', 'on'):
+        return CACHE_REROLL
+    return CACHE_USE
+
 @app.route('/')
 def index():
     """Main page with upload form."""
@@ -85,7 +151,16 @@ def health_check():
         'api_keys_configured': bool(OPENAI_API_KEY and GEMINI_API_KEY),
         'card_generation_available': CARD_GENERATION_AVAILABLE,
         'environment': os.environ.get('FLASK_ENV', 'development'),
-        'port': os.environ.get('PORT', '5000')
+        'port': os.environ.get('PORT', '5000'),
+        'render_pool': render_pool.stats() if CARD_GENERATION_AVAILABLE else None,
+        'llm_clients': llm_clients.stats() if CARD_GENERATION_AVAILABLE else None,
+        'llm_providers': llm_dispatcher.breaker_states() if CARD_GENERATION_AVAILABLE else None,
+        'llm_dispatch': llm_dispatcher.stats() if CARD_GENERATION_AVAILABLE else None,
+        'llm_cache': llm_cache.stats(),
+        'jobs': job_runner.stats(),
+        'recent_cards': recent_cards.stats(),
+        'encoders': encoder_stats(),
+        'storage_backend': card_store.backend.name
     }), 200
 
 @app.route('/test')
@@ -108,7 +183,8 @@ def debug_endpoint():
         'gemini_key_length': len(GEMINI_API_KEY) if GEMINI_API_KEY else 0,
         'card_generation_available': CARD_GENERATION_AVAILABLE,
         'environment': os.environ.get('FLASK_ENV', 'development'),
-        'all_env_vars': {k: v for k, v in os.environ.items() if 'API' in k or 'KEY' in k}
+        'all_env_vars': {k: v for k, v in os.environ.items() if 'API' in k or 'KEY' in k},
+        'fonts': font_registry.report() if CARD_GENERATION_AVAILABLE else {}
     }), 200
 
 @app.route('/test-api')
@@ -141,7 +217,14 @@ def test_api():
 
 @app.route('/generate', methods=['POST'])
 def generate_card():
-    """Handle card generation from uploaded image and traits."""
+    """
+    Validate an uploaded image and traits, and start generating a card.
+    
+    Generation runs as a background job; the response is 202 with a job id
+    to poll at /jobs/<job_id>. The card's time budget (CARD_DEADLINE_SECONDS)
+    starts now, so time spent waiting in the job queue counts against it.
+    """
+    deadline = Deadline(CARD_DEADLINE_SECONDS)
     print("\n" + "="*50)
     print("CARD GENERATION REQUEST RECEIVED")
     print("="*50)
@@ -186,6 +269,9 @@ def generate_card():
         if not custom_descriptor:
             custom_descriptor = None
         
+        cache_mode = cache_mode_from_form(request.form)
+        print(f"LLM cache mode: {cache_mode}")
+        
         print("Starting card generation...")
         
         # Check if card generation is available
@@ -193,23 +279,34 @@ def generate_card():
             print("ERROR: Card generation not available - API keys not configured")
             return jsonify({'success': False, 'error': 'Card generation not available. Please check API key configuration.'})
         
-        # Generate the card with both API keys
-        result = generate_card_web(image_file, traits, custom_descriptor, GEMINI_API_KEY, OPENAI_API_KEY)
+        if not GEMINI_API_KEY and not OPENAI_API_KEY:
+            print("ERROR: No API keys available")
+            return jsonify({'success': False, 'error': 'No API keys configured. Please check your environment variables.'})
+        
+        # Validate and save the photo now, before any LLM call; the upload is gone once this request ends
+        try:
+            image_path = save_uploaded_image(image_file, image_file.filename)
+        except UploadRejected as e:
+            print(f"ERROR: Upload rejected: {e}")
+            return jsonify({'success': False, 'error': str(e)})
+        print(f"Image saved to: {image_path}")
         
-        print(f"Card generation result: {result['success']}")
-        if result['success']:
-            print(f"Generated filename: {result['filename']}")
-            print(f"Character name: {result['character_name']}")
-            return jsonify({
-                'success': True,
-                'card_data': result['card_data'],
-                'filename': result['filename'],
-                'character_name': result['character_name'],
-                'descriptor': result['descriptor']
-            })
-        else:
-            print(f"Card generation failed: {result['error']}")
-            return jsonify({'success': False, 'error': result['error']})
+        # Generate the card with both API keys in a background job
+        try:
+            job_id = job_runner.submit(generate_card_from_photo, image_path, traits, GEMINI_API_KEY, OPENAI_API_KEY,
+                                       deadline, cache_mode, events=[('upload_saved', {'photo': secure_filename(image_file.filename)})])
+        except JobQueueFull as e:
+            print(f"ERROR: {e}")
+            response = jsonify({'success': False, 'error': str(e)})
+            response.headers['Retry-After'] = '10'
+            return response, 503
+        
+        print(f"Card generation queued as job {job_id}")
+        status_url = url_for('job_status', job_id=job_id)
+        response = jsonify({'success': True, 'job_id': job_id, 'stage': 'queued', 'status_url': status_url,
+                            'events_url': url_for('job_events', job_id=job_id)})
+        response.headers['Location'] = status_url
+        return response, 202
             
     except Exception as e:
         print(f"EXCEPTION in generate_card: {str(e)}")
@@ -222,31 +319,189 @@ def generate_card():
         print("REQUEST PROCESSING COMPLETE")
         print("="*50)
 
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """
+    Report a generation job's stage: queued, llm, render, done or failed.
+    
+    Finished jobs include the card ('result', the same fields /generate used
+    to return) or the 'error'.
+    """
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    response = jsonify(job)
+    response.cache_control.no_store = True
+    return response
+
+@app.route('/jobs/<job_id>/result')
+def job_result(job_id):
+    """Get a finished job's result, or 202 with its stage while it is still running."""
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    if job['stage'] == 'done':
+        return jsonify(job['result'])
+    if job['stage'] == 'failed':
+        return jsonify({'success': False, 'error': job['error']})
+    response = jsonify({'job_id': job_id, 'stage': job['stage']})
+    response.cache_control.no_store = True
+    return response, 202
+
+# How often an event stream checks for events from other processes, and sends a keep-alive comment
+JOB_EVENTS_POLL_SECONDS = 0.5
+JOB_EVENTS_KEEPALIVE_SECONDS = 15
+
+def format_job_event(event):
+    """Format a job event as a Server-Sent Event, adding the card URL once the image is ready."""
+    data = dict(event['data'])
+    if event['event'] == 'image_ready':
+        data['url'] = url_for('view_card', filename=data['filename'])
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    """
+    Stream a generation job's progress as Server-Sent Events.
+    
+    Events: upload_saved, queued, llm, llm_attempt, llm_fallback, card_data,
+    render, image_ready, then done (with the result) or failed (with the
+    error), after which the stream ends. Reconnecting clients resume after
+    their Last-Event-ID.
+    """
+    if job_store.get(job_id) is None:
+        return jsonify({'error': 'Job not found'}), 404
+    last_event_id = request.headers.get('Last-Event-ID', '0')
+    after = int(last_event_id) if last_event_id.isdigit() else 0
+    
+    def stream():
+        nonlocal after
+        yield "retry: 2000\n\n"
+        last_sent = time.monotonic()
+        while True:
+            for event in job_store.events(job_id, after):
+                after = event['id']
+                last_sent = time.monotonic()
+                yield format_job_event(event)
+                if event['event'] in FINAL_STAGES:
+                    return
+            job = job_store.get(job_id)
+            if job is None or job['stage'] in FINAL_STAGES:
+                if job and job_store.events(job_id, after):
+                    continue  # The final event was added after the read above
+                # Lost with the process that ran it, or deleted
+                error = job['error'] if job else 'Job not found'
+                yield f"event: failed\ndata: {json.dumps({'error': error})}\n\n"
+                return
+            if time.monotonic() - last_sent >= JOB_EVENTS_KEEPALIVE_SECONDS:
+                last_sent = time.monotonic()
+                yield ": keep-alive\n\n"
+            job_store.wait(JOB_EVENTS_POLL_SECONDS)
+    
+    response = Response(stream_with_context(stream()), mimetype='text/event-stream')
+    response.cache_control.no_store = True
+    # Stop proxies such as nginx from buffering the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+# Generated cards never change once written, so browsers may keep them for a year
+CARD_MAX_AGE = 31536000
+
+# Redirect stored cards to presigned storage URLs (S3 backend) instead of streaming them through the app
+CARD_PRESIGNED_REDIRECTS = os.environ.get('CARD_PRESIGNED_REDIRECTS', '').lower() in ('1', 'true', 'yes')
+
+def content_etag(data):
+    """Strong ETag from the content hash of an encoded card (the card store's digest)."""
+    return content_digest(data)
+
+@lru_cache(maxsize=4096)
+def _file_etag(path, mtime_ns, size):
+    with open(path, 'rb') as card_file:
+        return content_etag(card_file.read())
+
+def file_etag(path):
+    """Content-hash ETag of a stored card, hashed once per file version; None if missing."""
+    try:
+        file_stat = os.stat(path)
+    except OSError:
+        return None
+    if not stat.S_ISREG(file_stat.st_mode):
+        return None
+    return _file_etag(path, file_stat.st_mtime_ns, file_stat.st_size)
+
+def make_immutable(response, vary_accept=False):
+    """Mark a card response as cacheable forever."""
+    response.cache_control.public = True
+    response.cache_control.max_age = CARD_MAX_AGE
+    response.cache_control.immutable = True
+    if response.status_code == 200:
+        response.headers['Accept-Ranges'] = 'bytes'
+    if vary_accept:
+        response.vary.add('Accept')
+    return response
+
+def card_bytes_response(data, mimetype, download_name, as_attachment=False, vary_accept=False):
+    """Serve an in-memory card with ETag, conditional GET and Range support."""
+    response = app.response_class(data, mimetype=mimetype)
+    response.headers.set('Content-Disposition', 'attachment' if as_attachment else 'inline',
+                         filename=download_name)
+    response.set_etag(content_etag(data))
+    make_immutable(response, vary_accept)
+    try:
+        return response.make_conditional(request, accept_ranges=True, complete_length=len(data))
+    except RequestedRangeNotSatisfiable as e:
+        # Answer 416 here; the routes' catch-all handlers would turn it into a 500
+        return e.get_response()
+
+def card_file_response(path, etag, download_name, as_attachment=False, vary_accept=False):
+    """Serve a stored card file with ETag, conditional GET and Range support."""
+    try:
+        response = send_file(path, as_attachment=as_attachment, download_name=download_name,
+                             etag=etag, conditional=True, max_age=CARD_MAX_AGE)
+    except RequestedRangeNotSatisfiable as e:
+        return e.get_response()
+    return make_immutable(response, vary_accept)
+
+def card_not_found():
+    """Cheap 404 for a missing card."""
+    return jsonify({'error': 'File not found'}), 404
+
+def presigned_card_redirect(filename, as_attachment=False, vary_accept=False):
+    """Redirect to a presigned storage URL for a card, or None if the backend cannot presign."""
+    url = card_store.presigned_url(filename, as_attachment)
+    if not url:
+        return None
+    response = redirect(url, 302)
+    # Browsers may reuse the redirect while the presigned URL is still valid
+    response.cache_control.private = True
+    response.cache_control.max_age = CARD_PRESIGN_EXPIRES // 2
+    if vary_accept:
+        response.vary.add('Accept')
+    return response
+
+def stored_card_response(filename, as_attachment=False, vary_accept=False):
+    """Serve a card as stored, by presigned redirect, from the recent-card cache or from the card store."""
+    if CARD_PRESIGNED_REDIRECTS:
+        response = presigned_card_redirect(filename, as_attachment, vary_accept)
+        if response:
+            return response
+    
+    card = recent_cards.get(filename)
+    if card:
+        return card_bytes_response(card.data, card.mime_type, filename, as_attachment, vary_accept)
+    
+    stored = card_store.lookup(filename)
+    path = stored and card_store.local_path(filename)
+    if not path:
+        return card_not_found()
+    return card_file_response(path, stored.digest or file_etag(path), filename, as_attachment, vary_accept)
+
 @app.route('/download/<path:filename>')
 def download_card(filename):
     """Download a generated card."""
     try:
-        print(f"[DOWNLOAD_CARD] Requested filename: {filename}")
-        
-        # Decode URL-encoded filename if needed
-        filename = unquote(filename)
-        print(f"[DOWNLOAD_CARD] After URL decode: {filename}")
-        
-        # Ensure filename is safe
-        filename = secure_filename(filename)
-        print(f"[DOWNLOAD_CARD] After secure_filename: {filename}")
-        
-        file_path = os.path.join('Generated_Cards', filename)
-        print(f"[DOWNLOAD_CARD] Looking for file at: {file_path}")
-        
-        if os.path.exists(file_path):
-            return send_file(file_path, as_attachment=True)
-        else:
-            # List files in directory to help debug
-            if os.path.exists('Generated_Cards'):
-                files = os.listdir('Generated_Cards')
-                print(f"[DOWNLOAD_CARD] Files in Generated_Cards: {files}")
-            return jsonify({'error': 'File not found'}), 404
+        filename = secure_filename(unquote(filename))
+        return stored_card_response(filename, as_attachment=True)
             
     except Exception as e:
         print(f"[DOWNLOAD_CARD] Exception: {str(e)}")
@@ -254,338 +509,113 @@ def download_card(filename):
         traceback.print_exc()
         return jsonify({'error': f'Download failed: {str(e)}'}), 500
 
+GALLERY_PAGE_SIZE = 24
+
+def card_page_from_args(args):
+    """
+    Query one page of the card index from request arguments.
+    
+    Supports sort (newest, oldest, stat1, stat2), limit, cursor,
+    custom_type and since/until (Unix time or ISO date).
+    
+    Raises:
+        ValueError: If an argument is invalid
+    """
+    return card_index.page(
+        sort=args.get('sort', 'newest'),
+        limit=args.get('limit', GALLERY_PAGE_SIZE, type=int),
+        cursor=args.get('cursor') or None,
+        custom_type=args.get('custom_type') or None,
+        since=parse_timestamp(args.get('since')),
+        until=parse_timestamp(args.get('until'))
+    )
+
+@app.route('/api/cards')
+def api_cards():
+    """Cursor-paginated JSON list of generated cards."""
+    try:
+        cards, next_cursor = card_page_from_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    payload = json.dumps({'cards': cards, 'next_cursor': next_cursor}, separators=(',', ':'))
+    return app.response_class(payload, mimetype='application/json')
+
 @app.route('/gallery')
 def gallery():
-    """Show gallery of previously generated cards."""
+    """Show gallery of previously generated cards, one page at a time."""
     try:
-        generated_cards = []
-        generated_dir = 'Generated_Cards'
+        try:
+            cards, next_cursor = card_page_from_args(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        if os.path.exists(generated_dir):
-            for filename in os.listdir(generated_dir):
-                if filename.lower().endswith(('.png', '.jpg', '.jpeg')):
-                    file_path = os.path.join(generated_dir, filename)
-                    file_size = os.path.getsize(file_path)
-                    generated_cards.append({
-                        'filename': filename,
-                        'size': file_size,
-                        'url': url_for('download_card', filename=filename)
-                    })
+        for card in cards:
+            card['thumbnail'] = url_for('view_card_variant', variant='thumb', filename=card['filename'])
+            card['srcset'] = srcset_widths(card['filename'], lambda variant, name: url_for('view_card_variant', variant=variant, filename=name))
         
-        # Sort by filename
-        generated_cards.sort(key=lambda x: x['filename'])
-        
-        # Create HTML for gallery
-        html_content = """
-        <!DOCTYPE html>
-        <html lang="en">
-        <head>
-            <meta charset="UTF-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            <title>Card Gallery - Personalised Card Generator</title>
-            <link href="https://fonts.googleapis.com/css2?family=Orbitron:wght@400;700;900&family=Roboto:wght@300;400;500;700&display=swap" rel="stylesheet">
-            <style>
-                * {
-                    margin: 0;
-                    padding: 0;
-                    box-sizing: border-box;
-                }
-
-                body {
-                    font-family: 'Roboto', sans-serif;
-                    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                    min-height: 100vh;
-                    color: #333;
-                    line-height: 1.6;
-                }
-
-                .gallery-container {
-                    max-width: 1200px;
-                    margin: 0 auto;
-                    padding: 20px;
-                }
-                
-                .gallery-header {
-                    text-align: center;
-                    margin-bottom: 40px;
-                    padding: 30px 0;
-                }
-                
-                .gallery-title {
-                    font-family: 'Orbitron', monospace;
-                    font-size: 2.5rem;
-                    font-weight: 900;
-                    color: #fff;
-                    text-shadow: 2px 2px 4px rgba(0,0,0,0.3);
-                    margin-bottom: 10px;
-                    display: flex;
-                    align-items: center;
-                    justify-content: center;
-                    gap: 15px;
-                }
-                
-                .title-icon {
-                    font-size: 2rem;
-                    animation: pulse 2s infinite;
-                }
-
-                @keyframes pulse {
-                    0%, 100% { transform: scale(1); }
-                    50% { transform: scale(1.1); }
-                }
-                
-                .gallery-subtitle {
-                    font-size: 1.2rem;
-                    color: #e8e8e8;
-                    font-weight: 300;
-                }
-                
-                .gallery-content {
-                    background: rgba(255, 255, 255, 0.95);
-                    border-radius: 20px;
-                    padding: 40px;
-                    box-shadow: 0 20px 40px rgba(0,0,0,0.1);
-                    backdrop-filter: blur(10px);
-                }
-                
-                .cards-grid {
-                    display: grid;
-                    grid-template-columns: repeat(auto-fill, minmax(300px, 1fr));
-                    gap: 30px;
-                    margin-bottom: 40px;
-                }
-                
-                .card-item {
-                    background: white;
-                    border-radius: 15px;
-                    padding: 20px;
-                    box-shadow: 0 10px 25px rgba(0,0,0,0.1);
-                    transition: all 0.3s ease;
-                    text-align: center;
-                }
-                
-                .card-item:hover {
-                    transform: translateY(-5px);
-                    box-shadow: 0 15px 35px rgba(0,0,0,0.15);
-                }
-                
-                .card-thumbnail {
-                    width: 100%;
-                    max-width: 250px;
-                    height: auto;
-                    border-radius: 10px;
-                    margin-bottom: 15px;
-                    border: 3px solid #667eea;
-                }
-                
-                .card-filename {
-                    font-weight: 600;
-                    color: #4a5568;
-                    margin-bottom: 10px;
-                    word-break: break-word;
-                }
-                
-                .card-size {
-                    color: #718096;
-                    font-size: 0.9rem;
-                    margin-bottom: 15px;
-                }
-                
-                .card-actions {
-                    display: flex;
-                    gap: 10px;
-                    justify-content: center;
-                }
-                
-                .btn-small {
-                    padding: 8px 16px;
-                    border: none;
-                    border-radius: 20px;
-                    font-size: 0.9rem;
-                    font-weight: 500;
-                    cursor: pointer;
-                    transition: all 0.3s ease;
-                    text-decoration: none;
-                    display: inline-flex;
-                    align-items: center;
-                    gap: 5px;
-                }
-                
-                .btn-view {
-                    background: linear-gradient(145deg, #667eea, #764ba2);
-                    color: white;
-                }
-                
-                .btn-download {
-                    background: linear-gradient(145deg, #38b2ac, #319795);
-                    color: white;
-                }
-                
-                .btn-small:hover {
-                    transform: translateY(-2px);
-                    box-shadow: 0 5px 15px rgba(0,0,0,0.2);
-                }
-                
-                .empty-gallery {
-                    text-align: center;
-                    padding: 60px 20px;
-                    color: #718096;
-                }
-                
-                .empty-gallery h3 {
-                    font-family: 'Orbitron', monospace;
-                    color: #4a5568;
-                    margin-bottom: 15px;
-                }
-                
-                .back-to-generator {
-                    text-align: center;
-                    margin-top: 30px;
-                }
-                
-                .back-btn {
-                    background: linear-gradient(145deg, #ed8936, #dd6b20);
-                    color: white;
-                    padding: 15px 30px;
-                    border: none;
-                    border-radius: 25px;
-                    font-size: 1rem;
-                    font-weight: 600;
-                    cursor: pointer;
-                    transition: all 0.3s ease;
-                    text-decoration: none;
-                    display: inline-flex;
-                    align-items: center;
-                    gap: 8px;
-                }
-                
-                .back-btn:hover {
-                    transform: translateY(-2px);
-                    box-shadow: 0 8px 20px rgba(237, 137, 54, 0.4);
-                }
-
-                .back-link {
-                    display: inline-block;
-                    margin-bottom: 20px;
-                    color: #e8e8e8;
-                    text-decoration: none;
-                    font-weight: 500;
-                    transition: color 0.3s ease;
-                }
-
-                .back-link:hover {
-                    color: #fff;
-                    text-shadow: 0 0 5px rgba(255,255,255,0.5);
-                }
-
-                @media (max-width: 768px) {
-                    .gallery-container {
-                        padding: 10px;
-                    }
-                    
-                    .gallery-title {
-                        font-size: 2rem;
-                        flex-direction: column;
-                        gap: 10px;
-                    }
-                    
-                    .gallery-content {
-                        padding: 20px;
-                    }
-                    
-                    .cards-grid {
-                        grid-template-columns: 1fr;
-                        gap: 20px;
-                    }
-                }
-            </style>
-        </head>
-        <body>
-            <div class="gallery-container">
-                <header class="gallery-header">
-                    <h1 class="gallery-title">
-                        <span class="title-icon">🎴</span>
-                        Card Gallery
-                        <span class="title-icon">🎴</span>
-                    </h1>
-                    <p class="gallery-subtitle">Browse your collection of generated character cards</p>
-                </header>
-
-                <main class="gallery-content">
-                    <a href="/" class="back-link">← Back to Generator</a>
-        """
-        
-        if generated_cards:
-            html_content += '<div class="cards-grid">'
-            for card in generated_cards:
-                html_content += f'''
-                    <div class="card-item">
-                        <img src="/card/{card["filename"]}" alt="Generated Card" class="card-thumbnail">
-                        <div class="card-filename">{card["filename"]}</div>
-                        <div class="card-size">{card["size"] / 1024:.1f} KB</div>
-                        <div class="card-actions">
-                            <a href="/card/{card["filename"]}" class="btn-small btn-view" target="_blank">
-                                👁️ View
-                            </a>
-                            <a href="/download/{card["filename"]}" class="btn-small btn-download">
-                                ⬇️ Download
-                            </a>
-                        </div>
-                    </div>
-                '''
-            html_content += '</div>'
-        else:
-            html_content += '''
-                <div class="empty-gallery">
-                    <h3>No Cards Generated Yet</h3>
-                    <p>Your gallery is empty. Start creating amazing character cards!</p>
-                </div>
-            '''
-        
-        html_content += '''
-                <div class="back-to-generator">
-                    <a href="/" class="back-btn">
-                        <span class="btn-icon">✨</span>
-                        Create New Card
-                    </a>
-                </div>
-            </main>
-        </div>
-    </body>
-    </html>
-        '''
-        
-        return html_content
+        # Filters are passed on to /api/cards when further pages are loaded
+        filters = {key: request.args[key] for key in ('sort', 'custom_type', 'since', 'until') if request.args.get(key)}
+        return render_template('gallery.html', cards=cards, next_cursor=next_cursor, filters=filters,
+                               custom_types=CUSTOM_TYPES, variant_widths=VARIANT_WIDTHS)
         
     except Exception as e:
         return jsonify({'error': f'Gallery failed to load: {str(e)}'}), 500
 
+def load_card_bytes(filename):
+    """Get a stored card's bytes from the recent-card cache or the card store."""
+    card = recent_cards.get(filename)
+    if card:
+        return card.data
+    return card_store.read(filename)
+
 @app.route('/card/<path:filename>')
 def view_card(filename):
-    """View a generated card without downloading."""
+    """
+    View a generated card without downloading.
+    
+    The format is chosen from the Accept header (AVIF, then WebP, then PNG),
+    or explicitly with ?format=webp|avif|png|jpeg. ?preset=fast|balanced|small
+    and ?quality=1-100 tune the encoder.
+    """
     try:
-        print(f"[VIEW_CARD] Requested filename: {filename}")
+        filename = secure_filename(unquote(filename))
         
-        # Decode URL-encoded filename if needed
-        filename = unquote(filename)
-        print(f"[VIEW_CARD] After URL decode: {filename}")
+        requested_format = request.args.get('format')
+        preset = request.args.get('preset')
+        quality = request.args.get('quality', type=int)
+        try:
+            fmt = negotiate_format(request.accept_mimetypes, requested_format)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        vary_accept = not requested_format
         
-        # Secure the filename
-        filename = secure_filename(filename)
-        print(f"[VIEW_CARD] After secure_filename: {filename}")
+        variant_name = variant_filename(filename, fmt, preset, quality)
+        if variant_name == filename:
+            # Stored card is already in the chosen format
+            return stored_card_response(filename, vary_accept=vary_accept)
         
-        file_path = os.path.join('Generated_Cards', filename)
-        print(f"[VIEW_CARD] Looking for file at: {file_path}")
-        print(f"[VIEW_CARD] File exists: {os.path.exists(file_path)}")
+        if not preset and quality is None:
+            # Default encoder settings: the stored full-size variant
+            try:
+                path = ensure_variant(filename, 'full', fmt, load_card_bytes)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            if path is None:
+                return card_not_found()
+            return card_file_response(path, file_etag(path), variant_name, vary_accept=vary_accept)
         
-        if os.path.exists(file_path):
-            return send_file(file_path)
-        else:
-            # List files in directory to help debug
-            if os.path.exists('Generated_Cards'):
-                files = os.listdir('Generated_Cards')
-                print(f"[VIEW_CARD] Files in Generated_Cards: {files}")
-            return jsonify({'error': 'File not found'}), 404
+        card = recent_cards.get(variant_name)
+        if not card:
+            data = load_card_bytes(filename)
+            if data is None:
+                return card_not_found()
+            try:
+                card = transcode_card(data, filename, fmt, preset, quality)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            recent_cards.save(card)
+            print(f"[VIEW_CARD] Encoded {card.filename}: {card.size / 1024:.1f} KB in {card.encode_seconds * 1000:.0f} ms")
+        return card_bytes_response(card.data, card.mime_type, card.filename, vary_accept=vary_accept)
             
     except Exception as e:
         print(f"[VIEW_CARD] Exception: {str(e)}")
@@ -593,6 +623,36 @@ def view_card(filename):
         traceback.print_exc()
         return jsonify({'error': f'View failed: {str(e)}'}), 500
 
+@app.route('/variant/<variant>/<path:filename>')
+def view_card_variant(variant, filename):
+    """
+    View a resized variant of a generated card ('thumb', 'medium' or 'full').
+    
+    Variants are created on first request and stored under
+    Generated_Cards/variants/. The format is negotiated like /card.
+    """
+    try:
+        filename = secure_filename(unquote(filename))
+        if variant not in VARIANT_WIDTHS:
+            return card_not_found()
+        
+        requested_format = request.args.get('format')
+        try:
+            fmt = negotiate_format(request.accept_mimetypes, requested_format)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        path = ensure_variant(filename, variant, fmt, load_card_bytes)
+        if path is None:
+            return card_not_found()
+        return card_file_response(path, file_etag(path), os.path.basename(path), vary_accept=not requested_format)
+        
+    except Exception as e:
+        print(f"[VIEW_CARD_VARIANT] Exception: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': f'View failed: {str(e)}'}), 500
+
 if __name__ == '__main__':
     # Ensure directories exist
     os.makedirs('Original_Photos', exist_ok=True)
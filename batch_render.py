@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Batch Card Renderer
+
+Renders many cards from stored card data across a pool of worker
+processes. Each worker loads fonts and card chrome once, and results are
+streamed back in completion order with per-job errors.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Any, Dict, Iterable, Iterator, NamedTuple, Optional, Set, Tuple, Union
+
+from card_fonts import preload_fonts
+from card_graphics import preload_card_chrome, render_card
+from card_output import DiskSink, RenderedCard
+from card_storage import StoreSink, card_store, content_digest
+
+# Jobs kept in flight per worker, so huge job lists are not queued all at once
+JOBS_IN_FLIGHT_PER_WORKER = 4
+
+
+class RenderJob(NamedTuple):
+    """A single card to render."""
+    photo: str
+    card_data: Dict[str, Any]
+    output: Optional[str] = None
+
+
+class RenderResult(NamedTuple):
+    """Outcome of one render job."""
+    index: int
+    job: RenderJob
+    output_path: Optional[str]
+    error: Optional[str]
+    seconds: float
+    card: Optional[RenderedCard] = None
+
+    @property
+    def success(self) -> bool:
+        """True if the card was rendered and saved."""
+        return self.error is None
+
+
+def init_render_worker() -> None:
+    """Load fonts and every card chrome once when a worker process starts."""
+    preload_fonts(log=False)
+    preload_card_chrome()
+
+
+def render_job(index: int, job: RenderJob, output_dir: Optional[str] = None,
+               return_card: bool = False, save: bool = True) -> RenderResult:
+    """
+    Render one job and save it, capturing any error instead of raising.
+
+    Jobs with an explicit output path are written to that file; other jobs go
+    to output_dir if given, under their default name plus a short content
+    hash, or else into the card store.
+
+    Args:
+        index (int): Position of the job in the submitted batch
+        job (RenderJob): Job to render
+        output_dir (str, optional): Directory for jobs without an explicit output path
+        return_card (bool): Include the encoded card in the result
+        save (bool): Save the card; when False the caller stores the returned card
+
+    Returns:
+        RenderResult: Output path or error for the job
+    """
+    start = time.perf_counter()
+    try:
+        card = render_card(job.photo, job.card_data, os.path.basename(job.output) if job.output else None)
+        if not save:
+            output_path = None
+        elif job.output:
+            output_path = DiskSink(os.path.dirname(job.output)).save(card)
+        elif output_dir:
+            # Default names only change once a second; the hash keeps same-name cards apart
+            stem, ext = os.path.splitext(card.filename)
+            card = card._replace(filename=f"{stem}_{content_digest(card.data)[:8]}{ext}")
+            output_path = DiskSink(output_dir).save(card)
+        else:
+            output_path = StoreSink(card_store).save(card)
+        return RenderResult(index, job, output_path, None, time.perf_counter() - start,
+                            card if return_card else None)
+    except Exception as e:
+        return RenderResult(index, job, None, f"{type(e).__name__}: {e}", time.perf_counter() - start)
+
+
+def render_batch(jobs: Iterable[Union[RenderJob, Tuple]], max_workers: Optional[int] = None,
+                 output_dir: Optional[str] = None) -> Iterator[RenderResult]:
+    """
+    Render jobs across a process pool, yielding results as they complete.
+
+    Jobs are consumed lazily, keeping only a few per worker in flight.
+
+    Args:
+        jobs: Iterable of RenderJob or (photo, card_data[, output]) tuples
+        max_workers (int, optional): Worker processes, defaults to the CPU count
+        output_dir (str, optional): Directory for jobs without an explicit output path,
+            defaults to the card store
+
+    Yields:
+        RenderResult: One result per job, in completion order
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    max_in_flight = max_workers * JOBS_IN_FLIGHT_PER_WORKER
+    job_iter = enumerate(RenderJob(*job) for job in jobs)
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=init_render_worker) as executor:
+        pending: Set[Future] = set()
+
+        def fill() -> None:
+            for index, job in job_iter:
+                pending.add(executor.submit(render_job, index, job, output_dir))
+                if len(pending) >= max_in_flight:
+                    break
+
+        fill()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.discard(future)
+                yield future.result()
+            fill()
+
+
+def load_jobs(path: str) -> Iterator[RenderJob]:
+    """
+    Read render jobs from a JSON Lines file.
+
+    Each line holds {"photo": ..., "card_data": {...}, "output": optional path}.
+
+    Args:
+        path (str): Path to the jobs file
+
+    Yields:
+        RenderJob: Parsed jobs
+    """
+    with open(path, encoding='utf-8') as jobs_file:
+        for line in jobs_file:
+            if line.strip():
+                entry = json.loads(line)
+                yield RenderJob(entry['photo'], entry['card_data'], entry.get('output'))
+
+
+def main():
+    """Render a JSON Lines file of stored card data from the command line."""
+    parser = argparse.ArgumentParser(description="Render many cards in parallel from stored card data")
+    parser.add_argument("jobs_file", help="JSON Lines file with one {photo, card_data, output} job per line")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--output-dir", default=None,
+                        help="Directory for jobs without an output path (default: the card store)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    succeeded = failed = 0
+    for result in render_batch(load_jobs(args.jobs_file), args.workers, args.output_dir):
+        if result.success:
+            succeeded += 1
+            print(f"[SUCCESS] Job {result.index}: {result.output_path} ({result.seconds:.2f}s)")
+        else:
+            failed += 1
+            print(f"[ERROR] Job {result.index} ({result.job.photo}): {result.error}")
+
+    elapsed = time.perf_counter() - start
+    print(f"Rendered {succeeded} cards, {failed} failed, in {elapsed:.1f}s")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Card Deadline Module
+
+An end-to-end time budget for generating one card. The web app creates a
+Deadline when /generate receives the upload and passes it down through the
+job, the LLM calls and the render, so each stage gets what is left of the
+budget instead of its own fixed timeout, and a card that cannot finish in
+time fails fast with a clear error instead of holding a worker.
+"""
+
+import os
+import time
+from typing import Optional
+
+# Total time for one card, from upload to stored image
+CARD_DEADLINE_SECONDS = float(os.environ.get('CARD_DEADLINE_SECONDS', 60))
+# Part of the budget kept back for rendering while the LLM calls run
+CARD_RENDER_RESERVE_SECONDS = float(os.environ.get('CARD_RENDER_RESERVE_SECONDS', 10))
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a card's time budget runs out; the message is safe to show to users."""
+
+
+class Deadline:
+    """
+    A point in time by which a card must be finished.
+
+    Uses the monotonic clock, so it is only meaningful within one process.
+    """
+
+    def __init__(self, seconds: float, expires_at: Optional[float] = None):
+        """
+        Start a deadline.
+
+        Args:
+            seconds (float): Time budget from now
+            expires_at (float, optional): Monotonic time it expires at, overriding seconds
+        """
+        self.seconds = seconds
+        self.expires_at = expires_at if expires_at is not None else time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        """
+        Get the time left.
+
+        Returns:
+            float: Seconds until the deadline, never negative
+        """
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        """Whether the deadline has passed."""
+        return time.monotonic() >= self.expires_at
+
+    def check(self, stage: str) -> None:
+        """
+        Fail fast if the deadline has passed.
+
+        Args:
+            stage (str): What was about to happen, for the error message, e.g. 'writing the card text'
+
+        Raises:
+            DeadlineExceeded: If no time is left
+        """
+        if self.expired:
+            raise DeadlineExceeded(f"Card generation ran out of time before {stage}, please try again")
+
+    def timeout(self, stage: str, cap: Optional[float] = None) -> float:
+        """
+        Get a timeout for one stage or call: the time left, at most cap.
+
+        Args:
+            stage (str): What the timeout is for, for the error message
+            cap (float, optional): Longest timeout the stage should get
+
+        Returns:
+            float: Seconds, greater than zero
+
+        Raises:
+            DeadlineExceeded: If no time is left
+        """
+        self.check(stage)
+        remaining = self.remaining()
+        return min(cap, remaining) if cap is not None else remaining
+
+    def reserve(self, seconds: float) -> 'Deadline':
+        """
+        Get a deadline for an earlier stage that leaves time for later ones.
+
+        At most half of the time left is reserved, so the earlier stage
+        still gets a share when the budget is nearly spent.
+
+        Args:
+            seconds (float): Time to keep back for later stages
+
+        Returns:
+            Deadline: Deadline that expires up to that much earlier
+        """
+        held_back = min(seconds, self.remaining() / 2)
+        return Deadline(self.seconds, self.expires_at - held_back)
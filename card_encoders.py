@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Card Encoders Module
+
+This module encodes rendered cards as PNG, WebP, AVIF or JPEG with named
+quality/effort presets, picks a format for a request's Accept header and
+measures encode time and size per format so a default can be chosen from
+data.
+"""
+
+import argparse
+import io
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+from PIL import Image, features
+from card_output import RenderedCard
+
+# AVIF needs a Pillow build with libavif or the pillow-avif-plugin package
+try:
+    import pillow_avif  # noqa: F401  (registers the AVIF plugin)
+except ImportError:
+    pass
+
+# Save options per format and preset
+ENCODER_PRESETS = {
+    'png': {
+        'fast': {'compress_level': 1},
+        'balanced': {'compress_level': 6},
+        'small': {'optimize': True},
+    },
+    'webp': {
+        'fast': {'quality': 80, 'method': 2},
+        'balanced': {'quality': 85, 'method': 4},
+        'small': {'quality': 75, 'method': 6},
+    },
+    'avif': {
+        'fast': {'quality': 60, 'speed': 8},
+        'balanced': {'quality': 60, 'speed': 6},
+        'small': {'quality': 50, 'speed': 4},
+    },
+    'jpeg': {
+        'fast': {'quality': 85},
+        'balanced': {'quality': 85, 'optimize': True, 'progressive': True},
+        'small': {'quality': 75, 'optimize': True, 'progressive': True},
+    },
+}
+
+PIL_FORMATS = {'png': 'PNG', 'webp': 'WEBP', 'avif': 'AVIF', 'jpeg': 'JPEG'}
+FILE_EXTENSIONS = {'png': 'png', 'webp': 'webp', 'avif': 'avif', 'jpeg': 'jpg'}
+MIME_TYPES = {'png': 'image/png', 'webp': 'image/webp', 'avif': 'image/avif', 'jpeg': 'image/jpeg'}
+
+# Formats that take a quality setting
+LOSSY_FORMATS = ('webp', 'avif', 'jpeg')
+
+# Formats offered to browsers by Accept negotiation, most preferred first.
+# JPEG is only served when asked for explicitly, since PNG is always acceptable.
+NEGOTIATED_FORMATS = ('avif', 'webp', 'png')
+
+DEFAULT_PRESET = os.environ.get('CARD_ENCODER_PRESET', 'balanced')
+
+
+def _format_supported(fmt: str) -> bool:
+    """Check whether this Pillow build can write a format."""
+    if fmt == 'webp':
+        return features.check('webp')
+    Image.init()
+    return PIL_FORMATS[fmt] in Image.SAVE
+
+
+SUPPORTED_FORMATS = tuple(fmt for fmt in ENCODER_PRESETS if _format_supported(fmt))
+
+
+def normalize_format(fmt: str) -> str:
+    """
+    Map a format name or file extension to an encoder name.
+
+    Args:
+        fmt (str): Format such as 'WEBP', 'jpg' or 'image/avif'
+
+    Returns:
+        str: Encoder name ('png', 'webp', 'avif' or 'jpeg')
+
+    Raises:
+        ValueError: If the format is unknown or unsupported by this Pillow build
+    """
+    name = fmt.lower().split('/')[-1].lstrip('.')
+    name = 'jpeg' if name == 'jpg' else name
+    if name not in ENCODER_PRESETS:
+        raise ValueError(f"Unknown image format: {fmt}")
+    if name not in SUPPORTED_FORMATS:
+        raise ValueError(f"Image format not supported by this Pillow build: {fmt}")
+    return name
+
+
+def encode_image(image: Image.Image, fmt: str = 'png', preset: Optional[str] = None,
+                 quality: Optional[int] = None) -> bytes:
+    """
+    Encode an image with a format preset.
+
+    Args:
+        image: PIL Image object
+        fmt (str): Output format
+        preset (str, optional): 'fast', 'balanced' or 'small', defaults to CARD_ENCODER_PRESET
+        quality (int, optional): Quality override (1-100) for lossy formats
+
+    Returns:
+        bytes: Encoded image
+
+    Raises:
+        ValueError: If the format or preset is unknown
+    """
+    fmt = normalize_format(fmt)
+    preset = preset or DEFAULT_PRESET
+    if preset not in ENCODER_PRESETS[fmt]:
+        raise ValueError(f"Unknown encoder preset: {preset}")
+    options = dict(ENCODER_PRESETS[fmt][preset])
+    if quality is not None and fmt in LOSSY_FORMATS:
+        options['quality'] = max(1, min(100, int(quality)))
+
+    if fmt == 'jpeg' and image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    buffer = io.BytesIO()
+    image.save(buffer, PIL_FORMATS[fmt], **options)
+    return buffer.getvalue()
+
+
+# Encode counters per format, for choosing a default from production data
+_stats_lock = threading.Lock()
+_encoder_stats: Dict[str, Dict[str, float]] = {}
+
+
+def _record_encode(fmt: str, nbytes: int, seconds: float) -> None:
+    """Add one encode to the per-format counters."""
+    with _stats_lock:
+        stats = _encoder_stats.setdefault(fmt, {'count': 0, 'bytes': 0, 'seconds': 0.0})
+        stats['count'] += 1
+        stats['bytes'] += nbytes
+        stats['seconds'] += seconds
+
+
+def encoder_stats() -> Dict[str, Dict[str, float]]:
+    """
+    Report encodes done by this process, per format.
+
+    Returns:
+        dict: Format to count, average size in bytes and average encode time in ms
+    """
+    with _stats_lock:
+        return {fmt: {'count': stats['count'],
+                      'avg_bytes': round(stats['bytes'] / stats['count']),
+                      'avg_ms': round(stats['seconds'] * 1000 / stats['count'], 1)}
+                for fmt, stats in _encoder_stats.items()}
+
+
+def variant_filename(filename: str, fmt: str, preset: Optional[str] = None,
+                     quality: Optional[int] = None) -> str:
+    """
+    Name an encoded variant of a card.
+
+    Args:
+        filename (str): Card file name, e.g. 'Sir_Lags_A_Lot_1760000000.png'
+        fmt (str): Encoder name
+        preset (str, optional): Non-default preset
+        quality (int, optional): Quality override
+
+    Returns:
+        str: File name such as 'Sir_Lags_A_Lot_1760000000.webp' or '..._small_q70.webp'
+    """
+    stem = os.path.splitext(filename)[0]
+    if preset and preset != DEFAULT_PRESET:
+        stem += f"_{preset}"
+    if quality is not None and fmt in LOSSY_FORMATS:
+        stem += f"_q{quality}"
+    return f"{stem}.{FILE_EXTENSIONS[fmt]}"
+
+
+def encode_card(image: Image.Image, filename: str, fmt: str = 'png', preset: Optional[str] = None,
+                quality: Optional[int] = None) -> RenderedCard:
+    """
+    Encode a rendered card, timing the encode.
+
+    Args:
+        image: Rendered card image
+        filename (str): Card file name; its extension is replaced to match the format
+        fmt (str): Output format
+        preset (str, optional): Encoder preset, defaults to CARD_ENCODER_PRESET
+        quality (int, optional): Quality override for lossy formats
+
+    Returns:
+        RenderedCard: Encoded card with its encode time
+    """
+    fmt = normalize_format(fmt)
+    start = time.perf_counter()
+    data = encode_image(image, fmt, preset, quality)
+    seconds = time.perf_counter() - start
+    _record_encode(fmt, len(data), seconds)
+    return RenderedCard(variant_filename(filename, fmt, preset, quality), data, PIL_FORMATS[fmt],
+                        image.width, image.height, seconds)
+
+
+def transcode_card(data: bytes, filename: str, fmt: str, preset: Optional[str] = None,
+                   quality: Optional[int] = None) -> RenderedCard:
+    """
+    Re-encode a stored card in another format.
+
+    Args:
+        data (bytes): Encoded source card
+        filename (str): Source card file name
+        fmt (str): Output format
+        preset (str, optional): Encoder preset
+        quality (int, optional): Quality override for lossy formats
+
+    Returns:
+        RenderedCard: Re-encoded card
+    """
+    with Image.open(io.BytesIO(data)) as source:
+        image = source.convert('RGB') if source.mode not in ('RGB', 'RGBA') else source.copy()
+    return encode_card(image, filename, fmt, preset, quality)
+
+
+def negotiate_format(accept_mimetypes: Any, requested: Optional[str] = None) -> str:
+    """
+    Choose an output format for a request.
+
+    Args:
+        accept_mimetypes: Werkzeug MIMEAccept from request.accept_mimetypes
+        requested (str, optional): Explicit format from the query string, which wins
+
+    Returns:
+        str: Encoder name
+
+    Raises:
+        ValueError: If the explicitly requested format is unknown or unsupported
+    """
+    if requested:
+        return normalize_format(requested)
+    # Only explicitly listed types count: browsers send image/* even for formats they cannot decode
+    accepted = {value.lower() for value, quality in accept_mimetypes if quality > 0}
+    for fmt in NEGOTIATED_FORMATS:
+        if fmt in SUPPORTED_FORMATS and MIME_TYPES[fmt] in accepted:
+            return fmt
+    return 'png'
+
+
+def measure_encoders(image: Image.Image, formats: Sequence[str] = SUPPORTED_FORMATS,
+                     presets: Sequence[str] = ('fast', 'balanced', 'small'),
+                     repeat: int = 3) -> List[Dict[str, Any]]:
+    """
+    Measure encode time and size for each format and preset.
+
+    Args:
+        image: PIL Image object to encode
+        formats (list): Formats to measure
+        presets (list): Presets to measure
+        repeat (int): Encodes per combination; the fastest is reported
+
+    Returns:
+        list: {'format', 'preset', 'bytes', 'ms'} per combination
+    """
+    image.load()
+    report = []
+    for fmt in formats:
+        for preset in presets:
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                data = encode_image(image, fmt, preset)
+                timings.append(time.perf_counter() - start)
+            report.append({'format': fmt, 'preset': preset, 'bytes': len(data),
+                           'ms': round(min(timings) * 1000, 1)})
+    return report
+
+
+def main():
+    """Print encode time and size per format and preset for existing cards."""
+    parser = argparse.ArgumentParser(description="Compare card encoders by encode time and size")
+    parser.add_argument("cards", nargs='+', help="Rendered card images to re-encode")
+    parser.add_argument("--repeat", type=int, default=3, help="Encodes per format/preset (fastest is reported)")
+    args = parser.parse_args()
+
+    print(f"Supported formats: {', '.join(SUPPORTED_FORMATS)}")
+    for path in args.cards:
+        with Image.open(path) as card:
+            report = measure_encoders(card.convert('RGB'), repeat=args.repeat)
+        print(f"\n{path}")
+        print(f"  {'format':<6} {'preset':<9} {'KB':>8} {'ms':>8}")
+        for row in report:
+            print(f"  {row['format']:<6} {row['preset']:<9} {row['bytes'] / 1024:>8.1f} {row['ms']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
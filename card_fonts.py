@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Card Fonts Module
+
+This module resolves the fonts used on cards once per process instead of on
+every render. Font files are located by searching a configurable font
+directory, the standard Windows/Linux/macOS font directories and fontconfig,
+and loaded FreeTypeFont objects are cached per (face, size).
+"""
+
+import os
+import shutil
+import subprocess
+import threading
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+from PIL import ImageFont
+from card_styles import get_category_fonts
+
+# Standard font directories searched after CARD_FONT_DIR
+SYSTEM_FONT_DIRS = [
+    "C:/Windows/Fonts",
+    "/usr/share/fonts",
+    "/usr/local/share/fonts",
+    "~/.fonts",
+    "~/.local/share/fonts",
+    "/Library/Fonts",
+    "/System/Library/Fonts",
+]
+
+FONT_EXTENSIONS = ('.ttf', '.otf', '.ttc')
+
+# Font sizes for each role when a category's own faces are available
+BASE_SIZES = {"title": 14, "header": 16, "stat": 12, "text": 10}
+
+# Larger sizes used with the generic cross-platform fallback face
+FALLBACK_SIZES = {"title": 28, "header": 32, "stat": 24, "text": 20}
+
+# Type badge font size
+ICON_SIZE = 20
+
+# Second choice of Windows faces per category, tried when the category faces are missing
+CATEGORY_FALLBACK_FONTS = {
+    "cute": {"title": "comic.ttf", "header": "comic.ttf", "stat": "verdana.ttf", "text": "calibri.ttf"},
+    "cool": {"title": "calibri.ttf", "header": "arial.ttf", "stat": "consola.ttf", "text": "calibri.ttf"},
+    "heroic": {"title": "impact.ttf", "header": "impact.ttf", "stat": "arial.ttf", "text": "tahoma.ttf"},
+    "legendary": {"title": "times.ttf", "header": "georgia.ttf", "stat": "georgia.ttf", "text": "times.ttf"},
+    "mystical": {"title": "georgia.ttf", "header": "times.ttf", "stat": "georgia.ttf", "text": "trebuc.ttf"},
+    "chaotic": {"title": "impact.ttf", "header": "trebuc.ttf", "stat": "consola.ttf", "text": "calibri.ttf"},
+    "fierce": {"title": "impact.ttf", "header": "arial.ttf", "stat": "verdana.ttf", "text": "tahoma.ttf"},
+    "wise": {"title": "times.ttf", "header": "georgia.ttf", "stat": "consolas.ttf", "text": "georgia.ttf"},
+}
+
+# Linux file names for the Windows faces: the Microsoft core fonts package
+# names first, then metric-compatible free substitutes
+FONT_ALIASES = {
+    "arial.ttf": ["Arial.ttf", "LiberationSans-Regular.ttf", "Arimo-Regular.ttf"],
+    "arialbd.ttf": ["Arial_Bold.ttf", "LiberationSans-Bold.ttf", "Arimo-Bold.ttf"],
+    "times.ttf": ["Times_New_Roman.ttf", "LiberationSerif-Regular.ttf", "Tinos-Regular.ttf"],
+    "timesbd.ttf": ["Times_New_Roman_Bold.ttf", "LiberationSerif-Bold.ttf", "Tinos-Bold.ttf"],
+    "cour.ttf": ["Courier_New.ttf", "LiberationMono-Regular.ttf", "Cousine-Regular.ttf"],
+    "courbd.ttf": ["Courier_New_Bold.ttf", "LiberationMono-Bold.ttf", "Cousine-Bold.ttf"],
+    "calibri.ttf": ["Carlito-Regular.ttf"],
+    "calibrib.ttf": ["Carlito-Bold.ttf"],
+    "comic.ttf": ["Comic_Sans_MS.ttf"],
+    "comicbd.ttf": ["Comic_Sans_MS_Bold.ttf"],
+    "impact.ttf": ["Impact.ttf"],
+    "verdana.ttf": ["Verdana.ttf"],
+    "verdanab.ttf": ["Verdana_Bold.ttf"],
+    "georgia.ttf": ["Georgia.ttf"],
+    "georgiab.ttf": ["Georgia_Bold.ttf"],
+    "trebuc.ttf": ["Trebuchet_MS.ttf"],
+    "trebucbd.ttf": ["Trebuchet_MS_Bold.ttf"],
+    "consola.ttf": ["LiberationMono-Regular.ttf", "DejaVuSansMono.ttf"],
+    "consolas.ttf": ["LiberationMono-Regular.ttf", "DejaVuSansMono.ttf"],
+}
+
+# Cross-platform face used when none of the Windows faces can be found
+GENERIC_FALLBACK_FONT = "DejaVuSans.ttf"
+
+ROLES = ("title", "header", "stat", "text")
+
+
+def _configured_font_dirs() -> List[str]:
+    """
+    Get the font directories to search, in priority order.
+
+    CARD_FONT_DIR may hold one or more directories separated by os.pathsep.
+
+    Returns:
+        list: Existing font directories
+    """
+    configured = os.environ.get('CARD_FONT_DIR', '')
+    dirs = [d for d in configured.split(os.pathsep) if d] + SYSTEM_FONT_DIRS
+    return [os.path.expanduser(d) for d in dirs if os.path.isdir(os.path.expanduser(d))]
+
+
+def _fontconfig_files() -> List[str]:
+    """
+    List font files known to fontconfig, if fc-list is installed.
+
+    Returns:
+        list: Font file paths
+    """
+    if not shutil.which('fc-list'):
+        return []
+    try:
+        output = subprocess.run(['fc-list', '--format', '%{file}\n'], capture_output=True,
+                                text=True, timeout=10, check=False).stdout
+    except (OSError, subprocess.SubprocessError) as e:
+        print(f"Warning: fc-list failed: {e}")
+        return []
+    return [line.strip() for line in output.splitlines() if line.strip()]
+
+
+class FontRegistry:
+    """
+    Process-wide registry that locates font files once and caches loaded fonts.
+    """
+
+    def __init__(self):
+        """Initialize an empty registry; the font index is built on first use."""
+        self._lock = threading.Lock()
+        self._index: Optional[Dict[str, str]] = None
+        self._categories: Dict[str, Dict[str, Tuple[Optional[str], int]]] = {}
+        self._category_sources: Dict[str, str] = {}
+
+    def _build_index(self) -> Dict[str, str]:
+        """Map lower-cased font file names to their full paths."""
+        index: Dict[str, str] = {}
+        for font_dir in _configured_font_dirs():
+            for root, _, files in os.walk(font_dir):
+                for name in files:
+                    if name.lower().endswith(FONT_EXTENSIONS):
+                        index.setdefault(name.lower(), os.path.join(root, name))
+        for path in _fontconfig_files():
+            index.setdefault(os.path.basename(path).lower(), path)
+        return index
+
+    def find(self, face: str) -> Optional[str]:
+        """
+        Find a font file by path or Windows file name, trying known aliases.
+
+        Args:
+            face (str): Absolute font path or font file name (e.g. 'arialbd.ttf')
+
+        Returns:
+            Optional[str]: Path to the font file, or None if unavailable
+        """
+        if os.path.isabs(face) and os.path.isfile(face):
+            return face
+        if self._index is None:
+            self._index = self._build_index()
+        name = os.path.basename(face).lower()
+        for candidate in [name] + FONT_ALIASES.get(name, []):
+            path = self._index.get(candidate.lower())
+            if path:
+                return path
+        return None
+
+    def _find_all(self, faces: Dict[str, str]) -> Optional[Dict[str, str]]:
+        """Resolve every role of a face set, or None if any face is missing."""
+        paths = {}
+        for role in ROLES:
+            path = self.find(faces[role])
+            if not path:
+                return None
+            paths[role] = path
+        return paths
+
+    def _resolve_category(self, category: str) -> Dict[str, Tuple[Optional[str], int]]:
+        """Pick the first complete set of faces for a category."""
+        tiers = [
+            ("category", get_category_fonts(category), BASE_SIZES),
+            ("category fallback", CATEGORY_FALLBACK_FONTS.get(category, {}), BASE_SIZES),
+            ("arial", {role: "arial.ttf" for role in ROLES}, BASE_SIZES),
+            ("generic", {role: GENERIC_FALLBACK_FONT for role in ROLES}, FALLBACK_SIZES),
+        ]
+        for source, faces, sizes in tiers:
+            if len(faces) != len(ROLES):
+                continue
+            paths = self._find_all(faces)
+            if paths:
+                resolved = {role: (paths[role], sizes[role]) for role in ROLES}
+                break
+        else:
+            source = "default"
+            resolved = {role: (None, BASE_SIZES[role]) for role in ROLES}
+
+        icon_path = self.find("arial.ttf") or self.find(GENERIC_FALLBACK_FONT)
+        resolved["icon"] = (icon_path, ICON_SIZE) if icon_path else resolved["header"]
+        self._category_sources[category] = source
+        return resolved
+
+    def resolve(self, category: str) -> Dict[str, Tuple[Optional[str], int]]:
+        """
+        Get the (path, size) chosen for each role of a category.
+
+        Args:
+            category (str): Character category
+
+        Returns:
+            dict: Role name to (font path or None for Pillow's default, size)
+        """
+        category = category.lower()
+        resolved = self._categories.get(category)
+        if resolved is None:
+            with self._lock:
+                resolved = self._categories.get(category)
+                if resolved is None:
+                    resolved = self._resolve_category(category)
+                    self._categories[category] = resolved
+        return resolved
+
+    def load(self, category: str) -> Dict[str, ImageFont.FreeTypeFont]:
+        """
+        Get the loaded fonts for every role of a category.
+
+        Args:
+            category (str): Character category
+
+        Returns:
+            dict: Role name ('title', 'header', 'stat', 'text', 'icon') to font
+        """
+        return {role: get_font(path, size) for role, (path, size) in self.resolve(category).items()}
+
+    def report(self) -> Dict[str, Dict[str, object]]:
+        """
+        Describe which faces each resolved category ended up with.
+
+        Returns:
+            dict: Category to source tier and role -> 'path@size'
+        """
+        report = {}
+        for category, resolved in sorted(self._categories.items()):
+            report[category] = {
+                'source': self._category_sources.get(category),
+                'faces': {role: f"{path or 'default'}@{size}" for role, (path, size) in resolved.items()}
+            }
+        return report
+
+
+@lru_cache(maxsize=128)
+def get_font(path: Optional[str], size: int) -> ImageFont.FreeTypeFont:
+    """
+    Load a font once per (face, size).
+
+    Args:
+        path (Optional[str]): Font file path, or None for Pillow's built-in font
+        size (int): Font size in points
+
+    Returns:
+        PIL.ImageFont: Loaded font
+    """
+    if path is None:
+        return ImageFont.load_default()
+    return ImageFont.truetype(path, size)
+
+
+# Process-wide registry shared by all renders
+font_registry = FontRegistry()
+
+
+def load_category_fonts(category: str) -> Dict[str, ImageFont.FreeTypeFont]:
+    """
+    Get the loaded card fonts for a category from the shared registry.
+
+    Args:
+        category (str): Character category
+
+    Returns:
+        dict: Role name ('title', 'header', 'stat', 'text', 'icon') to font
+    """
+    return font_registry.load(category)
+
+
+def preload_fonts(log: bool = True) -> Dict[str, Dict[str, object]]:
+    """
+    Resolve and load the fonts for every category.
+
+    Args:
+        log (bool): Print the faces chosen for each category
+
+    Returns:
+        dict: Registry report of the faces chosen per category
+    """
+    for category in CATEGORY_FALLBACK_FONTS:
+        font_registry.load(category)
+    report = font_registry.report()
+    if log:
+        for category, details in report.items():
+            print(f"Fonts for {category} ({details['source']}): {details['faces']}")
+    return report
@@ -7,11 +7,125 @@ for the character card generator, including gradient creation,
 text effects, and card layout composition.
 """
 
-import os
+import io
 import random
+import time
 from PIL import Image, ImageDraw, ImageFont
-from typing import Dict, Any, Optional, Tuple
-from card_styles import get_custom_type_colors, get_category_fonts
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+from card_styles import CUSTOM_TYPES, get_custom_type_colors
+from card_encoders import encode_card
+from card_output import CardSink, RenderedCard, save_card
+from card_photos import load_card_photo
+from card_storage import StoreSink, card_store
+from card_fonts import font_registry, get_font, load_category_fonts
+from render_cache import layer_cache
+from text_layout import fit_text, text_bbox, text_width, truncate_to_width
+
+# Card dimensions (trading card proportions: 59mm × 86mm scaled up)
+CARD_WIDTH = 600
+CARD_HEIGHT = 840
+
+# Fixed card layout shared by the chrome template and the per-card content
+CARD_MARGIN = 20
+HEADER_Y = 30
+HEADER_HEIGHT = 80
+IMAGE_Y = HEADER_Y + HEADER_HEIGHT + 20
+IMAGE_HEIGHT = 320
+STATS_Y = IMAGE_Y + IMAGE_HEIGHT + 25
+STATS_HEIGHT = 140
+ABILITY_Y = STATS_Y + STATS_HEIGHT + 25
+ABILITY_HEIGHT = 180
+STAT_CIRCLE_RADIUS = 45
+STAT_LABEL_OFFSET = 25
+
+# How far the effect text may shrink before it is truncated instead
+MIN_EFFECT_TEXT_SCALE = 0.8
+MIN_EFFECT_TEXT_SIZE = 8
+
+
+def hex_to_rgb(hex_color: str) -> Tuple[int, int, int]:
+    """
+    Convert a hex colour string to an RGB tuple.
+    
+    Args:
+        hex_color (str): Colour such as '#FFB6C1'
+        
+    Returns:
+        tuple: (r, g, b) integer components
+    """
+    hex_color = hex_color.lstrip('#')
+    return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
+
+
+def _gradient_ramp(length: int, colors: Sequence[str]) -> List[Tuple[int, int, int]]:
+    """
+    Interpolate evenly spaced colour stops into a single row of RGB values.
+    
+    With two stops this reproduces the original per-pixel formula exactly,
+    so existing cards stay pixel-identical.
+    
+    Args:
+        length (int): Number of samples along the gradient axis
+        colors (Sequence[str]): Two or more hex colour stops
+        
+    Returns:
+        list: RGB tuples, one per sample
+    """
+    stops = [hex_to_rgb(color) for color in colors]
+    segments = len(stops) - 1
+    ramp = []
+    for i in range(length):
+        position = i / length * segments
+        index = min(int(position), segments - 1)
+        ratio = position - index
+        start, end = stops[index], stops[index + 1]
+        ramp.append((
+            int(start[0] + (end[0] - start[0]) * ratio),
+            int(start[1] + (end[1] - start[1]) * ratio),
+            int(start[2] + (end[2] - start[2]) * ratio),
+        ))
+    return ramp
+
+
+def create_multi_stop_gradient(width: int, height: int, colors: Sequence[str],
+                               direction: str = 'vertical') -> Image.Image:
+    """
+    Create a gradient with any number of evenly spaced colour stops.
+    
+    The colour ramp is computed once as a single row or column and then
+    broadcast to the full image by Pillow, instead of writing every pixel
+    from Python.
+    
+    Args:
+        width (int): Image width
+        height (int): Image height
+        colors (Sequence[str]): Two or more hex colour stops
+        direction (str): 'vertical', 'horizontal' or 'diagonal'
+        
+    Returns:
+        PIL.Image: Gradient background
+    """
+    if len(colors) < 2:
+        raise ValueError("A gradient needs at least two colour stops")
+    
+    if direction == 'vertical':
+        strip = Image.new('RGB', (1, height))
+        strip.putdata(_gradient_ramp(height, colors))
+        return strip.resize((width, height), Image.Resampling.NEAREST)
+    
+    if direction == 'diagonal':
+        # Top-left to bottom-right: every pixel on the same anti-diagonal
+        # (x + y) shares a colour, so sample one strip along x + y.
+        length = width + height - 1
+        strip = Image.new('RGB', (length, 1))
+        strip.putdata(_gradient_ramp(length, colors))
+        return strip.transform((width, height), Image.Transform.AFFINE, (1, 1, -0.5, 0, 0, 0),
+                               resample=Image.Resampling.NEAREST)
+    
+    # horizontal
+    strip = Image.new('RGB', (width, 1))
+    strip.putdata(_gradient_ramp(width, colors))
+    return strip.resize((width, height), Image.Resampling.NEAREST)
 
 
 def create_gradient_background(width: int, height: int, color1: str, color2: str, direction: str = 'vertical') -> Image.Image:
@@ -23,38 +137,12 @@ def create_gradient_background(width: int, height: int, color1: str, color2: str
         height (int): Image height
         color1 (str): Start color (hex)
         color2 (str): End color (hex)
-        direction (str): 'vertical' or 'horizontal'
+        direction (str): 'vertical', 'horizontal' or 'diagonal'
         
     Returns:
         PIL.Image: Gradient background
     """
-    def hex_to_rgb(hex_color: str) -> Tuple[int, int, int]:
-        hex_color = hex_color.lstrip('#')
-        return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
-    
-    rgb1 = hex_to_rgb(color1)
-    rgb2 = hex_to_rgb(color2)
-    
-    gradient = Image.new('RGB', (width, height))
-    
-    if direction == 'vertical':
-        for y in range(height):
-            ratio = y / height
-            r = int(rgb1[0] + (rgb2[0] - rgb1[0]) * ratio)
-            g = int(rgb1[1] + (rgb2[1] - rgb1[1]) * ratio)
-            b = int(rgb1[2] + (rgb2[2] - rgb1[2]) * ratio)
-            for x in range(width):
-                gradient.putpixel((x, y), (r, g, b))
-    else:  # horizontal
-        for x in range(width):
-            ratio = x / width
-            r = int(rgb1[0] + (rgb2[0] - rgb1[0]) * ratio)
-            g = int(rgb1[1] + (rgb2[1] - rgb1[1]) * ratio)
-            b = int(rgb1[2] + (rgb2[2] - rgb1[2]) * ratio)
-            for y in range(height):
-                gradient.putpixel((x, y), (r, g, b))
-    
-    return gradient
+    return create_multi_stop_gradient(width, height, (color1, color2), direction)
 
 
 def create_rounded_rectangle_mask(width: int, height: int, radius: int) -> Image.Image:
@@ -75,6 +163,67 @@ def create_rounded_rectangle_mask(width: int, height: int, radius: int) -> Image
     return mask
 
 
+def get_gradient_background(width: int, height: int, color1: str, color2: str,
+                            direction: str = 'vertical') -> Image.Image:
+    """
+    Get a gradient background from the shared layer cache.
+    
+    Args:
+        width (int): Image width
+        height (int): Image height
+        color1 (str): Start color (hex)
+        color2 (str): End color (hex)
+        direction (str): 'vertical', 'horizontal' or 'diagonal'
+        
+    Returns:
+        PIL.Image: Read-only view of the cached gradient
+    """
+    key = ('gradient', width, height, color1, color2, direction)
+    return layer_cache.get_or_create(
+        key, lambda: create_gradient_background(width, height, color1, color2, direction))
+
+
+def get_rounded_rectangle_mask(width: int, height: int, radius: int) -> Image.Image:
+    """
+    Get a rounded rectangle mask from the shared layer cache.
+    
+    Args:
+        width (int): Rectangle width
+        height (int): Rectangle height
+        radius (int): Corner radius
+        
+    Returns:
+        PIL.Image: Read-only view of the cached alpha mask
+    """
+    key = ('mask', width, height, radius)
+    return layer_cache.get_or_create(key, lambda: create_rounded_rectangle_mask(width, height, radius))
+
+
+def get_gradient_panel(width: int, height: int, color1: str, color2: str, radius: int,
+                       direction: str = 'vertical') -> Image.Image:
+    """
+    Get a rounded gradient panel (gradient with a rounded alpha mask) from the cache.
+    
+    Args:
+        width (int): Panel width
+        height (int): Panel height
+        color1 (str): Start color (hex)
+        color2 (str): End color (hex)
+        radius (int): Corner radius
+        direction (str): 'vertical', 'horizontal' or 'diagonal'
+        
+    Returns:
+        PIL.Image: Read-only view of the cached RGBA panel
+    """
+    def build() -> Image.Image:
+        panel = get_gradient_background(width, height, color1, color2, direction).convert('RGBA')
+        panel.putalpha(get_rounded_rectangle_mask(width, height, radius))
+        return panel
+    
+    key = ('panel', width, height, color1, color2, direction, radius)
+    return layer_cache.get_or_create(key, build)
+
+
 def add_text_shadow(draw: ImageDraw.Draw, text: str, position: Tuple[int, int], font: ImageFont.FreeTypeFont, 
                    fill_color: Any, shadow_color: Any, shadow_offset: Tuple[int, int] = (2, 2)) -> None:
     """
@@ -188,20 +337,97 @@ def draw_rounded_rectangle(draw: ImageDraw.Draw, xy: list, radius: int, fill: An
     draw.rounded_rectangle(xy, radius=radius, fill=fill, outline=outline, width=width)
 
 
-def create_unified_card(canvas: Image.Image, draw: ImageDraw.Draw, source_image_path: str, 
-                       card_data: Dict[str, Any], colors: Dict[str, str]) -> None:
+def _stat_circle_centers(card_width: int) -> List[Tuple[int, int]]:
     """
-    Create unified personality card layout with original simple styling.
+    Get the centre points of the two stat circles.
+    
+    Args:
+        card_width (int): Card width in pixels
+        
+    Returns:
+        list: (x, y) centre of each stat circle
+    """
+    stat_width = (card_width - 2 * CARD_MARGIN - 20) // 2
+    # Center the circle vertically in the stats box, accounting for the label above it
+    circle_y = STATS_Y + (STATS_HEIGHT // 2) + (STAT_LABEL_OFFSET // 2)
+    return [(CARD_MARGIN + 10 + (i * stat_width) + stat_width // 2, circle_y) for i in range(2)]
+
+
+def draw_card_chrome(canvas: Image.Image, colors: Dict[str, str]) -> None:
+    """
+    Draw the static card structure: border, panels, photo frame and stat circles.
+    
+    Everything drawn here depends only on the colour scheme, so it can be
+    rendered once per personality type and reused for every card.
     
     Args:
         canvas: PIL Image object
-        draw: ImageDraw object
+        colors: Color scheme dictionary
+    """
+    card_width, card_height = canvas.size
+    margin = CARD_MARGIN
+    draw = ImageDraw.Draw(canvas)
+    
+    # Simple ornate border with glow effect like original
+    corner_radius = 15
+    border_width = 6
+    for i in range(3):
+        glow_width = border_width - i * 2
+        glow_color = colors['accent'] if i == 0 else colors['primary']
+        draw.rounded_rectangle([i, i, card_width - i, card_height - i], 
+                             radius=corner_radius - i, outline=glow_color, width=glow_width)
+    
+    # 1. Header section with gradient background like original
+    header_bg = get_gradient_panel(card_width - 40, HEADER_HEIGHT, colors['primary'], colors['secondary'], 10)
+    canvas.paste(header_bg, (20, HEADER_Y), header_bg)
+    draw = ImageDraw.Draw(canvas)
+    
+    # 3. Image section with rounded frame like original
+    image_width = card_width - (2 * margin) - 20
+    
+    # Image frame with inner shadow
+    frame_x = margin + 10
+    frame_y = IMAGE_Y
+    draw.rounded_rectangle([frame_x, frame_y, frame_x + image_width, frame_y + IMAGE_HEIGHT], 
+                         radius=12, outline=colors['accent'], width=4)
+    
+    # Inner frame
+    inner_frame_x = frame_x + 8
+    inner_frame_y = frame_y + 8
+    inner_width = image_width - 16
+    inner_height = IMAGE_HEIGHT - 16
+    draw.rounded_rectangle([inner_frame_x, inner_frame_y, inner_frame_x + inner_width, inner_frame_y + inner_height], 
+                         radius=8, outline=colors['primary'], width=2)
+    
+    # 4. Stats section with gradient background and stat circles
+    stats_bg = get_gradient_panel(card_width - 40, STATS_HEIGHT, colors['primary'], colors['secondary'], 12)
+    canvas.paste(stats_bg, (20, STATS_Y), stats_bg)
+    draw = ImageDraw.Draw(canvas)
+    
+    circle_radius = STAT_CIRCLE_RADIUS
+    for circle_x, circle_y in _stat_circle_centers(card_width):
+        draw.ellipse([circle_x - circle_radius, circle_y - circle_radius, 
+                     circle_x + circle_radius, circle_y + circle_radius], 
+                   fill=colors['accent'])
+    
+    # 5. Ability section with gradient background
+    ability_bg = get_gradient_panel(card_width - 40, ABILITY_HEIGHT, colors['secondary'], colors['primary'], 12)
+    canvas.paste(ability_bg, (20, ABILITY_Y), ability_bg)
+
+
+def draw_card_content(canvas: Image.Image, source_image_path: str, 
+                      card_data: Dict[str, Any], colors: Dict[str, str]) -> None:
+    """
+    Draw the per-card content on top of the card chrome.
+    
+    Args:
+        canvas: PIL Image object already holding the card chrome
         source_image_path: Path to character image
         card_data: Card data dictionary
         colors: Color scheme dictionary
     """
     card_width, card_height = canvas.size
-    margin = 20
+    margin = CARD_MARGIN
     
     # Get category for fonts
     custom_type = card_data.get('custom_type', 'Vibe')
@@ -216,157 +442,36 @@ def create_unified_card(canvas: Image.Image, draw: ImageDraw.Draw, source_image_
     }
     category = type_to_category.get(custom_type, "cool")
     
-    # Load category-specific fonts like original
-    fonts = get_category_fonts(category)
-    print(f"[DEBUG] Loading fonts for category: {category}")
-    print(f"[DEBUG] Font paths: {fonts}")
-    try:
-        title_font = ImageFont.truetype(fonts["title"], 14)
-        header_font = ImageFont.truetype(fonts["header"], 16)
-        stat_font = ImageFont.truetype(fonts["stat"], 12)
-        text_font = ImageFont.truetype(fonts["text"], 10)
-        print("[DEBUG] Successfully loaded category-specific fonts")
-    except (OSError, IOError) as e:
-        print(f"[DEBUG] Category fonts failed: {e}")
-        print("[DEBUG] Trying fallback fonts...")
-        # Fallback to different fonts based on category if category fonts not available
-        try:
-            if category == "cute":
-                title_font = ImageFont.truetype("comic.ttf", 14)
-                header_font = ImageFont.truetype("comic.ttf", 16)
-                stat_font = ImageFont.truetype("verdana.ttf", 12)
-                text_font = ImageFont.truetype("calibri.ttf", 10)
-            elif category == "cool":
-                title_font = ImageFont.truetype("calibri.ttf", 14)
-                header_font = ImageFont.truetype("arial.ttf", 16)
-                stat_font = ImageFont.truetype("consola.ttf", 12)
-                text_font = ImageFont.truetype("calibri.ttf", 10)
-            elif category == "heroic":
-                title_font = ImageFont.truetype("impact.ttf", 14)
-                header_font = ImageFont.truetype("impact.ttf", 16)
-                stat_font = ImageFont.truetype("arial.ttf", 12)
-                text_font = ImageFont.truetype("tahoma.ttf", 10)
-            elif category == "legendary":
-                title_font = ImageFont.truetype("times.ttf", 14)
-                header_font = ImageFont.truetype("georgia.ttf", 16)
-                stat_font = ImageFont.truetype("georgia.ttf", 12)
-                text_font = ImageFont.truetype("times.ttf", 10)
-            elif category == "mystical":
-                title_font = ImageFont.truetype("georgia.ttf", 14)
-                header_font = ImageFont.truetype("times.ttf", 16)
-                stat_font = ImageFont.truetype("georgia.ttf", 12)
-                text_font = ImageFont.truetype("trebuc.ttf", 10)
-            elif category == "chaotic":
-                title_font = ImageFont.truetype("impact.ttf", 14)
-                header_font = ImageFont.truetype("trebuc.ttf", 16)
-                stat_font = ImageFont.truetype("consola.ttf", 12)
-                text_font = ImageFont.truetype("calibri.ttf", 10)
-            elif category == "fierce":
-                title_font = ImageFont.truetype("impact.ttf", 14)
-                header_font = ImageFont.truetype("arial.ttf", 16)
-                stat_font = ImageFont.truetype("verdana.ttf", 12)
-                text_font = ImageFont.truetype("tahoma.ttf", 10)
-            elif category == "wise":
-                title_font = ImageFont.truetype("times.ttf", 14)
-                header_font = ImageFont.truetype("georgia.ttf", 16)
-                stat_font = ImageFont.truetype("consolas.ttf", 12)
-                text_font = ImageFont.truetype("georgia.ttf", 10)
-            else:
-                # Default fallback
-                title_font = ImageFont.truetype("arial.ttf", 14)
-                header_font = ImageFont.truetype("arial.ttf", 16)
-                stat_font = ImageFont.truetype("arial.ttf", 12)
-                text_font = ImageFont.truetype("arial.ttf", 10)
-        except (OSError, IOError) as e:
-            print(f"[DEBUG] Category fallback fonts failed: {e}")
-            print("[DEBUG] Trying final fallback...")
-            # Final fallback - try to use system fonts with proper sizes
-            try:
-                title_font = ImageFont.truetype("arial.ttf", 14)
-                header_font = ImageFont.truetype("arial.ttf", 16)
-                stat_font = ImageFont.truetype("arial.ttf", 12)
-                text_font = ImageFont.truetype("arial.ttf", 10)
-                print("[DEBUG] Successfully loaded final fallback fonts")
-            except (OSError, IOError):
-                # Absolute last resort - use larger cross-platform fallback
-                print("WARNING: All font loading failed - using larger cross-platform fallback")
-                try:
-                    # Try DejaVuSans which is commonly available on Linux systems
-                    title_font = ImageFont.truetype("DejaVuSans.ttf", 28)
-                    header_font = ImageFont.truetype("DejaVuSans.ttf", 32)
-                    stat_font = ImageFont.truetype("DejaVuSans.ttf", 24)
-                    text_font = ImageFont.truetype("DejaVuSans.ttf", 20)
-                    print("[DEBUG] Successfully loaded DejaVuSans fallback fonts")
-                except (OSError, IOError):
-                    # Last resort - use default font with larger sizes
-                    print("[DEBUG] Using default font with larger sizes")
-                    try:
-                        # Try to load default font and scale it up
-                        base_font = ImageFont.load_default()
-                        # Create larger fonts by using a scaling factor
-                        title_font = ImageFont.truetype("arial.ttf", 28) if os.path.exists("arial.ttf") else base_font
-                        header_font = ImageFont.truetype("arial.ttf", 32) if os.path.exists("arial.ttf") else base_font
-                        stat_font = ImageFont.truetype("arial.ttf", 24) if os.path.exists("arial.ttf") else base_font
-                        text_font = ImageFont.truetype("arial.ttf", 20) if os.path.exists("arial.ttf") else base_font
-                        print("[DEBUG] Using scaled default fonts")
-                    except:
-                        # Absolute last resort - use default font as-is
-                        print("[DEBUG] Using default font as-is")
-                        base_font = ImageFont.load_default()
-                        title_font = base_font
-                        header_font = base_font
-                        stat_font = base_font
-                        text_font = base_font
-    
-    # Log which font loading path succeeded
-    print(f"[DEBUG] Font loading complete - Title: {title_font}, Header: {header_font}, Stat: {stat_font}, Text: {text_font}")
-    
-    # Simple ornate border with glow effect like original
-    corner_radius = 15
-    border_width = 6
-    for i in range(3):
-        glow_width = border_width - i * 2
-        glow_color = colors['accent'] if i == 0 else colors['primary']
-        draw.rounded_rectangle([i, i, card_width - i, card_height - i], 
-                             radius=corner_radius - i, outline=glow_color, width=glow_width)
+    # Fonts are resolved once per process by the font registry
+    fonts = load_category_fonts(category)
+    title_font = fonts["title"]
+    header_font = fonts["header"]
+    stat_font = fonts["stat"]
+    text_font = fonts["text"]
     
-    # 1. Header section with gradient background like original
-    header_y = 30
-    header_height = 80
-    
-    # Header background with rounded corners
-    header_bg = create_gradient_background(card_width - 40, header_height, colors['primary'], colors['secondary'])
-    header_mask = create_rounded_rectangle_mask(card_width - 40, header_height, 10)
-    header_bg.putalpha(header_mask)
-    
-    # Paste header background
-    header_x = 20
-    canvas.paste(header_bg, (header_x, header_y), header_bg)
     draw = ImageDraw.Draw(canvas)
     
+    # 1. Header: character name with shadow
+    header_y = HEADER_Y
     card_name = card_data.get('card_name', 'Unknown')
-    # Character name with shadow
-    add_text_shadow(draw, card_name, (margin + 15, header_y + 10), title_font, 
-                   colors['text'], (0, 0, 0, 100))
     
     # 2. Type badge (in header like original)
     type_text = card_data.get('custom_type', 'Unknown')
     
-    # Try to load a Unicode-capable font for type badge (larger size)
-    try:
-        icon_font = ImageFont.truetype("arial.ttf", 20)  # Arial supports more Unicode, increased size
-    except (OSError, IOError):
-        try:
-            icon_font = ImageFont.truetype("DejaVuSans.ttf", 20)
-        except (OSError, IOError):
-            icon_font = header_font  # Fallback to header font
+    # Unicode-capable font for the type badge (larger size)
+    icon_font = fonts["icon"]
     
     # Calculate width for type badge (text only, no icons)
-    type_bbox = draw.textbbox((0, 0), type_text, font=icon_font)
-    type_width = type_bbox[2] - type_bbox[0] + 20
+    type_width = text_width(type_text, icon_font) + 20
     type_x = card_width - margin - type_width - 15
     type_y = header_y + 15
     
+    # Character name with shadow, shortened if it would run into the badge
+    name_x = margin + 15
+    card_name = truncate_to_width(card_name, title_font, type_x - name_x - 10)
+    add_text_shadow(draw, card_name, (name_x, header_y + 10), title_font, 
+                   colors['text'], (0, 0, 0, 100))
+    
     # Type badge background
     draw.rounded_rectangle([type_x, type_y, type_x + type_width, type_y + 30], 
                          radius=8, fill=colors['accent'])
@@ -379,64 +484,31 @@ def create_unified_card(canvas: Image.Image, draw: ImageDraw.Draw, source_image_
         # Fallback: draw just the type text
         draw.text((type_x + 10, type_y + 5), type_text, fill=colors['background'], font=header_font)
     
-    # 3. Image section with rounded frame like original
-    image_y = header_y + header_height + 20
+    # 3. Photo, centred inside the inner frame
     image_width = card_width - (2 * margin) - 20
-    image_height = 320
+    inner_frame_x = margin + 10 + 8
+    inner_frame_y = IMAGE_Y + 8
+    inner_width = image_width - 16
+    inner_height = IMAGE_HEIGHT - 16
     
-    # Image frame with inner shadow
-    frame_x = margin + 10
-    frame_y = image_y
-    draw.rounded_rectangle([frame_x, frame_y, frame_x + image_width, frame_y + image_height], 
-                         radius=12, outline=colors['accent'], width=4)
+    # Load the photo upright, decoded at the smallest scale that fills the frame
+    resized_img = load_card_photo(source_image_path, (inner_width, inner_height))
+    new_width, new_height = resized_img.size
     
-    # Inner frame
-    inner_frame_x = frame_x + 8
-    inner_frame_y = frame_y + 8
-    inner_width = image_width - 16
-    inner_height = image_height - 16
-    draw.rounded_rectangle([inner_frame_x, inner_frame_y, inner_frame_x + inner_width, inner_frame_y + inner_height], 
-                         radius=8, outline=colors['primary'], width=2)
+    # Center image with rounded corners
+    x_offset = inner_frame_x + (inner_width - new_width) // 2
+    y_offset = inner_frame_y + (inner_height - new_height) // 2
+    
+    # Create mask for image
+    img_mask = get_rounded_rectangle_mask(new_width, new_height, 6)
+    resized_img.putalpha(img_mask)
+    
+    # Paste image
+    canvas.paste(resized_img, (x_offset, y_offset), resized_img)
     
-    # Load and resize source image
-    with Image.open(source_image_path) as source_img:
-        if source_img.mode != 'RGB':
-            source_img = source_img.convert('RGB')
-        
-        # Calculate aspect ratio and resize to fit
-        aspect_ratio = source_img.height / source_img.width
-        if aspect_ratio > inner_height / inner_width:
-            new_height = inner_height
-            new_width = int(inner_height / aspect_ratio)
-        else:
-            new_width = inner_width
-            new_height = int(inner_width * aspect_ratio)
-        
-        resized_img = source_img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-        
-        # Center image with rounded corners
-        x_offset = inner_frame_x + (inner_width - new_width) // 2
-        y_offset = inner_frame_y + (inner_height - new_height) // 2
-        
-        # Create mask for image
-        img_mask = create_rounded_rectangle_mask(new_width, new_height, 6)
-        resized_img.putalpha(img_mask)
-        
-        # Paste image
-        canvas.paste(resized_img, (x_offset, y_offset), resized_img)
-    
-    # 4. Stats section with enhanced styling like original
-    stats_y = image_y + image_height + 25
-    stats_height = 140
-    
-    # Stats background with gradient
-    stats_bg = create_gradient_background(card_width - 40, stats_height, colors['primary'], colors['secondary'])
-    stats_mask = create_rounded_rectangle_mask(card_width - 40, stats_height, 12)
-    stats_bg.putalpha(stats_mask)
-    canvas.paste(stats_bg, (20, stats_y), stats_bg)
     draw = ImageDraw.Draw(canvas)
     
-    # Custom stats displayed in circles like original
+    # 4. Stat labels and values over the stat circles
     stat1_name = card_data.get('stat1_name', 'Power')
     stat1_value = card_data.get('stat1_value', 1000)
     stat2_name = card_data.get('stat2_name', 'Defense')
@@ -447,45 +519,24 @@ def create_unified_card(canvas: Image.Image, draw: ImageDraw.Draw, source_image_
         (stat2_name, stat2_value)
     ]
     
-    stat_width = (card_width - 2 * margin - 20) // 2
-    for i, (label, value) in enumerate(stats):
-        x = margin + 10 + (i * stat_width)
-        
-        # Stat background circle - larger size
-        circle_radius = 45
-        circle_x = x + stat_width // 2
-        # Center the circle vertically in the stats box
-        # stats_height = 140, account for label height (~15px) above circle
-        label_offset = 25
-        circle_y = stats_y + (stats_height // 2) + (label_offset // 2)
-        
-        draw.ellipse([circle_x - circle_radius, circle_y - circle_radius, 
-                     circle_x + circle_radius, circle_y + circle_radius], 
-                   fill=colors['accent'])
-        
+    circle_radius = STAT_CIRCLE_RADIUS
+    label_offset = STAT_LABEL_OFFSET
+    for (label, value), (circle_x, circle_y) in zip(stats, _stat_circle_centers(card_width)):
         # Stat label - positioned above circle
-        label_bbox = draw.textbbox((0, 0), label, font=stat_font)
-        label_width = label_bbox[2] - label_bbox[0]
+        label_width = text_width(label, stat_font)
         label_y = circle_y - circle_radius - label_offset
         draw.text((circle_x - label_width // 2, label_y), label, fill=colors['text'], font=stat_font)
         
         # Stat value - centered in circle
-        value_bbox = draw.textbbox((0, 0), str(value), font=stat_font)
+        value_bbox = text_bbox(str(value), stat_font)
         value_width = value_bbox[2] - value_bbox[0]
         value_height = value_bbox[3] - value_bbox[1]
         draw.text((circle_x - value_width // 2, circle_y - value_height // 2), str(value), 
                 fill=colors['background'], font=stat_font)
     
-    # 5. Ability section with enhanced styling like original
-    ability_y = stats_y + stats_height + 25
-    ability_height = 180
-    
-    # Ability background with gradient
-    ability_bg = create_gradient_background(card_width - 40, ability_height, colors['secondary'], colors['primary'])
-    ability_mask = create_rounded_rectangle_mask(card_width - 40, ability_height, 12)
-    ability_bg.putalpha(ability_mask)
-    canvas.paste(ability_bg, (20, ability_y), ability_bg)
-    draw = ImageDraw.Draw(canvas)
+    # 5. Ability effect text
+    ability_y = ABILITY_Y
+    ability_height = ABILITY_HEIGHT
     
     # Effect description with dynamic text wrapping to prevent overflow
     effect_desc = card_data.get('effect_description', 'No description available.')
@@ -494,54 +545,157 @@ def create_unified_card(canvas: Image.Image, draw: ImageDraw.Draw, source_image_
     text_area_width = card_width - 2 * margin - 40 - 20  # Account for padding
     text_area_height = ability_height - 30  # Account for top/bottom margins
     
-    # Use textbbox to measure actual text dimensions and wrap dynamically
-    max_width_px = text_area_width
+    # Wrap with cached word widths, shrinking the font slightly before truncating
+    text_path, text_size = font_registry.resolve(category)["text"]
+    min_size = max(MIN_EFFECT_TEXT_SIZE, int(text_size * MIN_EFFECT_TEXT_SCALE))
+    layout = fit_text(effect_desc, lambda size: get_font(text_path, size), range(text_size, min_size - 1, -1),
+                      text_area_width, text_area_height)
+    
+    # Draw description without shadow
+    draw.text((margin + 20, ability_y + 15), layout.text, fill=colors['text'], font=layout.font)
+
+
+def build_card_chrome(custom_type: str) -> Image.Image:
+    """
+    Render the static chrome for a personality type.
     
-    # Start with a reasonable character estimate and adjust
-    words = effect_desc.split()
-    lines = []
-    current_line = []
+    The chrome holds the background gradient, texture, border, panels,
+    photo frame and stat circles; only the per-card content is missing.
     
-    for word in words:
-        test_line = ' '.join(current_line + [word])
-        bbox = draw.textbbox((0, 0), test_line, font=text_font)
-        line_width = bbox[2] - bbox[0]
+    Args:
+        custom_type (str): One of the 20 custom personality types
         
-        if line_width <= max_width_px:
-            current_line.append(word)
-        else:
-            if current_line:
-                lines.append(' '.join(current_line))
-                current_line = [word]
-            else:
-                # Single word is too long, add it anyway
-                lines.append(word)
-                current_line = []
-    
-    if current_line:
-        lines.append(' '.join(current_line))
-    
-    wrapped_desc = '\n'.join(lines)
-    
-    # Check if text height exceeds available space and truncate if needed
-    bbox = draw.textbbox((0, 0), wrapped_desc, font=text_font)
-    text_height = bbox[3] - bbox[1]
-    
-    if text_height > text_area_height:
-        # Remove lines from bottom until it fits
-        while lines and text_height > text_area_height:
-            lines.pop()
-            if lines:
-                lines[-1] = lines[-1].rstrip() + '...'
-            wrapped_desc = '\n'.join(lines)
-            bbox = draw.textbbox((0, 0), wrapped_desc, font=text_font)
-            text_height = bbox[3] - bbox[1]
+    Returns:
+        PIL.Image: RGB card chrome at full card size
+    """
+    colors = get_custom_type_colors(custom_type)
     
-    # Draw description without shadow
-    draw.text((margin + 20, ability_y + 15), wrapped_desc, fill=colors['text'], font=text_font)
+    # Create gradient background like original
+    background = get_gradient_background(CARD_WIDTH, CARD_HEIGHT, colors['background'], colors['secondary'])
+    
+    # Get category for texture overlay
+    type_to_category = {
+        "Mood": "cute", "Vibe": "cute", "Simp": "cute",
+        "NPC": "mystical", "Glitch": "mystical", "Ghost": "mystical",
+        "Spicy": "chaotic", "Clapback": "chaotic",
+        "Lag": "cool", "Ping": "cool", "Firewall": "cool"
+    }
+    category = type_to_category.get(custom_type, "cool")
+    
+    # Add texture overlay
+    texture_overlay = create_texture_overlay(CARD_WIDTH, CARD_HEIGHT, category)
+    background = background.convert('RGBA')
+    background = Image.alpha_composite(background, texture_overlay)
+    canvas = background.convert('RGB')
+    
+    draw_card_chrome(canvas, colors)
+    return canvas
 
 
-def create_card_image(source_image_path: str, card_data: Dict[str, Any], filename: Optional[str] = None) -> bool:
+def get_card_chrome(custom_type: str) -> Image.Image:
+    """
+    Get the pre-rendered chrome for a personality type from the layer cache.
+    
+    Args:
+        custom_type (str): One of the 20 custom personality types
+        
+    Returns:
+        PIL.Image: Read-only view of the cached card chrome
+    """
+    key = ('chrome', custom_type, CARD_WIDTH, CARD_HEIGHT)
+    return layer_cache.get_or_create(key, lambda: build_card_chrome(custom_type))
+
+
+def preload_card_chrome(custom_types: Sequence[str] = CUSTOM_TYPES) -> None:
+    """
+    Render and cache the chrome for every personality type up front.
+    
+    Args:
+        custom_types (Sequence[str]): Personality types to preload
+    """
+    for custom_type in custom_types:
+        get_card_chrome(custom_type)
+
+
+def create_unified_card(canvas: Image.Image, draw: ImageDraw.Draw, source_image_path: str, 
+                       card_data: Dict[str, Any], colors: Dict[str, str]) -> None:
+    """
+    Create unified personality card layout with original simple styling.
+    
+    Args:
+        canvas: PIL Image object
+        draw: ImageDraw object
+        source_image_path: Path to character image
+        card_data: Card data dictionary
+        colors: Color scheme dictionary
+    """
+    draw_card_chrome(canvas, colors)
+    draw_card_content(canvas, source_image_path, card_data, colors)
+
+
+def default_card_filename(card_data: Dict[str, Any]) -> str:
+    """
+    Build the default file name for a card from its name and the current time.
+    
+    Args:
+        card_data (dict): Generated card data
+        
+    Returns:
+        str: File name such as 'Sir_Lags_A_Lot_1760000000.png'
+    """
+    card_name = card_data.get('card_name', 'Unknown_Card')
+    # Sanitize filename
+    safe_name = "".join(c if c.isalnum() or c in (' ', '_') else '_' for c in card_name)
+    safe_name = safe_name.replace(' ', '_')
+    timestamp = int(time.time())
+    return f"{safe_name}_{timestamp}.png"
+
+
+def render_card_canvas(source_image_path: str, card_data: Dict[str, Any]) -> Image.Image:
+    """
+    Render a card to an in-memory image.
+    
+    Unlike create_card_image, errors are raised to the caller.
+    
+    Args:
+        source_image_path (str): Path to the source image file
+        card_data (dict): Generated card data with stats and abilities
+        
+    Returns:
+        PIL.Image: Rendered RGB card
+    """
+    # Get color scheme based on custom type
+    custom_type = card_data.get('custom_type', 'Vibe')
+    colors = get_custom_type_colors(custom_type)
+    
+    # Start from the pre-rendered chrome for this type and paint only the per-card content
+    canvas = get_card_chrome(custom_type).copy()
+    draw_card_content(canvas, source_image_path, card_data, colors)
+    return canvas
+
+
+def render_card(source_image_path: str, card_data: Dict[str, Any], filename: Optional[str] = None,
+                fmt: str = 'png', preset: Optional[str] = None, quality: Optional[int] = None) -> RenderedCard:
+    """
+    Render a card and encode it in memory without writing it anywhere.
+    
+    Args:
+        source_image_path (str): Path to the source image file
+        card_data (dict): Generated card data with stats and abilities
+        filename (str, optional): File name to record, defaults to default_card_filename
+        fmt (str): Output format ('png', 'webp', 'avif' or 'jpeg')
+        preset (str, optional): Encoder preset ('fast', 'balanced' or 'small')
+        quality (int, optional): Quality override for lossy formats
+        
+    Returns:
+        RenderedCard: Encoded card with its dimensions and encode time
+    """
+    canvas = render_card_canvas(source_image_path, card_data)
+    return encode_card(canvas, filename or default_card_filename(card_data), fmt, preset, quality)
+
+
+def create_card_image(source_image_path: str, card_data: Dict[str, Any], filename: Optional[str] = None,
+                      sinks: Optional[Sequence[CardSink]] = None) -> bool:
     """
     Create a personality card with AI-generated name and custom type.
     
@@ -549,67 +703,18 @@ def create_card_image(source_image_path: str, card_data: Dict[str, Any], filenam
         source_image_path (str): Path to the source image file
         card_data (dict): Generated card data with stats and abilities
         filename (str, optional): Specific filename to use for saving
+        sinks (list, optional): Where to store the card, defaults to the Generated_Cards store
         
     Returns:
         bool: True if successful, False otherwise
     """
     try:
         print("Creating personality card with enhanced visuals...")
+        print(f"Custom Type: {card_data.get('custom_type', 'Vibe')}")
+        card = render_card(source_image_path, card_data, filename)
         
-        # Card dimensions (trading card proportions: 59mm × 86mm scaled up)
-        card_width = 600
-        card_height = 840
-        
-        # Get color scheme based on custom type
-        custom_type = card_data.get('custom_type', 'Vibe')
-        print(f"Custom Type: {custom_type}")
-        colors = get_custom_type_colors(custom_type)
-        
-        # Create gradient background like original
-        background = create_gradient_background(card_width, card_height, colors['background'], colors['secondary'])
-        
-        # Get category for texture overlay
-        type_to_category = {
-            "Mood": "cute", "Vibe": "cute", "Simp": "cute",
-            "NPC": "mystical", "Glitch": "mystical", "Ghost": "mystical",
-            "Spicy": "chaotic", "Clapback": "chaotic",
-            "Lag": "cool", "Ping": "cool", "Firewall": "cool"
-        }
-        category = type_to_category.get(custom_type, "cool")
-        
-        # Add texture overlay
-        texture_overlay = create_texture_overlay(card_width, card_height, category)
-        background = background.convert('RGBA')
-        background = Image.alpha_composite(background, texture_overlay)
-        background = background.convert('RGB')
-        
-        # Create main canvas
-        canvas = Image.new('RGB', (card_width, card_height), (255, 255, 255))
-        draw = ImageDraw.Draw(canvas)
-        
-        # Apply background with rounded corners
-        canvas.paste(background, (0, 0))
-        draw = ImageDraw.Draw(canvas)
-        
-        # Create unified card layout
-        create_unified_card(canvas, draw, source_image_path, card_data, colors)
-        
-        # Ensure Generated_Cards directory exists
-        os.makedirs("Generated_Cards", exist_ok=True)
-        
-        # Use provided filename or generate one
-        if not filename:
-            import time
-            card_name = card_data.get('card_name', 'Unknown_Card')
-            # Sanitize filename
-            safe_name = "".join(c if c.isalnum() or c in (' ', '_') else '_' for c in card_name)
-            safe_name = safe_name.replace(' ', '_')
-            timestamp = int(time.time())
-            filename = f"{safe_name}_{timestamp}.png"
-        
-        output_path = os.path.join("Generated_Cards", filename)
-        canvas.save(output_path, 'PNG')
-        print(f"[SUCCESS] Personality card saved as: {output_path}")
+        for location in save_card(card, sinks if sinks is not None else [StoreSink(card_store)]):
+            print(f"[SUCCESS] Personality card saved as: {location}")
         return True
         
     except FileNotFoundError as e:
@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""
+Card Index Module
+
+This module keeps a persistent SQLite index of generated cards (file name,
+size, character name, type, stats and creation time), so the gallery can
+be served from indexed queries instead of scanning Generated_Cards/ on
+every request.
+"""
+
+import argparse
+import base64
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from card_storage import ContentStore, card_store
+from storage_backends import backend_from_env
+
+CARDS_DIR = "Generated_Cards"
+CARD_INDEX_PATH = os.environ.get('CARD_INDEX_PATH', os.path.join(CARDS_DIR, "card_index.sqlite3"))
+
+# Default file names end with the Unix time the card was made
+TIMESTAMP_SUFFIX = re.compile(r'^(?P<name>.+)_(?P<timestamp>\d{9,11})$')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cards (
+    filename TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    card_name TEXT,
+    custom_type TEXT,
+    category TEXT,
+    stat1_name TEXT,
+    stat1_value INTEGER,
+    stat2_name TEXT,
+    stat2_value INTEGER,
+    card_data TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cards_created_at ON cards (created_at, filename);
+CREATE INDEX IF NOT EXISTS cards_custom_type ON cards (custom_type, created_at, filename);
+CREATE INDEX IF NOT EXISTS cards_stat1 ON cards (COALESCE(stat1_value, -1), filename);
+CREATE INDEX IF NOT EXISTS cards_stat2 ON cards (COALESCE(stat2_value, -1), filename);
+"""
+
+COLUMNS = ('filename', 'size', 'card_name', 'custom_type', 'category', 'stat1_name', 'stat1_value',
+           'stat2_name', 'stat2_value', 'card_data', 'created_at')
+
+# Sort orders the gallery may ask for
+ORDERS = {
+    'filename': 'filename ASC',
+    'newest': 'created_at DESC, filename DESC',
+    'oldest': 'created_at ASC, filename ASC',
+}
+
+# Keyset sorts for paging: sort name to (key expression, direction); ties break on filename
+PAGE_SORTS = {
+    'newest': ('created_at', 'DESC'),
+    'oldest': ('created_at', 'ASC'),
+    'stat1': ('COALESCE(stat1_value, -1)', 'DESC'),
+    'stat2': ('COALESCE(stat2_value, -1)', 'DESC'),
+}
+
+# Fields returned per card by page(), leaving out the stored card data
+PAGE_COLUMNS = ('filename', 'size', 'card_name', 'custom_type', 'stat1_name', 'stat1_value',
+                'stat2_name', 'stat2_value', 'created_at')
+
+MAX_PAGE_SIZE = 100
+
+
+def _int_or_none(value: Any) -> Optional[int]:
+    """Convert a stat value to int, or None if it is not a number."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_filename(filename: str) -> Dict[str, Any]:
+    """
+    Recover the character name and creation time from a default card file name.
+
+    Args:
+        filename (str): Card file name such as 'Sir_Lags_A_Lot_1760000000.png'
+
+    Returns:
+        dict: 'card_name' and 'created_at' (None when not encoded in the name)
+    """
+    stem = os.path.splitext(filename)[0]
+    match = TIMESTAMP_SUFFIX.match(stem)
+    if match:
+        return {'card_name': match.group('name').replace('_', ' '), 'created_at': float(match.group('timestamp'))}
+    return {'card_name': stem.replace('_', ' '), 'created_at': None}
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a date filter given as Unix time or an ISO 8601 date/time.
+
+    Args:
+        value (str, optional): e.g. '1760000000', '2025-10-09' or '2025-10-09T12:00:00'
+
+    Returns:
+        Optional[float]: Unix time, or None if no value was given
+
+    Raises:
+        ValueError: If the value is not a recognised date
+    """
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise ValueError(f"Invalid date: {value}") from None
+
+
+def encode_cursor(sort: str, key: Any, filename: str) -> str:
+    """Encode the position after a card as an opaque cursor."""
+    payload = json.dumps([sort, key, filename], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str, sort: str) -> Tuple[Any, str]:
+    """
+    Decode a cursor made by encode_cursor.
+
+    Args:
+        cursor (str): Cursor from a previous page
+        sort (str): Sort the cursor must belong to
+
+    Returns:
+        tuple: (sort key, filename) of the last card on the previous page
+
+    Raises:
+        ValueError: If the cursor is malformed or was made for another sort
+    """
+    try:
+        payload = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        cursor_sort, key, filename = json.loads(payload)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor") from None
+    if cursor_sort != sort or not isinstance(filename, str):
+        raise ValueError("Cursor does not match the requested sort")
+    return key, filename
+
+
+class CardIndex:
+    """
+    SQLite index of generated cards, safe to share between threads and processes.
+
+    Each thread gets its own connection; the database uses WAL mode so
+    readers are not blocked while a card is being added.
+    """
+
+    def __init__(self, path: str = CARD_INDEX_PATH):
+        """
+        Initialize the index; the database is opened on first use.
+
+        Args:
+            path (str): SQLite database file
+        """
+        self.path = path
+        self._local = threading.local()
+        self._created = False
+
+    def after_fork(self) -> None:
+        """Forget connections inherited from a parent process; call in a forked child before use."""
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Get this thread's connection, creating the schema on first use."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self._created = self._created or not os.path.exists(self.path)
+            connection = sqlite3.connect(self.path, timeout=10)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+            self._local.connection = connection
+        return connection
+
+    def add(self, filename: str, size: int, card_data: Optional[Dict[str, Any]] = None,
+            created_at: Optional[float] = None) -> None:
+        """
+        Add or replace a card in the index.
+
+        Args:
+            filename (str): Card file name in Generated_Cards/
+            size (int): File size in bytes
+            card_data (dict, optional): Generated card data
+            created_at (float, optional): Unix time the card was made, defaults to now
+        """
+        card_data = card_data or {}
+        parsed = _parse_filename(filename)
+        row = (
+            filename,
+            size,
+            card_data.get('card_name') or parsed['card_name'],
+            card_data.get('custom_type'),
+            card_data.get('category'),
+            card_data.get('stat1_name'),
+            _int_or_none(card_data.get('stat1_value')),
+            card_data.get('stat2_name'),
+            _int_or_none(card_data.get('stat2_value')),
+            json.dumps(card_data) if card_data else None,
+            created_at or parsed['created_at'] or time.time(),
+        )
+        connection = self._connect()
+        with connection:
+            connection.execute(f"INSERT OR REPLACE INTO cards ({', '.join(COLUMNS)}) "
+                               f"VALUES ({', '.join('?' for _ in COLUMNS)})", row)
+
+    def remove(self, filename: str) -> None:
+        """
+        Remove a card from the index.
+
+        Args:
+            filename (str): Card file name
+        """
+        connection = self._connect()
+        with connection:
+            connection.execute("DELETE FROM cards WHERE filename = ?", (filename,))
+
+    def get(self, filename: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up one card.
+
+        Args:
+            filename (str): Card file name
+
+        Returns:
+            Optional[dict]: Indexed card, or None if not indexed
+        """
+        row = self._connect().execute("SELECT * FROM cards WHERE filename = ?", (filename,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def list_cards(self, order: str = 'filename', limit: Optional[int] = None, offset: int = 0) -> List[Dict[str, Any]]:
+        """
+        List indexed cards.
+
+        Args:
+            order (str): 'filename', 'newest' or 'oldest'
+            limit (int, optional): Maximum number of cards
+            offset (int): Cards to skip
+
+        Returns:
+            list: Indexed cards
+        """
+        sql = f"SELECT * FROM cards ORDER BY {ORDERS[order]}"
+        params: List[Any] = []
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params += [limit, offset]
+        return [self._to_dict(row) for row in self._connect().execute(sql, params)]
+
+    def page(self, sort: str = 'newest', limit: int = 24, cursor: Optional[str] = None,
+             custom_type: Optional[str] = None, since: Optional[float] = None,
+             until: Optional[float] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Get one page of cards using keyset pagination.
+
+        Pages stay stable while new cards are added, and each page costs the
+        same index seek however deep into the gallery it is.
+
+        Args:
+            sort (str): 'newest', 'oldest', 'stat1' or 'stat2' (highest first)
+            limit (int): Cards per page, capped at MAX_PAGE_SIZE
+            cursor (str, optional): next_cursor from the previous page
+            custom_type (str, optional): Only cards of this personality type
+            since (float, optional): Only cards created at or after this Unix time
+            until (float, optional): Only cards created before this Unix time
+
+        Returns:
+            tuple: (cards, next_cursor), where next_cursor is None on the last page
+
+        Raises:
+            ValueError: If the sort or cursor is invalid
+        """
+        if sort not in PAGE_SORTS:
+            raise ValueError(f"Unknown sort: {sort}")
+        key, direction = PAGE_SORTS[sort]
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+        conditions, params = [], []
+        if custom_type:
+            conditions.append("custom_type = ?")
+            params.append(custom_type)
+        if since is not None:
+            conditions.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("created_at < ?")
+            params.append(until)
+        if cursor:
+            last_key, last_filename = decode_cursor(cursor, sort)
+            op = '<' if direction == 'DESC' else '>'
+            # The plain bound on the key lets SQLite seek the expression indexes
+            conditions.append(f"{key} {op}= ? AND ({key}, filename) {op} (?, ?)")
+            params += [last_key, last_key, last_filename]
+
+        sql = f"SELECT {', '.join(PAGE_COLUMNS)}, {key} AS sort_key FROM cards"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += f" ORDER BY {key} {direction}, filename {direction} LIMIT ?"
+        rows = self._connect().execute(sql, params + [limit + 1]).fetchall()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(sort, rows[-1]['sort_key'], rows[-1]['filename'])
+        cards = [{column: row[column] for column in PAGE_COLUMNS} for row in rows]
+        for card in cards:
+            card['created_at'] = int(card['created_at'])
+        return cards, next_cursor
+
+    def count(self) -> int:
+        """
+        Count indexed cards.
+
+        Returns:
+            int: Number of cards
+        """
+        return self._connect().execute("SELECT COUNT(*) FROM cards").fetchone()[0]
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        """Convert a row to a dict, decoding the stored card data."""
+        card = dict(row)
+        card['card_data'] = json.loads(card['card_data']) if card['card_data'] else None
+        return card
+
+    def rebuild(self, store: ContentStore = card_store) -> Dict[str, int]:
+        """
+        Sync the index with the cards in the card store.
+
+        Cards already indexed keep their metadata; new cards are added with
+        the name and time recovered from their file name, and entries whose
+        card is gone are removed.
+
+        Args:
+            store (ContentStore): Store of generated cards
+
+        Returns:
+            dict: Counts of cards 'added', 'updated' and 'removed'
+        """
+        on_disk = {stored.name: (stored.size, stored.created_at) for stored in store.list_objects()}
+
+        connection = self._connect()
+        indexed = {row['filename']: row['size'] for row in connection.execute("SELECT filename, size FROM cards")}
+        counts = {'added': 0, 'updated': 0, 'removed': 0}
+
+        for filename, (size, mtime) in on_disk.items():
+            if filename not in indexed:
+                self.add(filename, size, created_at=_parse_filename(filename)['created_at'] or mtime)
+                counts['added'] += 1
+            elif indexed[filename] != size:
+                with connection:
+                    connection.execute("UPDATE cards SET size = ? WHERE filename = ?", (size, filename))
+                counts['updated'] += 1
+
+        missing = [(filename,) for filename in indexed if filename not in on_disk]
+        if missing:
+            with connection:
+                connection.executemany("DELETE FROM cards WHERE filename = ?", missing)
+            counts['removed'] = len(missing)
+        return counts
+
+    def ensure_built(self, store: ContentStore = card_store) -> None:
+        """
+        Fill a newly created index from the cards already stored.
+
+        Args:
+            store (ContentStore): Store of generated cards
+        """
+        self._connect()
+        if self._created:
+            counts = self.rebuild(store)
+            print(f"Card index created with {counts['added']} existing cards")
+            self._created = False
+
+
+# Process-wide index used by the web app
+card_index = CardIndex()
+
+
+def main():
+    """Rebuild the card index from the cards stored in Generated_Cards/."""
+    parser = argparse.ArgumentParser(description="Rebuild the gallery card index from stored card files")
+    parser.add_argument("--cards-dir", default=CARDS_DIR, help="Directory of generated cards")
+    parser.add_argument("--index", default=CARD_INDEX_PATH, help="SQLite index file")
+    args = parser.parse_args()
+
+    store = ContentStore(args.cards_dir, backend_from_env(args.cards_dir, "cards/"))
+    imported = store.import_legacy()
+    if imported:
+        print(f"Moved {imported} flat card files into the card store")
+    synced = store.sync_names()
+    if synced:
+        print(f"Found {synced} cards stored by other instances")
+    counts = CardIndex(args.index).rebuild(store)
+    print(f"Card index rebuilt: {counts['added']} added, {counts['updated']} updated, {counts['removed']} removed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Card Jobs Module
+
+Runs card generation as background jobs, so /generate can return as soon as
+the upload is validated and saved. Job state (stage, result or error) and
+each job's progress events are kept in SQLite, so any web worker process on
+the host can answer a status poll or stream events for a job started by
+another.
+"""
+
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Stages a job moves through; done and failed are final
+JOB_STAGES = ('queued', 'llm', 'render', 'done', 'failed')
+FINAL_STAGES = ('done', 'failed')
+
+# Error recorded for jobs still waiting for a worker when the process shuts down
+SHUTDOWN_ERROR = "Server restarting, please try again"
+
+# Job configuration, overridable via environment
+CARD_JOBS_PATH = os.environ.get('CARD_JOBS_PATH', os.path.join("Generated_Cards", "jobs.sqlite3"))
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 4))
+JOB_QUEUE = int(os.environ.get('JOB_QUEUE', 16))
+# A job not updated for this long was lost with the process running it
+JOB_STALE_SECONDS = float(os.environ.get('JOB_STALE_SECONDS', 300))
+# Finished jobs are deleted after this long
+JOB_RETENTION_SECONDS = float(os.environ.get('JOB_RETENTION_SECONDS', 24 * 3600))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    stage TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_created_at ON jobs (created_at);
+CREATE TABLE IF NOT EXISTS job_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL,
+    event TEXT NOT NULL,
+    data TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS job_events_job ON job_events (job_id, id);
+"""
+
+
+class JobQueueFull(Exception):
+    """Raised when too many jobs are already waiting."""
+
+
+class JobStore:
+    """
+    SQLite table of generation jobs and their progress.
+
+    Each thread gets its own connection; the database uses WAL mode so
+    status polls are not blocked while a job is being updated. Waiters in
+    this process are woken as soon as an event is added; events added by
+    other processes are seen on the next poll.
+    """
+
+    def __init__(self, path: str = CARD_JOBS_PATH):
+        """
+        Initialize the store; the database is opened on first use.
+
+        Args:
+            path (str): SQLite database file
+        """
+        self.path = path
+        self._local = threading.local()
+        self._changed = threading.Condition()
+
+    def after_fork(self) -> None:
+        """Forget connections inherited from a parent process; call in a forked child before use."""
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Get this thread's connection, creating the schema on first use."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=10)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+            self._local.connection = connection
+        return connection
+
+    def _insert_event(self, connection: sqlite3.Connection, job_id: str, event: str,
+                      data: Dict[str, Any], now: float) -> None:
+        connection.execute("INSERT INTO job_events (job_id, event, data, created_at) VALUES (?, ?, ?, ?)",
+                           (job_id, event, json.dumps(data), now))
+
+    def _notify(self) -> None:
+        with self._changed:
+            self._changed.notify_all()
+
+    def create(self, events: Iterable[Tuple[str, Dict[str, Any]]] = ()) -> str:
+        """
+        Add a queued job, deleting jobs past the retention period.
+
+        Args:
+            events: (event, data) pairs that happened before the job was queued, e.g. the upload
+
+        Returns:
+            str: New job id
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        connection = self._connect()
+        with connection:
+            expired = now - JOB_RETENTION_SECONDS
+            connection.execute("DELETE FROM job_events WHERE job_id IN (SELECT id FROM jobs WHERE created_at < ?)",
+                               (expired,))
+            connection.execute("DELETE FROM jobs WHERE created_at < ?", (expired,))
+            connection.execute("INSERT INTO jobs (id, stage, created_at, updated_at) VALUES (?, 'queued', ?, ?)",
+                               (job_id, now, now))
+            for event, data in [*events, ('queued', {})]:
+                self._insert_event(connection, job_id, event, data, now)
+        self._notify()
+        return job_id
+
+    def add_event(self, job_id: str, event: str, **data: Any) -> None:
+        """
+        Record a progress event; stage names also move the job to that stage.
+
+        Args:
+            job_id (str): Job id
+            event (str): Event name, e.g. 'llm_attempt', 'card_data' or a stage from JOB_STAGES
+            **data: JSON-serializable event details
+        """
+        now = time.time()
+        connection = self._connect()
+        with connection:
+            self._insert_event(connection, job_id, event, data, now)
+            if event in JOB_STAGES:
+                connection.execute("UPDATE jobs SET stage = ?, updated_at = ? WHERE id = ?", (event, now, job_id))
+            else:
+                connection.execute("UPDATE jobs SET updated_at = ? WHERE id = ?", (now, job_id))
+        self._notify()
+
+    def events(self, job_id: str, after: int = 0) -> List[Dict[str, Any]]:
+        """
+        Get a job's events in order.
+
+        Args:
+            job_id (str): Job id
+            after (int): Only return events with a larger id, e.g. the last one seen
+
+        Returns:
+            list: {'id', 'event', 'data'} per event
+        """
+        rows = self._connect().execute("SELECT id, event, data FROM job_events WHERE job_id = ? AND id > ? "
+                                       "ORDER BY id", (job_id, after)).fetchall()
+        return [{'id': row['id'], 'event': row['event'], 'data': json.loads(row['data'])} for row in rows]
+
+    def wait(self, timeout: float) -> None:
+        """
+        Block until an event is added in this process or the timeout passes.
+
+        Args:
+            timeout (float): Seconds to wait at most
+        """
+        with self._changed:
+            self._changed.wait(timeout)
+
+    def set_stage(self, job_id: str, stage: str, result: Optional[Dict[str, Any]] = None,
+                  error: Optional[str] = None) -> None:
+        """
+        Record a job's progress.
+
+        Args:
+            job_id (str): Job id
+            stage (str): One of JOB_STAGES
+            result (dict, optional): Result of a finished job
+            error (str, optional): Error message of a failed job
+
+        Raises:
+            ValueError: If the stage is unknown
+        """
+        if stage not in JOB_STAGES:
+            raise ValueError(f"Unknown job stage: {stage}")
+        now = time.time()
+        data = {key: value for key, value in (('result', result), ('error', error)) if value is not None}
+        connection = self._connect()
+        with connection:
+            connection.execute("UPDATE jobs SET stage = ?, result = ?, error = ?, updated_at = ? WHERE id = ?",
+                               (stage, json.dumps(result) if result is not None else None, error, now, job_id))
+            self._insert_event(connection, job_id, stage, data, now)
+        self._notify()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a job.
+
+        Args:
+            job_id (str): Job id
+
+        Returns:
+            Optional[dict]: job_id, stage, result, error, created_at and updated_at, or None if unknown
+        """
+        row = self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = {
+            'job_id': row['id'],
+            'stage': row['stage'],
+            'result': json.loads(row['result']) if row['result'] else None,
+            'error': row['error'],
+            'created_at': row['created_at'],
+            'updated_at': row['updated_at']
+        }
+        if job['stage'] not in FINAL_STAGES and time.time() - job['updated_at'] > JOB_STALE_SECONDS:
+            job['stage'] = 'failed'
+            job['error'] = "Card generation was interrupted, please try again"
+        return job
+
+
+class JobRunner:
+    """
+    Bounded thread pool that runs generation jobs and records their stages.
+
+    Jobs spend most of their time waiting on LLM APIs and the render pool,
+    so threads are enough; the executor is created on first use.
+    """
+
+    def __init__(self, store: JobStore, max_workers: int, max_queue: int):
+        """
+        Initialize the runner.
+
+        Args:
+            store (JobStore): Where job progress is recorded
+            max_workers (int): Jobs run at once
+            max_queue (int): Jobs allowed to wait for a free worker
+        """
+        self.store = store
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._counters = {'submitted': 0, 'done': 0, 'failed': 0, 'rejected': 0}
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Create the thread pool on first use."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='card-job')
+            return self._executor
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    def submit(self, work: Callable[..., Dict[str, Any]], *args: Any,
+               events: Iterable[Tuple[str, Dict[str, Any]]] = ()) -> str:
+        """
+        Queue a job.
+
+        The work callable is called as work(*args, progress=callback), where
+        callback(event, **data) records a progress event; the 'llm' and
+        'render' events also set the job's stage. It returns a dict with
+        'success' and either the result fields or an 'error' message.
+
+        Args:
+            work: Function doing the generation
+            *args: Arguments for the function
+            events: (event, data) pairs to record before the job is queued
+
+        Returns:
+            str: Job id for status polling
+
+        Raises:
+            JobQueueFull: If too many jobs are already waiting
+        """
+        if not self._slots.acquire(blocking=False):
+            self._count('rejected')
+            raise JobQueueFull("Too many cards are being generated, please try again shortly")
+        try:
+            job_id = self.store.create(events)
+            future = self._get_executor().submit(self._run, job_id, work, args)
+            future.add_done_callback(lambda done: self._cancelled(job_id, done))
+        except BaseException:
+            self._slots.release()
+            raise
+        self._count('submitted')
+        return job_id
+
+    def _run(self, job_id: str, work: Callable[..., Dict[str, Any]], args: tuple) -> None:
+        """Run one job on a pool thread, recording its final stage."""
+        try:
+            result = work(*args, progress=lambda event, **data: self.store.add_event(job_id, event, **data))
+            if result.get('success'):
+                self.store.set_stage(job_id, 'done', result=result)
+                self._count('done')
+            else:
+                self.store.set_stage(job_id, 'failed', error=result.get('error') or "Card generation failed")
+                self._count('failed')
+        except Exception as e:
+            print(f"[JOB] Job {job_id} failed: {e}")
+            traceback.print_exc()
+            self.store.set_stage(job_id, 'failed', error=f"Unexpected error: {e}")
+            self._count('failed')
+        finally:
+            self._slots.release()
+
+    def _cancelled(self, job_id: str, future: Future) -> None:
+        """Fail a job cancelled before it started, so its pollers are not left waiting."""
+        if not future.cancelled():
+            return
+        try:
+            self.store.set_stage(job_id, 'failed', error=SHUTDOWN_ERROR)
+        except sqlite3.Error as e:
+            print(f"[ERROR] Could not fail cancelled job {job_id}: {e}")
+        self._count('failed')
+        self._slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report runner configuration and counters.
+
+        Returns:
+            dict: Worker count, queue limit and job counters
+        """
+        with self._lock:
+            return {
+                'workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'started': self._executor is not None,
+                **self._counters
+            }
+
+    def shutdown(self) -> None:
+        """Wait for running jobs to finish; jobs still queued are cancelled and marked failed."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+# Process-wide job store and runner used by the web app
+job_store = JobStore()
+job_runner = JobRunner(job_store, JOB_WORKERS, JOB_QUEUE)
+atexit.register(job_runner.shutdown)
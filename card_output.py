@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Card Output Module
+
+This module describes an encoded card and the sinks it can be persisted
+to. Rendering produces a RenderedCard held in memory; writing it to
+Generated_Cards/, keeping it in an in-memory cache or handing it to another
+store is left to whichever sinks the caller passes in.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+from PIL import Image
+
+# Default budget for recently rendered cards kept in memory, overridable via environment
+DEFAULT_MEMORY_CACHE_MB = 32
+
+
+class RenderedCard(NamedTuple):
+    """An encoded card image and its metadata."""
+    filename: str
+    data: bytes
+    format: str
+    width: int
+    height: int
+    encode_seconds: float = 0.0
+
+    @property
+    def size(self) -> int:
+        """Encoded size in bytes."""
+        return len(self.data)
+
+    @property
+    def mime_type(self) -> str:
+        """MIME type of the encoded image."""
+        Image.init()
+        return Image.MIME.get(self.format.upper(), 'application/octet-stream')
+
+
+class CardSink:
+    """
+    Destination for rendered cards.
+
+    Subclasses implement save() and, if they can serve cards back, load().
+    """
+
+    def save(self, card: RenderedCard) -> str:
+        """
+        Store a rendered card.
+
+        Args:
+            card (RenderedCard): Card to store
+
+        Returns:
+            str: Location of the stored card
+        """
+        raise NotImplementedError
+
+    def load(self, filename: str) -> Optional[bytes]:
+        """
+        Fetch a stored card's encoded bytes.
+
+        Args:
+            filename (str): Card file name
+
+        Returns:
+            Optional[bytes]: Encoded card, or None if this sink does not have it
+        """
+        return None
+
+
+class DiskSink(CardSink):
+    """Writes cards as files in a directory."""
+
+    def __init__(self, directory: str = "Generated_Cards"):
+        """
+        Initialize the sink.
+
+        Args:
+            directory (str): Directory cards are written to
+        """
+        self.directory = directory
+
+    def save(self, card: RenderedCard) -> str:
+        os.makedirs(self.directory or '.', exist_ok=True)
+        output_path = os.path.join(self.directory, card.filename)
+        with open(output_path, 'wb') as card_file:
+            card_file.write(card.data)
+        return output_path
+
+    def load(self, filename: str) -> Optional[bytes]:
+        path = os.path.join(self.directory, filename)
+        if not os.path.isfile(path):
+            return None
+        with open(path, 'rb') as card_file:
+            return card_file.read()
+
+
+class MemorySink(CardSink):
+    """
+    Thread-safe LRU of recently rendered cards with a total byte budget.
+    """
+
+    def __init__(self, max_bytes: int):
+        """
+        Initialize the sink.
+
+        Args:
+            max_bytes (int): Maximum total size of cached cards
+        """
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, RenderedCard]" = OrderedDict()
+        self._current_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def save(self, card: RenderedCard) -> str:
+        if card.size <= self.max_bytes:
+            with self._lock:
+                previous = self._entries.pop(card.filename, None)
+                if previous is not None:
+                    self._current_bytes -= previous.size
+                self._entries[card.filename] = card
+                self._current_bytes += card.size
+                while self._current_bytes > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._current_bytes -= evicted.size
+        return f"memory:{card.filename}"
+
+    def get(self, filename: str) -> Optional[RenderedCard]:
+        """
+        Fetch a cached card with its metadata.
+
+        Args:
+            filename (str): Card file name
+
+        Returns:
+            Optional[RenderedCard]: Cached card, or None on a miss
+        """
+        with self._lock:
+            card = self._entries.get(filename)
+            if card is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(filename)
+            self.hits += 1
+            return card
+
+    def load(self, filename: str) -> Optional[bytes]:
+        card = self.get(filename)
+        return card.data if card else None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report cache usage counters.
+
+        Returns:
+            dict: Entry count, byte usage and hit/miss counters
+        """
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+def save_card(card: RenderedCard, sinks: Iterable[CardSink]) -> List[str]:
+    """
+    Store a rendered card in every sink.
+
+    Args:
+        card (RenderedCard): Card to store
+        sinks: Sinks to write to, in order
+
+    Returns:
+        list: Location reported by each sink
+    """
+    return [sink.save(card) for sink in sinks]
+
+
+# Recently rendered cards kept in this process, so the web app can serve a
+# new card without reading it back from disk
+recent_cards = MemorySink(int(float(os.environ.get('CARD_MEMORY_CACHE_MB', DEFAULT_MEMORY_CACHE_MB)) * 1024 * 1024))
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Card Photos Module
+
+This module loads uploaded photos at the smallest scale that still fills
+the card's photo frame. JPEGs are decoded at reduced size with draft mode,
+other formats are shrunk with reduce() before the final LANCZOS resize, and
+EXIF orientation is applied along the way.
+"""
+
+import os
+from typing import Tuple
+from PIL import Image
+
+# Decoded photos are kept at least this many times the final size before
+# the LANCZOS pass, matching Pillow's thumbnail() reducing_gap for quality
+REDUCING_GAP = 2
+
+# Largest number of pixels we are willing to decode for a single photo
+DEFAULT_MAX_PHOTO_PIXELS = 64_000_000
+MAX_PHOTO_PIXELS = int(os.environ.get('CARD_PHOTO_MAX_PIXELS', DEFAULT_MAX_PHOTO_PIXELS))
+
+# EXIF orientation tag and the transpose that undoes each orientation
+EXIF_ORIENTATION = 0x0112
+ORIENTATION_TRANSPOSE = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90,
+}
+
+
+def fit_size(size: Tuple[int, int], box: Tuple[int, int]) -> Tuple[int, int]:
+    """
+    Scale a size to fit inside a box while keeping its aspect ratio.
+
+    Args:
+        size (tuple): (width, height) of the photo
+        box (tuple): (width, height) of the frame
+
+    Returns:
+        tuple: (width, height) of the fitted photo
+    """
+    width, height = size
+    box_width, box_height = box
+    aspect_ratio = height / width
+    if aspect_ratio > box_height / box_width:
+        return int(box_height / aspect_ratio), box_height
+    return box_width, int(box_width * aspect_ratio)
+
+
+def load_card_photo(source_image_path: str, box: Tuple[int, int]) -> Image.Image:
+    """
+    Load a photo upright, scaled to fit inside a frame.
+
+    Args:
+        source_image_path (str): Path to the photo
+        box (tuple): (width, height) of the frame to fit
+
+    Returns:
+        PIL.Image: RGB photo fitted inside box
+
+    Raises:
+        ValueError: If the photo would decode to more than MAX_PHOTO_PIXELS
+    """
+    with Image.open(source_image_path) as source_img:
+        orientation = source_img.getexif().get(EXIF_ORIENTATION, 1)
+        transpose = ORIENTATION_TRANSPOSE.get(orientation)
+        rotated = transpose in (Image.Transpose.TRANSPOSE, Image.Transpose.TRANSVERSE,
+                                Image.Transpose.ROTATE_90, Image.Transpose.ROTATE_270)
+
+        # Work out the final size from the upright dimensions, then map the
+        # size we need to decode back into the stored orientation
+        stored_width, stored_height = source_img.size
+        upright = (stored_height, stored_width) if rotated else (stored_width, stored_height)
+        new_width, new_height = fit_size(upright, box)
+        decode_size = (new_height, new_width) if rotated else (new_width, new_height)
+        wanted = (decode_size[0] * REDUCING_GAP, decode_size[1] * REDUCING_GAP)
+
+        # JPEG can decode directly at 1/2, 1/4 or 1/8 scale
+        if source_img.format == 'JPEG':
+            source_img.draft('RGB', wanted)
+
+        width, height = source_img.size
+        if width * height > MAX_PHOTO_PIXELS:
+            raise ValueError(f"Photo is too large to process ({width}x{height} pixels)")
+
+        photo = source_img.convert('RGB') if source_img.mode != 'RGB' else source_img.copy()
+
+    # Cheap box reduction for anything still far larger than needed
+    factor = min(photo.width // wanted[0], photo.height // wanted[1])
+    if factor > 1:
+        photo = photo.reduce(factor)
+
+    if transpose is not None:
+        photo = photo.transpose(transpose)
+
+    return photo.resize((new_width, new_height), Image.Resampling.LANCZOS)
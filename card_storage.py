@@ -0,0 +1,564 @@
+#!/usr/bin/env python3
+"""
+Card Storage Module
+
+This module stores generated cards and uploaded photos by content hash.
+Objects live under fanned-out keys (objects/ab/cd/<sha256>.<ext>) in a
+storage backend (local directory or S3-compatible bucket), are written
+atomically and are stored once however many times they are uploaded. Name
+records map public names (the file names used in URLs) to content hashes,
+so card URLs stay stable; a local SQLite table caches them for fast lookups.
+"""
+
+import hashlib
+import json
+import mimetypes
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import BinaryIO, Iterator, List, NamedTuple, Optional, Tuple
+
+from card_output import CardSink, RenderedCard
+from storage_backends import LocalBackend, StorageBackend, backend_from_env, check_key, write_atomic
+
+# Hex characters per key level and number of levels under objects/
+FANOUT_WIDTH = 2
+FANOUT_DEPTH = 2
+
+# Lifetime of presigned URLs handed to browsers, overridable via environment
+CARD_PRESIGN_EXPIRES = int(os.environ.get('CARD_PRESIGN_EXPIRES', 3600))
+# Unknown names are remembered this long, so 404s and bot probes do not each cost a backend request
+CARD_NAME_MISS_SECONDS = float(os.environ.get('CARD_NAME_MISS_SECONDS', 30))
+MAX_NAME_MISSES = 10000
+# Budget for objects downloaded into cache/; the least recently used are deleted beyond it
+CARD_CACHE_MB = float(os.environ.get('CARD_CACHE_MB', 512))
+
+NAMES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS names (
+    name TEXT PRIMARY KEY,
+    digest TEXT NOT NULL,
+    ext TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS names_digest ON names (digest);
+"""
+
+
+def content_digest(data: bytes) -> str:
+    """
+    Hash content for addressing.
+
+    Args:
+        data (bytes): Object content
+
+    Returns:
+        str: SHA-256 hex digest
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+def check_name(name: str) -> str:
+    """
+    Reject public names that are not plain file names, so a name record cannot land outside names/.
+
+    Args:
+        name (str): Public name, e.g. 'Sir_Lags_A_Lot_1760000000.png'
+
+    Returns:
+        str: The name, unchanged
+
+    Raises:
+        ValueError: If the name is empty, has a path separator or starts with a dot
+    """
+    if not name or '/' in name or name.startswith('.'):
+        raise ValueError(f"Invalid public name: {name!r}")
+    check_key(f"names/{name}")
+    return name
+
+
+class DirectoryBudget:
+    """
+    Keeps a directory of files that can be made again under a size budget.
+
+    Callers touch() a file when they use it and report each file they add;
+    once the directory is over budget the least recently used files are
+    deleted. The size is counted once and then tracked, so adding a file
+    does not scan the directory until it is over budget.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        """
+        Initialize the budget.
+
+        Args:
+            directory (str): Directory to keep in budget, including subdirectories
+            max_bytes (int): Size budget in bytes
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._bytes: Optional[int] = None
+
+    def _files(self) -> List[Tuple[float, str, int]]:
+        """List files as (last used, path, size), skipping writes in progress."""
+        files = []
+        for directory, _, filenames in os.walk(self.directory):
+            for filename in filenames:
+                if filename.endswith('.tmp'):
+                    continue
+                path = os.path.join(directory, filename)
+                try:
+                    file_stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files.append((file_stat.st_mtime, path, file_stat.st_size))
+        return files
+
+    def touch(self, path: str) -> bool:
+        """
+        Mark a file as recently used, so trimming deletes others first.
+
+        Args:
+            path (str): File in the directory
+
+        Returns:
+            bool: True if the file exists
+        """
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def added(self, size: int) -> None:
+        """
+        Account for a new file, deleting the least recently used once over budget.
+
+        Args:
+            size (int): Size of the file in bytes
+        """
+        with self._lock:
+            if self._bytes is None:
+                self._bytes = sum(file_size for _, _, file_size in self._files())
+            else:
+                self._bytes += size
+            if self._bytes <= self.max_bytes:
+                return
+            # Trim to 90% of the budget so the next few files do not each trigger a scan
+            files = sorted(self._files())
+            total = sum(file_size for _, _, file_size in files)
+            for _, path, file_size in files:
+                if total <= self.max_bytes * 0.9:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= file_size
+            self._bytes = total
+
+
+class StoredObject(NamedTuple):
+    """A named object in a content store."""
+    name: str
+    digest: Optional[str]
+    key: str
+    size: int
+    created_at: float
+
+    @property
+    def content_type(self) -> str:
+        """MIME type guessed from the object's name."""
+        return mimetypes.guess_type(self.name)[0] or 'application/octet-stream'
+
+
+class ContentStore:
+    """
+    Content-addressed object store with a name-to-hash mapping.
+
+    Objects and name records (names/<name>, a small JSON document) are kept
+    in the backend, so instances sharing a bucket see each other's cards.
+    Each instance caches name records in root/names.sqlite3, briefly
+    remembers names the backend does not have, and downloads objects it
+    needs as files into root/cache/, up to a size budget.
+
+    Files placed directly in the root directory by older versions are still
+    found by name until import_legacy() moves them into the store.
+    """
+
+    def __init__(self, root: str, backend: Optional[StorageBackend] = None,
+                 legacy_extensions: Tuple[str, ...] = ('.png', '.jpg', '.jpeg'),
+                 miss_ttl: float = CARD_NAME_MISS_SECONDS, cache_max_bytes: int = int(CARD_CACHE_MB * 1024 * 1024)):
+        """
+        Initialize the store; the name cache is opened on first use.
+
+        Args:
+            root (str): Local directory, e.g. 'Generated_Cards'
+            backend (StorageBackend, optional): Where objects are kept, defaults to files under root
+            legacy_extensions (tuple): Extensions of flat files to find and import from the root
+            miss_ttl (float): Seconds a name the backend does not have is answered as unknown
+                without asking it again
+            cache_max_bytes (int): Size budget for objects downloaded into root/cache/
+        """
+        self.root = root
+        self.backend = backend or LocalBackend(root)
+        self.legacy_extensions = legacy_extensions
+        self.names_path = os.path.join(root, "names.sqlite3")
+        self.cache_dir = os.path.join(root, "cache")
+        self.miss_ttl = miss_ttl
+        self.cache_max_bytes = cache_max_bytes
+        self._cache = DirectoryBudget(self.cache_dir, cache_max_bytes)
+        self._legacy = LocalBackend(root)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._misses: "OrderedDict[str, float]" = OrderedDict()
+
+    def after_fork(self) -> None:
+        """Forget connections inherited from a parent process; call in a forked child before use."""
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Get this thread's connection to the name cache."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            os.makedirs(self.root, exist_ok=True)
+            connection = sqlite3.connect(self.names_path, timeout=10)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(NAMES_SCHEMA)
+            self._local.connection = connection
+        return connection
+
+    def _cache_name(self, connection: sqlite3.Connection, record: dict) -> None:
+        connection.execute("INSERT OR REPLACE INTO names (name, digest, ext, size, created_at) VALUES (?, ?, ?, ?, ?)",
+                           (record['name'], record['digest'], record['ext'], record['size'], record['created_at']))
+
+    def _from_record(self, record) -> StoredObject:
+        return StoredObject(record['name'], record['digest'], self.object_key(record['digest'], record['ext']),
+                            record['size'], record['created_at'])
+
+    def _recent_miss(self, name: str) -> bool:
+        """
+        Check whether the backend was asked for a name and did not have it within miss_ttl.
+
+        Names this instance maps are found in the name cache before this is
+        checked, so only names from other instances can be answered late.
+        """
+        with self._lock:
+            missed_at = self._misses.get(name)
+            if missed_at is None:
+                return False
+            if time.monotonic() - missed_at < self.miss_ttl:
+                return True
+            del self._misses[name]
+            return False
+
+    def _remember_miss(self, name: str) -> None:
+        with self._lock:
+            self._misses[name] = time.monotonic()
+            self._misses.move_to_end(name)
+            while len(self._misses) > MAX_NAME_MISSES:
+                self._misses.popitem(last=False)
+
+    def _backend_for(self, stored: StoredObject) -> StorageBackend:
+        """Legacy flat files are always local; everything else is in the backend."""
+        return self.backend if stored.digest else self._legacy
+
+    def object_key(self, digest: str, ext: str) -> str:
+        """
+        Get the sharded key of an object.
+
+        Args:
+            digest (str): Content hash
+            ext (str): File extension without the dot
+
+        Returns:
+            str: Key such as 'objects/ab/cd/abcd....png'
+        """
+        shards = [digest[i * FANOUT_WIDTH:(i + 1) * FANOUT_WIDTH] for i in range(FANOUT_DEPTH)]
+        return "/".join(["objects", *shards, f"{digest}.{ext}"])
+
+    def put(self, data: bytes, ext: str) -> Tuple[str, str]:
+        """
+        Store content once, keyed by its hash.
+
+        Args:
+            data (bytes): Object content
+            ext (str): File extension without the dot
+
+        Returns:
+            tuple: (digest, key) of the stored object
+        """
+        digest = content_digest(data)
+        key = self.object_key(digest, ext.lower())
+        if self.backend.stat(key) is None:
+            self.backend.put(key, data, mimetypes.guess_type(key)[0])
+        return digest, key
+
+    def put_named(self, name: str, data: bytes, created_at: Optional[float] = None) -> str:
+        """
+        Store content and map a public name to it.
+
+        If the name already maps to different content, a short hash is added
+        to the name so neither object is overwritten.
+
+        Args:
+            name (str): Requested public name, e.g. 'Sir_Lags_A_Lot_1760000000.png'
+            data (bytes): Object content
+            created_at (float, optional): Unix time to record, defaults to now
+
+        Returns:
+            str: Name the object was stored under
+
+        Raises:
+            ValueError: If the name is not a plain file name (see check_name)
+        """
+        ext = os.path.splitext(check_name(name))[1].lstrip('.').lower() or 'bin'
+        digest, _ = self.put(data, ext)
+        return self._map_name(name, digest, ext, len(data), created_at)
+
+    def put_named_file(self, name: str, fileobj: BinaryIO, digest: str, size: int,
+                       created_at: Optional[float] = None) -> str:
+        """
+        Store already-hashed content from a file object and map a public name to it.
+
+        Like put_named, but the content is copied from the file instead of
+        being held in memory, e.g. an upload spooled to disk while it was hashed.
+
+        Args:
+            name (str): Requested public name
+            fileobj: Readable binary file positioned anywhere; it is rewound first
+            digest (str): SHA-256 hex digest of the content (see content_digest)
+            size (int): Content size in bytes
+            created_at (float, optional): Unix time to record, defaults to now
+
+        Returns:
+            str: Name the object was stored under
+
+        Raises:
+            ValueError: If the name is not a plain file name (see check_name)
+        """
+        ext = os.path.splitext(check_name(name))[1].lstrip('.').lower() or 'bin'
+        key = self.object_key(digest, ext)
+        if self.backend.stat(key) is None:
+            fileobj.seek(0)
+            self.backend.put_file(key, fileobj, mimetypes.guess_type(key)[0])
+        return self._map_name(name, digest, ext, size, created_at)
+
+    def _map_name(self, name: str, digest: str, ext: str, size: int, created_at: Optional[float]) -> str:
+        """
+        Record a name for a stored object, adding a short hash if the name is taken.
+
+        The name is claimed in the name cache with a plain INSERT before its
+        record is written to the backend, so of two concurrent requests for
+        the same name only one gets it and the other falls back to the hashed
+        name instead of overwriting the first mapping.
+
+        Raises:
+            ValueError: If the name is not a plain file name
+        """
+        check_name(name)
+        stem, dot_ext = os.path.splitext(name)
+        record = {'name': name, 'digest': digest, 'ext': ext, 'size': size,
+                  'created_at': created_at or time.time()}
+        connection = self._connect()
+        existing = self.lookup(name)
+        if existing is None:
+            with connection:
+                claimed = connection.execute(
+                    "INSERT OR IGNORE INTO names (name, digest, ext, size, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (name, digest, ext, size, record['created_at'])).rowcount == 1
+            if claimed:
+                self.backend.put(f"names/{name}", json.dumps(record).encode('utf-8'), 'application/json')
+                return name
+            existing = self.lookup(name)
+        if existing is not None and existing.digest == digest:
+            return name
+
+        # Taken by other content; the hashed name can only ever map to this content
+        record['name'] = name = f"{stem}_{digest[:8]}{dot_ext}"
+        self.backend.put(f"names/{name}", json.dumps(record).encode('utf-8'), 'application/json')
+        with connection:
+            self._cache_name(connection, record)
+        return name
+
+    def lookup(self, name: str) -> Optional[StoredObject]:
+        """
+        Find an object by public name.
+
+        Args:
+            name (str): Public name
+
+        Returns:
+            Optional[StoredObject]: Object details, or None if the name is unknown
+        """
+        connection = self._connect()
+        row = connection.execute("SELECT * FROM names WHERE name = ?", (name,)).fetchone()
+        if row:
+            return self._from_record(row)
+
+        # Named by another instance sharing the backend
+        if name and '/' not in name and not self._recent_miss(name):
+            record_data = self.backend.get(f"names/{name}")
+            if record_data:
+                record = json.loads(record_data)
+                with connection:
+                    self._cache_name(connection, record)
+                return self._from_record(record)
+            self._remember_miss(name)
+
+        # Files written flat into the root before the store existed
+        if name.lower().endswith(self.legacy_extensions):
+            legacy_stat = self._legacy.stat(name)
+            if legacy_stat:
+                return StoredObject(name, None, name, legacy_stat.size, legacy_stat.modified)
+        return None
+
+    def read(self, name: str) -> Optional[bytes]:
+        """
+        Read an object by public name.
+
+        Args:
+            name (str): Public name
+
+        Returns:
+            Optional[bytes]: Object content, or None if the name is unknown
+        """
+        stored = self.lookup(name)
+        if stored is None:
+            return None
+        return self._backend_for(stored).get(stored.key)
+
+    def local_path(self, name: str) -> Optional[str]:
+        """
+        Get a file path for an object, downloading it into the local cache if needed.
+
+        Args:
+            name (str): Public name
+
+        Returns:
+            Optional[str]: Path of the object on this machine, or None if the name is unknown
+        """
+        stored = self.lookup(name)
+        if stored is None:
+            return None
+        backend = self._backend_for(stored)
+        path = backend.local_path(stored.key)
+        if path:
+            return path
+
+        path = os.path.join(self.cache_dir, *stored.key.split('/'))
+        if not self._cache.touch(path):
+            data = backend.get(stored.key)
+            if data is None:
+                return None
+            write_atomic(path, data)
+            self._cache.added(len(data))
+        return path
+
+    def presigned_url(self, name: str, as_attachment: bool = False,
+                      expires: int = CARD_PRESIGN_EXPIRES) -> Optional[str]:
+        """
+        Get a URL a browser can fetch an object from without going through the app.
+
+        Args:
+            name (str): Public name
+            as_attachment (bool): Serve as a download under the public name
+            expires (int): Seconds the URL stays valid
+
+        Returns:
+            Optional[str]: Presigned URL, or None if the name is unknown or the backend cannot presign
+        """
+        stored = self.lookup(name)
+        if stored is None or not stored.digest:
+            return None
+        return self.backend.presigned_url(stored.key, expires, stored.content_type,
+                                          name if as_attachment else None)
+
+    def list_objects(self) -> Iterator[StoredObject]:
+        """
+        List every named object this instance knows about.
+
+        Yields:
+            StoredObject: Named objects, oldest first
+        """
+        rows = self._connect().execute("SELECT * FROM names ORDER BY created_at").fetchall()
+        for row in rows:
+            yield self._from_record(row)
+
+    def sync_names(self) -> int:
+        """
+        Cache name records added to the backend by other instances.
+
+        Returns:
+            int: Number of names added to the local cache
+        """
+        connection = self._connect()
+        known = {row['name'] for row in connection.execute("SELECT name FROM names")}
+        added = 0
+        for key in self.backend.list("names/"):
+            name = key[len("names/"):]
+            if name in known:
+                continue
+            record_data = self.backend.get(key)
+            if record_data:
+                with connection:
+                    self._cache_name(connection, json.loads(record_data))
+                added += 1
+        return added
+
+    def import_legacy(self) -> int:
+        """
+        Move files stored flat in the root into the store under the same name.
+
+        Returns:
+            int: Number of files imported
+        """
+        if not os.path.isdir(self.root):
+            return 0
+        imported = 0
+        with os.scandir(self.root) as entries:
+            legacy = [entry for entry in entries
+                      if entry.is_file() and entry.name.lower().endswith(self.legacy_extensions)]
+        for entry in legacy:
+            try:
+                with open(entry.path, 'rb') as legacy_file:
+                    data = legacy_file.read()
+                created_at = entry.stat().st_mtime
+            except FileNotFoundError:
+                continue  # Imported by another process
+            connection = self._connect()
+            if not connection.execute("SELECT 1 FROM names WHERE name = ?", (entry.name,)).fetchone():
+                self.put_named(entry.name, data, created_at)
+            self._legacy.delete(entry.name)
+            imported += 1
+        return imported
+
+
+class StoreSink(CardSink):
+    """Card sink that saves cards into a content store."""
+
+    def __init__(self, store: ContentStore):
+        """
+        Initialize the sink.
+
+        Args:
+            store (ContentStore): Store to save cards in
+        """
+        self.store = store
+
+    def save(self, card: RenderedCard) -> str:
+        key = self.store.lookup(self.store.put_named(card.filename, card.data)).key
+        return self.store.backend.local_path(key) or f"{self.store.backend.name}:{key}"
+
+    def load(self, filename: str) -> Optional[bytes]:
+        return self.store.read(filename)
+
+
+# Process-wide stores for generated cards and uploaded photos, in the backend chosen by CARD_STORAGE_BACKEND
+card_store = ContentStore("Generated_Cards", backend_from_env("Generated_Cards", "cards/"))
+photo_store = ContentStore("Original_Photos", backend_from_env("Original_Photos", "photos/"),
+                           legacy_extensions=('.png', '.jpg', '.jpeg', '.gif', '.bmp'))
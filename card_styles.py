@@ -10,6 +10,15 @@ and pattern configurations.
 # Style configuration
 STYLE_VERSION = "modern"  # "modern" or "classic"
 
+# The 20 personality types the LLM can assign to a card
+CUSTOM_TYPES = (
+    "Mood", "Vibe", "Spicy", "Juice",
+    "NPC", "Glitch", "Lag", "Ping", "Debug", "Firewall",
+    "Main", "Flex", "IYKYK", "Cringe",
+    "Clapback", "Sus", "Cap", "Send",
+    "Ghost", "Simp"
+)
+
 
 def get_type_pattern(custom_type: str) -> str:
     """
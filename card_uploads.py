@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Card Uploads Module
+
+This module receives uploaded photos and checks them before any paid work
+starts. The upload is streamed into a spooled buffer (memory, spilling to
+disk for large files) while it is hashed, then its image header is verified
+and its dimensions checked against the limits the card renderer accepts, so
+a corrupt, unsupported or oversized file is rejected in milliseconds instead
+of after an LLM call.
+"""
+
+import hashlib
+import os
+import tempfile
+from typing import BinaryIO, NamedTuple, Optional, Tuple
+from PIL import Image
+
+from card_photos import MAX_PHOTO_PIXELS
+
+# Image formats accepted for card photos (Pillow format names)
+UPLOAD_FORMATS = ('JPEG', 'PNG', 'GIF', 'BMP')
+
+# Uploads up to this size stay in memory; larger ones spill to a temp file
+SPOOL_MAX_BYTES = 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+
+# Largest upload accepted, matching the web app's MAX_CONTENT_LENGTH
+MAX_UPLOAD_BYTES = 16 * 1024 * 1024
+
+# Smallest photo side, and the most elongated photo that still fills the card frame
+MIN_PHOTO_SIDE = int(os.environ.get('CARD_PHOTO_MIN_SIDE', 32))
+MAX_PHOTO_ASPECT = 8
+
+
+class UploadRejected(ValueError):
+    """Raised when an upload is not a usable photo; the message is safe to show to users."""
+
+
+class ReceivedUpload(NamedTuple):
+    """A validated upload, spooled and hashed."""
+    file: BinaryIO
+    digest: str
+    size: int
+    format: str
+    width: int
+    height: int
+
+
+def spool_upload(stream: BinaryIO, max_bytes: int = MAX_UPLOAD_BYTES) -> ReceivedUpload:
+    """
+    Copy an upload stream into a spooled buffer, hashing it on the way.
+
+    Args:
+        stream: Readable binary stream, e.g. a Flask FileStorage.stream
+        max_bytes (int): Largest upload accepted
+
+    Returns:
+        ReceivedUpload: Spooled upload with its SHA-256 digest and size; image fields are empty
+
+    Raises:
+        UploadRejected: If the upload is empty or too large
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        while True:
+            chunk = stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadRejected(f"Image is too large (max {max_bytes // (1024 * 1024)}MB)")
+            digest.update(chunk)
+            spool.write(chunk)
+        if size == 0:
+            raise UploadRejected("The uploaded image is empty")
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return ReceivedUpload(spool, digest.hexdigest(), size, '', 0, 0)
+
+
+def check_image(fileobj: BinaryIO) -> Tuple[str, int, int]:
+    """
+    Verify an image's header and dimensions without decoding the full image.
+
+    Args:
+        fileobj: Seekable binary file holding the image
+
+    Returns:
+        tuple: (format, width, height), e.g. ('JPEG', 1200, 1600)
+
+    Raises:
+        UploadRejected: If the file is not a supported, intact image of a usable size
+    """
+    try:
+        fileobj.seek(0)
+        with Image.open(fileobj, formats=UPLOAD_FORMATS) as image:
+            image.verify()
+        fileobj.seek(0)
+        image = Image.open(fileobj, formats=UPLOAD_FORMATS)
+    except Image.DecompressionBombError:
+        raise UploadRejected("Image has too many pixels to process")
+    except Image.UnidentifiedImageError:
+        raise UploadRejected("File is not a supported image. Please upload PNG, JPG, JPEG, GIF, or BMP.")
+    except (OSError, SyntaxError, ValueError) as e:
+        raise UploadRejected(f"Image file is damaged or incomplete ({e})")
+
+    width, height = image.size
+    if width * height > MAX_PHOTO_PIXELS:
+        raise UploadRejected(f"Image is too large to process ({width}x{height} pixels)")
+    if min(width, height) < MIN_PHOTO_SIDE:
+        raise UploadRejected(f"Image is too small ({width}x{height} pixels, at least {MIN_PHOTO_SIDE} per side)")
+    if max(width, height) > MAX_PHOTO_ASPECT * min(width, height):
+        raise UploadRejected(f"Image is too narrow for a card ({width}x{height} pixels)")
+
+    # verify() does not decode JPEG scan data; decode a 1/8-scale draft to catch truncated files
+    if image.format == 'JPEG':
+        try:
+            image.draft('RGB', (max(1, width // 8), max(1, height // 8)))
+            image.load()
+        except (OSError, SyntaxError) as e:
+            raise UploadRejected(f"Image file is damaged or incomplete ({e})")
+    # Not closed: Image.close() would also close the caller's file
+    return image.format, width, height
+
+
+def receive_upload(stream: BinaryIO, max_bytes: Optional[int] = None) -> ReceivedUpload:
+    """
+    Spool, hash and validate an uploaded photo.
+
+    Args:
+        stream: Readable binary stream of the upload
+        max_bytes (int, optional): Largest upload accepted, defaults to MAX_UPLOAD_BYTES
+
+    Returns:
+        ReceivedUpload: Validated upload; the caller closes upload.file when done
+
+    Raises:
+        UploadRejected: If the upload is not a usable photo
+    """
+    upload = spool_upload(stream, max_bytes or MAX_UPLOAD_BYTES)
+    try:
+        image_format, width, height = check_image(upload.file)
+    except BaseException:
+        upload.file.close()
+        raise
+    upload.file.seek(0)
+    return upload._replace(format=image_format, width=width, height=height)
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Card Variants Module
+
+This module produces thumbnail, medium and full-size variants of generated
+cards. Variants are made lazily on first request, stored under
+Generated_Cards/variants/ and named after the render style version, so a
+style change regenerates them instead of serving stale images. The
+directory is kept under a size budget by deleting the least recently used
+variants, which are simply made again when next requested.
+"""
+
+import argparse
+import io
+import os
+import threading
+from typing import Callable, Dict, Optional
+from PIL import Image
+from card_encoders import FILE_EXTENSIONS, encode_card, normalize_format
+from card_output import RenderedCard
+from card_storage import ContentStore, DirectoryBudget, card_store, write_atomic
+from card_styles import STYLE_VERSION
+from storage_backends import backend_from_env
+
+# Variant name to width in pixels (full is the card width); heights keep the card's aspect ratio
+VARIANT_WIDTHS = {'thumb': 240, 'medium': 480, 'full': 600}
+
+# Bump when variant sizing or encoding changes, to regenerate stored variants
+VARIANT_REVISION = 1
+VARIANT_VERSION = f"{STYLE_VERSION}{VARIANT_REVISION}"
+
+VARIANT_DIR = os.path.join("Generated_Cards", "variants")
+# Size budget for stored variants, overridable via environment
+CARD_VARIANTS_MB = float(os.environ.get('CARD_VARIANTS_MB', 256))
+
+_budgets: Dict[str, DirectoryBudget] = {}
+_budgets_lock = threading.Lock()
+
+
+def variant_budget(directory: str = VARIANT_DIR) -> DirectoryBudget:
+    """
+    Get the size budget of a variant directory, shared by every caller in the process.
+
+    Args:
+        directory (str): Variant directory
+
+    Returns:
+        DirectoryBudget: Budget of CARD_VARIANTS_MB for the directory
+    """
+    with _budgets_lock:
+        budget = _budgets.get(directory)
+        if budget is None:
+            budget = _budgets[directory] = DirectoryBudget(directory, int(CARD_VARIANTS_MB * 1024 * 1024))
+        return budget
+
+
+def variant_path(filename: str, variant: str, fmt: str, directory: str = VARIANT_DIR) -> str:
+    """
+    Get where a card variant is stored.
+
+    Args:
+        filename (str): Original card file name
+        variant (str): Variant name ('thumb', 'medium' or 'full')
+        fmt (str): Encoder name
+        directory (str): Variant directory
+
+    Returns:
+        str: Path such as 'Generated_Cards/variants/Sir_Lags_1760000000.thumb.modern1.webp'
+    """
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(directory, f"{stem}.{variant}.{VARIANT_VERSION}.{FILE_EXTENSIONS[fmt]}")
+
+
+def make_variant(data: bytes, filename: str, variant: str, fmt: str) -> RenderedCard:
+    """
+    Resize and encode one variant of a card.
+
+    Args:
+        data (bytes): Encoded original card
+        filename (str): Original card file name
+        variant (str): Variant name
+        fmt (str): Encoder name
+
+    Returns:
+        RenderedCard: Encoded variant
+
+    Raises:
+        ValueError: If the variant or format is unknown
+    """
+    if variant not in VARIANT_WIDTHS:
+        raise ValueError(f"Unknown card variant: {variant}")
+    with Image.open(io.BytesIO(data)) as source:
+        image = source.convert('RGB') if source.mode not in ('RGB', 'RGBA') else source.copy()
+
+    width = min(VARIANT_WIDTHS[variant], image.width)
+    if width != image.width:
+        height = round(image.height * width / image.width)
+        image = image.resize((width, height), Image.Resampling.LANCZOS, reducing_gap=2.0)
+
+    card = encode_card(image, filename, fmt)
+    return card._replace(filename=os.path.basename(variant_path(filename, variant, fmt)))
+
+
+def ensure_variant(filename: str, variant: str, fmt: str, load_original: Callable[[str], Optional[bytes]],
+                   directory: str = VARIANT_DIR) -> Optional[str]:
+    """
+    Make sure a variant is stored, creating it from the original on first request.
+
+    Stored variants count against the directory's size budget (see variant_budget).
+
+    Args:
+        filename (str): Original card file name
+        variant (str): Variant name
+        fmt (str): Format name or extension
+        load_original: Callable returning the original card's bytes, or None if missing
+        directory (str): Variant directory
+
+    Returns:
+        Optional[str]: Path of the stored variant, or None if the original card does not exist
+
+    Raises:
+        ValueError: If the variant or format is unknown
+    """
+    if variant not in VARIANT_WIDTHS:
+        raise ValueError(f"Unknown card variant: {variant}")
+    fmt = normalize_format(fmt)
+    path = variant_path(filename, variant, fmt, directory)
+    budget = variant_budget(directory)
+    if budget.touch(path):
+        return path
+
+    original = load_original(filename)
+    if original is None:
+        return None
+    data = make_variant(original, filename, variant, fmt).data
+    write_atomic(path, data)
+    budget.added(len(data))
+    return path
+
+
+def srcset_widths(filename: str, url_for_variant: Callable[[str, str], str]) -> str:
+    """
+    Build an img srcset listing every variant of a card.
+
+    Args:
+        filename (str): Original card file name
+        url_for_variant: Callable mapping (variant, filename) to a URL
+
+    Returns:
+        str: srcset value such as '/variant/thumb/x.png 240w, ...'
+    """
+    return ", ".join(f"{url_for_variant(variant, filename)} {width}w"
+                     for variant, width in VARIANT_WIDTHS.items())
+
+
+def prune_stale_variants(directory: str = VARIANT_DIR) -> int:
+    """
+    Delete variants made for an older style version.
+
+    Args:
+        directory (str): Variant directory
+
+    Returns:
+        int: Number of files removed
+    """
+    if not os.path.isdir(directory):
+        return 0
+    removed = 0
+    for name in os.listdir(directory):
+        parts = name.split('.')
+        if name.endswith('.tmp') or (len(parts) >= 4 and parts[-2] == VARIANT_VERSION):
+            continue
+        try:
+            os.remove(os.path.join(directory, name))
+            removed += 1
+        except FileNotFoundError:
+            pass  # Removed by another process
+    return removed
+
+
+def generate_all_variants(store: ContentStore = card_store, fmt: str = 'webp') -> Dict[str, int]:
+    """
+    Create any missing variants for every card in a store.
+
+    Args:
+        store (ContentStore): Store of original cards
+        fmt (str): Variant format
+
+    Returns:
+        dict: Counts of 'cards' seen and variants 'failed'
+    """
+    counts = {'cards': 0, 'failed': 0}
+    for stored in store.list_objects():
+        counts['cards'] += 1
+        for variant in VARIANT_WIDTHS:
+            try:
+                ensure_variant(stored.name, variant, fmt, store.read, os.path.join(store.root, "variants"))
+            except Exception as e:
+                counts['failed'] += 1
+                print(f"[ERROR] {stored.name} ({variant}): {e}")
+    return counts
+
+
+def main():
+    """Prune stale variants and pre-generate variants for existing cards."""
+    parser = argparse.ArgumentParser(description="Generate thumbnail/medium/full variants for stored cards")
+    parser.add_argument("--cards-dir", default="Generated_Cards", help="Directory of original cards")
+    parser.add_argument("--format", default='webp', help="Variant format (default: webp)")
+    args = parser.parse_args()
+
+    removed = prune_stale_variants(os.path.join(args.cards_dir, "variants"))
+    print(f"Removed {removed} stale variants")
+    store = ContentStore(args.cards_dir, backend_from_env(args.cards_dir, "cards/"))
+    store.sync_names()
+    counts = generate_all_variants(store, args.format)
+    print(f"Checked variants for {counts['cards']} cards, {counts['failed']} failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Gunicorn Configuration
+
+Production server settings for the web app, read by gunicorn from the
+working directory (gunicorn app:app). Every setting can be overridden with
+an environment variable so deployments can be tuned without code changes;
+see "Production Server" in README.md for how the options compare.
+"""
+
+import os
+
+# Address to listen on; Render provides PORT
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+
+# gthread: a fixed pool of threads per worker. Request threads mostly wait on
+# SQLite, the render pool and event streams, so threads overlap that waiting.
+# gevent: cooperative greenlets for many idle event streams (needs gevent installed).
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+if worker_class == 'gevent':
+    try:
+        import gevent  # noqa: F401
+    except ImportError:
+        print("[ERROR] GUNICORN_WORKER_CLASS=gevent but gevent is not installed; using gthread")
+        worker_class = 'gthread'
+
+# One worker process per CPU; renders run in each worker's render pool
+workers = int(os.environ.get('GUNICORN_WORKERS', os.environ.get('WEB_CONCURRENCY', os.cpu_count() or 1)))
+# Every worker starts its own render pool, so split the CPUs between them; otherwise
+# workers x render processes grows with the square of the CPU count
+os.environ.setdefault('RENDER_POOL_WORKERS', str(max(1, (os.cpu_count() or 1) // workers)))
+# Concurrent requests per gthread worker, and open connections per gevent worker
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000))
+
+# Import the app once in the master so workers start quickly. Render processes are started
+# with spawn, not forked, so they load fonts and card chrome themselves and share nothing
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1').lower() in ('1', 'true', 'yes')
+
+# Replace each worker after a number of requests (jittered so they do not all restart at once)
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', max_requests // 10))
+
+# A generation job, LLM calls and render included, never runs past its
+# deadline (CARD_DEADLINE_SECONDS). Stopping workers get that long to finish
+# running jobs; a worker silent for longer than the timeout is restarted.
+_job_seconds = float(os.environ.get('CARD_DEADLINE_SECONDS', 60))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', _job_seconds))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', _job_seconds + 10))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    """Drop SQLite connections and LLM clients opened by the preloaded app; each worker opens its own."""
+    from card_index import card_index
+    from card_jobs import job_store
+    from card_storage import card_store, photo_store
+    from llm_cache import llm_cache
+
+    for store in (card_index, card_store, photo_store, job_store, llm_cache):
+        store.after_fork()
+
+    # LLM clients hold open connections and the dispatcher a thread pool, neither of which survives a fork
+    try:
+        from llm_clients import llm_clients
+        from llm_dispatch import llm_dispatcher
+    except ImportError:
+        return
+    llm_clients.after_fork()
+    llm_dispatcher.after_fork()
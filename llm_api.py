@@ -9,9 +9,19 @@ and OpenAI as fallback service.
 
 import os
 import json
-import google.generativeai as genai
 from openai import OpenAI
-from typing import List, Dict, Optional, Any
+from typing import Callable, List, Dict, Optional, Any
+
+from card_deadline import Deadline
+from llm_cache import CACHE_BYPASS, CACHE_USE, cache_key, llm_cache
+from llm_clients import GEMINI_MODEL, OPENAI_MODEL, llm_clients
+from llm_dispatch import ProviderUnavailable, llm_dispatcher
+
+# Longest single LLM call; a call also never runs past the card's deadline
+LLM_TIMEOUT = float(os.environ.get('LLM_TIMEOUT', 20))
+
+# Bump when the prompts or the card data format change, so cached answers to the old prompts are not reused
+PROMPT_VERSION = '1'
 
 
 def sanitize_ascii(text: str) -> str:
@@ -49,7 +59,7 @@ def shorten_to_chars(text: str, max_chars: int) -> str:
 
 def _configure_gemini(api_key: str) -> Optional[Any]:
     """
-    Configure Google Gemini API client.
+    Get the long-lived Google Gemini model for an API key.
     
     Args:
         api_key (str): Gemini API key
@@ -58,8 +68,7 @@ def _configure_gemini(api_key: str) -> Optional[Any]:
         Optional[Any]: Configured Gemini model or None if failed
     """
     try:
-        genai.configure(api_key=api_key)
-        return genai.GenerativeModel('gemini-2.5-flash')
+        return llm_clients.gemini_model(api_key)
     except Exception as e:
         print(f"Warning: Could not configure Gemini API: {e}")
         return None
@@ -67,7 +76,7 @@ def _configure_gemini(api_key: str) -> Optional[Any]:
 
 def _configure_openai(api_key: str) -> Optional[OpenAI]:
     """
-    Configure OpenAI API client.
+    Get the long-lived OpenAI API client for an API key; hand it back with llm_clients.release().
     
     Args:
         api_key (str): OpenAI API key
@@ -76,19 +85,20 @@ def _configure_openai(api_key: str) -> Optional[OpenAI]:
         Optional[OpenAI]: Configured OpenAI client or None if failed
     """
     try:
-        return OpenAI(api_key=api_key)
+        return llm_clients.openai_client(api_key)
     except Exception as e:
         print(f"Warning: Could not configure OpenAI API: {e}")
         return None
 
 
-def _call_gemini_api(traits: List[str], model: Any) -> Optional[Dict[str, Any]]:
+def _call_gemini_api(traits: List[str], model: Any, timeout: float = LLM_TIMEOUT) -> Optional[Dict[str, Any]]:
     """
     Call Gemini API to generate card data.
     
     Args:
         traits (List[str]): List of character traits
         model: Configured Gemini model
+        timeout (float): Seconds to wait for the response
         
     Returns:
         Optional[Dict[str, Any]]: Generated card data or None if failed
@@ -163,7 +173,7 @@ Examples:
 {user_prompt}"""
 
         # Make API call
-        response = model.generate_content(full_prompt)
+        response = model.generate_content(full_prompt, request_options={'timeout': timeout})
         
         if not response.text:
             print("[ERROR] Empty response from Gemini API")
@@ -204,13 +214,14 @@ Examples:
         return None
 
 
-def _call_openai_api(traits: List[str], client: OpenAI) -> Optional[Dict[str, Any]]:
+def _call_openai_api(traits: List[str], client: OpenAI, timeout: float = LLM_TIMEOUT) -> Optional[Dict[str, Any]]:
     """
     Call OpenAI API to generate card data.
     
     Args:
         traits (List[str]): List of character traits
         client: Configured OpenAI client
+        timeout (float): Seconds to wait for the response
         
     Returns:
         Optional[Dict[str, Any]]: Generated card data or None if failed
@@ -223,9 +234,9 @@ def _call_openai_api(traits: List[str], client: OpenAI) -> Optional[Dict[str, An
         for i, trait in enumerate(traits, 1):
             user_prompt += f"{i}. {trait}\n"
         
-        # Make API call
-        response = client.chat.completions.create(
-            model="gpt-4o",
+        # Make API call; no client retries, a failed call falls back to the other provider
+        response = client.with_options(timeout=timeout, max_retries=0).chat.completions.create(
+            model=OPENAI_MODEL,
             messages=[
                 {
                     "role": "system",
@@ -369,21 +380,42 @@ def _validate_and_sanitize_card_data(card_data: Dict[str, Any], traits: List[str
     return card_data
 
 
-def generate_card_data(traits: List[str], gemini_api_key: Optional[str] = None, openai_api_key: Optional[str] = None) -> Optional[Dict[str, Any]]:
+def generate_card_data(traits: List[str], gemini_api_key: Optional[str] = None, openai_api_key: Optional[str] = None,
+                       progress: Optional[Callable[..., None]] = None,
+                       deadline: Optional[Deadline] = None,
+                       cache_mode: str = CACHE_USE) -> Optional[Dict[str, Any]]:
     """
     Generate structured card data using LLM APIs with primary/fallback pattern.
     
     This function implements a primary/fallback system where Gemini is tried first,
-    and if it fails, OpenAI is used as a fallback.
+    and if it fails, OpenAI is used as a fallback. With hedging enabled (see
+    llm_dispatch), OpenAI is also started when Gemini is slower than usual, and
+    the first valid answer is used.
+    
+    Answers are cached (see llm_cache) by the traits, PROMPT_VERSION and the
+    model, so the same traits get the earlier card data back without an LLM
+    call unless the request asks for a reroll or to bypass the cache.
     
     Args:
         traits (List[str]): List of five character traits
         gemini_api_key (Optional[str]): Gemini API key for primary service
         openai_api_key (Optional[str]): OpenAI API key for fallback service
+        progress (Optional[Callable]): Called as progress(event, **data) with 'llm_attempt'
+            (provider) before each call, 'llm_hedge' (provider, after) when a slow call is
+            hedged, 'llm_fallback' (provider, reason) when falling back and 'llm_cached'
+            (provider) when a cached answer is used
+        deadline (Optional[Deadline]): Time by which the card data is needed; each call gets
+            what is left of it, at most LLM_TIMEOUT
+        cache_mode (str): CACHE_USE to use cached answers, CACHE_REROLL to ask the LLM and
+            replace the cached answer, CACHE_BYPASS to leave the cache alone
         
     Returns:
         Optional[Dict[str, Any]]: Generated card data if successful, None if failed
+        
+    Raises:
+        DeadlineExceeded: If the deadline passes before any provider answers
     """
+    report = progress or (lambda event, **data: None)
     print("Generating character card data with LLM fallback system...")
     print(f"Traits count: {len(traits) if traits else 0}")
     print(f"Gemini API key provided: {'Yes' if gemini_api_key else 'No'}")
@@ -394,40 +426,91 @@ def generate_card_data(traits: List[str], gemini_api_key: Optional[str] = None,
         print("[ERROR] Exactly 5 traits are required")
         return None
     
-    # 1. Primary Attempt: Google Gemini
+    # An earlier answer from any configured model, preferring the primary's
+    cache_keys = {}
     if gemini_api_key:
-        try:
-            print("Attempting API call with primary service (Gemini)...")
-            gemini_model = _configure_gemini(gemini_api_key)
-            if gemini_model:
-                result = _call_gemini_api(traits, gemini_model)
-                if result:
-                    print("Successfully received response from Gemini.")
-                    return result
-                else:
-                    print("Primary service (Gemini) failed. Falling back...")
-            else:
-                print("Primary service (Gemini) not available. Falling back...")
-        except Exception as e:
-            print(f"Primary service (Gemini) failed: {e}. Falling back...")
+        cache_keys['gemini'] = cache_key(traits, PROMPT_VERSION, GEMINI_MODEL)
+    if openai_api_key:
+        cache_keys['openai'] = cache_key(traits, PROMPT_VERSION, OPENAI_MODEL)
+    if cache_mode == CACHE_USE:
+        cached = llm_cache.get(list(cache_keys.values()))
+        if cached:
+            provider, result = cached
+            print(f"Using cached response from {provider}.")
+            report('llm_cached', provider=provider)
+            return result
+    else:
+        print(f"LLM cache skipped ({cache_mode}).")
+        llm_cache.skip(cache_mode)
     
-    # 2. Fallback: OpenAI
+    # 1. Primary: Google Gemini, 2. Fallback: OpenAI
+    deadline = deadline or Deadline(2 * LLM_TIMEOUT)
+    attempts = []
+    if gemini_api_key:
+        attempts.append(('gemini', lambda: _attempt_gemini(traits, gemini_api_key, deadline)))
     if openai_api_key:
-        try:
-            print("Attempting API call with secondary service (OpenAI)...")
-            openai_client = _configure_openai(openai_api_key)
-            if openai_client:
-                result = _call_openai_api(traits, openai_client)
-                if result:
-                    print("Successfully received response from OpenAI.")
-                    return result
-                else:
-                    print("Secondary service (OpenAI) failed.")
-            else:
-                print("Secondary service (OpenAI) not available.")
-        except Exception as e:
-            print(f"Secondary service (OpenAI) failed: {e}")
+        attempts.append(('openai', lambda: _attempt_openai(traits, openai_api_key, deadline)))
+    
+    provider, result = llm_dispatcher.dispatch(attempts, report, deadline)
+    if result:
+        print(f"Successfully received response from {provider}.")
+        if cache_mode != CACHE_BYPASS:
+            llm_cache.put(cache_keys[provider], provider, result)
+        return result
     
     # 3. Final Failure
     print("Error: Both LLM services are currently unavailable or failed.")
     return None
+
+
+def _attempt_gemini(traits: List[str], api_key: str, deadline: Deadline) -> Optional[Dict[str, Any]]:
+    """
+    Generate card data with Gemini, for llm_dispatch.
+    
+    Args:
+        traits (List[str]): List of five character traits
+        api_key (str): Gemini API key
+        deadline (Deadline): Time by which the card data is needed
+        
+    Returns:
+        Optional[Dict[str, Any]]: Generated card data or None if failed
+        
+    Raises:
+        ProviderUnavailable: If the Gemini client could not be configured
+        DeadlineExceeded: If no time is left for the call
+    """
+    timeout = deadline.timeout("asking Gemini", LLM_TIMEOUT)
+    print(f"Attempting API call with primary service (Gemini), timeout {timeout:.1f}s...")
+    gemini_model = _configure_gemini(api_key)
+    if not gemini_model:
+        print("Primary service (Gemini) not available.")
+        raise ProviderUnavailable("Gemini is not available")
+    return _call_gemini_api(traits, gemini_model, timeout)
+
+
+def _attempt_openai(traits: List[str], api_key: str, deadline: Deadline) -> Optional[Dict[str, Any]]:
+    """
+    Generate card data with OpenAI, for llm_dispatch.
+    
+    Args:
+        traits (List[str]): List of five character traits
+        api_key (str): OpenAI API key
+        deadline (Deadline): Time by which the card data is needed
+        
+    Returns:
+        Optional[Dict[str, Any]]: Generated card data or None if failed
+        
+    Raises:
+        ProviderUnavailable: If the OpenAI client could not be configured
+        DeadlineExceeded: If no time is left for the call
+    """
+    timeout = deadline.timeout("asking OpenAI", LLM_TIMEOUT)
+    print(f"Attempting API call with secondary service (OpenAI), timeout {timeout:.1f}s...")
+    openai_client = _configure_openai(api_key)
+    if not openai_client:
+        print("Secondary service (OpenAI) not available.")
+        raise ProviderUnavailable("OpenAI is not available")
+    try:
+        return _call_openai_api(traits, openai_client, timeout)
+    finally:
+        llm_clients.release(openai_client)
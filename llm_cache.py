@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+LLM Cache Module
+
+A two-tier cache of LLM card data, so the same five traits (demo prompts,
+retries, double submits) do not pay for a new LLM call every time. Entries
+are keyed by a hash of the normalized traits, the prompt version and the
+model that wrote them. A small in-memory LRU sits in front of a SQLite file
+shared by all workers, which keeps entries for a TTL and up to a size cap.
+A memory hit is checked against the file's write time for the key, so an
+entry replaced by another worker is not served from memory.
+
+Callers choose per request whether to use the cache, reroll (skip the
+lookup but store the new answer, replacing the old one) or bypass it.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+# Cache configuration, overridable via environment
+LLM_CACHE = os.environ.get('LLM_CACHE', '1').lower() in ('1', 'true', 'yes')
+LLM_CACHE_PATH = os.environ.get('LLM_CACHE_PATH', os.path.join("Generated_Cards", "llm_cache.sqlite3"))
+LLM_CACHE_MEMORY_ENTRIES = int(os.environ.get('LLM_CACHE_MEMORY_ENTRIES', 256))
+LLM_CACHE_MAX_ENTRIES = int(os.environ.get('LLM_CACHE_MAX_ENTRIES', 10000))
+LLM_CACHE_TTL_HOURS = float(os.environ.get('LLM_CACHE_TTL_HOURS', 7 * 24))
+
+# Per-request cache modes
+CACHE_USE = 'use'
+CACHE_REROLL = 'reroll'
+CACHE_BYPASS = 'bypass'
+CACHE_MODES = (CACHE_USE, CACHE_REROLL, CACHE_BYPASS)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    provider TEXT NOT NULL,
+    card_data TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_used_at ON responses (used_at);
+CREATE INDEX IF NOT EXISTS responses_created_at ON responses (created_at);
+"""
+
+WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_trait(trait: str) -> str:
+    """
+    Normalize a trait so trivially different spellings share a cache entry.
+
+    Args:
+        trait (str): Trait as typed by the user
+
+    Returns:
+        str: Trait in NFKC form, case folded, with runs of whitespace collapsed
+    """
+    return WHITESPACE.sub(' ', unicodedata.normalize('NFKC', trait)).strip().casefold()
+
+
+def cache_key(traits: Sequence[str], prompt_version: str, model: str) -> str:
+    """
+    Build the cache key for one model's answer to a list of traits.
+
+    Trait order is kept, since the prompt numbers the traits.
+
+    Args:
+        traits (Sequence[str]): Character traits
+        prompt_version (str): Version of the prompt the answer was written for
+        model (str): Model name, e.g. 'gpt-4o'
+
+    Returns:
+        str: Hex SHA-256 key
+    """
+    material = json.dumps([prompt_version, model, [normalize_trait(trait) for trait in traits]])
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    In-memory LRU in front of a SQLite cache of card data, safe to share between threads and processes.
+
+    Cached card data is stored as JSON and decoded on every hit, so callers
+    may change what they get back. SQLite errors are logged and treated as
+    misses; a broken cache file never fails a card.
+    """
+
+    def __init__(self, path: str = LLM_CACHE_PATH, memory_entries: int = LLM_CACHE_MEMORY_ENTRIES,
+                 max_entries: int = LLM_CACHE_MAX_ENTRIES, ttl: float = LLM_CACHE_TTL_HOURS * 3600,
+                 enabled: bool = LLM_CACHE):
+        """
+        Initialize the cache; the database is opened on first use.
+
+        Args:
+            path (str): SQLite database file
+            memory_entries (int): Entries kept in memory, 0 to only use the database
+            max_entries (int): Entries kept in the database; the least recently used go first
+            ttl (float): Seconds an entry stays valid after it was written
+            enabled (bool): Whether lookups and stores happen at all
+        """
+        self.path = path
+        self.memory_entries = memory_entries
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.enabled = enabled
+        self._local = threading.local()
+        self._memory: "OrderedDict[str, Tuple[str, str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {
+            'lookups': 0,
+            'memory_hits': 0,
+            'stale_memory': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'expired': 0,
+            'stores': 0,
+            'evictions': 0,
+            'rerolls': 0,
+            'bypasses': 0,
+            'errors': 0,
+        }
+
+    def after_fork(self) -> None:
+        """Forget connections inherited from a parent process; call in a forked child before use."""
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Get this thread's connection, creating the schema on first use."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=10)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+            self._local.connection = connection
+        return connection
+
+    def _count(self, counter: str, amount: int = 1) -> None:
+        """Increment a counter."""
+        with self._lock:
+            self._counters[counter] += amount
+
+    def _remember(self, key: str, provider: str, card_json: str, created_at: float) -> None:
+        """Put an entry in the memory tier, evicting the least recently used over the limit."""
+        if self.memory_entries <= 0:
+            return
+        with self._lock:
+            self._memory[key] = (provider, card_json, created_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def _get_memory(self, key: str, now: float) -> Optional[Tuple[str, str, float]]:
+        """Look up one key in the memory tier, dropping it if it has expired."""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            if now - entry[2] > self.ttl:
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            return entry
+
+    def _is_current(self, key: str, created_at: float) -> bool:
+        """Check a memory entry against the database, dropping it if it was replaced or removed there."""
+        try:
+            row = self._connect().execute("SELECT created_at FROM responses WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error as e:
+            # Serve the memory entry; it was valid when this worker stored or read it
+            print(f"[ERROR] LLM cache check failed: {str(e)}")
+            self._count('errors')
+            return True
+        if row is not None and row['created_at'] == created_at:
+            return True
+        with self._lock:
+            if self._memory.get(key, (None, None, None))[2] == created_at:
+                del self._memory[key]
+        self._count('stale_memory')
+        return False
+
+    def _get_disk(self, key: str, now: float) -> Optional[Tuple[str, str, float]]:
+        """Look up one key in the database, deleting it if it has expired."""
+        connection = self._connect()
+        row = connection.execute("SELECT provider, card_data, created_at FROM responses WHERE key = ?",
+                                 (key,)).fetchone()
+        if row is None:
+            return None
+        with connection:
+            if now - row['created_at'] > self.ttl:
+                connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._count('expired')
+                return None
+            connection.execute("UPDATE responses SET used_at = ? WHERE key = ?", (now, key))
+        return row['provider'], row['card_data'], row['created_at']
+
+    def get(self, keys: Sequence[str]) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """
+        Look up card data, trying each key in order.
+
+        Args:
+            keys (Sequence[str]): Keys from cache_key, e.g. one per configured model in
+                the order the models would be asked
+
+        Returns:
+            Optional[Tuple[str, Dict[str, Any]]]: (provider, card data) for the first key
+                found, or None on a miss
+        """
+        if not self.enabled or not keys:
+            return None
+        self._count('lookups')
+        now = time.time()
+        for key in keys:
+            entry = self._get_memory(key, now)
+            if entry is not None and self._is_current(key, entry[2]):
+                self._count('memory_hits')
+                return entry[0], json.loads(entry[1])
+
+        try:
+            for key in keys:
+                entry = self._get_disk(key, now)
+                if entry is not None:
+                    provider, card_json, created_at = entry
+                    self._remember(key, provider, card_json, created_at)
+                    self._count('disk_hits')
+                    return provider, json.loads(card_json)
+        except sqlite3.Error as e:
+            print(f"[ERROR] LLM cache lookup failed: {str(e)}")
+            self._count('errors')
+        self._count('misses')
+        return None
+
+    def put(self, key: str, provider: str, card_data: Dict[str, Any]) -> None:
+        """
+        Store card data, replacing any entry for the same key.
+
+        Args:
+            key (str): Key from cache_key for the model that wrote the card data
+            provider (str): Provider that wrote it, e.g. 'gemini'
+            card_data (Dict[str, Any]): Validated card data
+        """
+        if not self.enabled:
+            return
+        now = time.time()
+        card_json = json.dumps(card_data)
+        self._remember(key, provider, card_json, now)
+        try:
+            connection = self._connect()
+            with connection:
+                connection.execute("INSERT OR REPLACE INTO responses (key, provider, card_data, created_at, used_at) "
+                                   "VALUES (?, ?, ?, ?, ?)", (key, provider, card_json, now, now))
+                expired = connection.execute("DELETE FROM responses WHERE created_at < ?",
+                                             (now - self.ttl,)).rowcount
+                evicted = connection.execute(
+                    "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY used_at DESC "
+                    "LIMIT -1 OFFSET ?)", (self.max_entries,)).rowcount
+        except sqlite3.Error as e:
+            print(f"[ERROR] LLM cache store failed: {str(e)}")
+            self._count('errors')
+            return
+        self._count('stores')
+        self._count('expired', expired)
+        self._count('evictions', evicted)
+
+    def skip(self, mode: str) -> None:
+        """
+        Record a request that did not look in the cache.
+
+        Args:
+            mode (str): CACHE_REROLL or CACHE_BYPASS
+        """
+        self._count('rerolls' if mode == CACHE_REROLL else 'bypasses')
+
+    def clear(self) -> None:
+        """Drop all cached entries from both tiers."""
+        with self._lock:
+            self._memory.clear()
+        connection = self._connect()
+        with connection:
+            connection.execute("DELETE FROM responses")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report cache usage counters.
+
+        Returns:
+            dict: Settings, entry counts, hit/miss/store counters and the hit rate
+        """
+        disk_entries = None
+        if self.enabled:
+            try:
+                disk_entries = self._connect().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            except sqlite3.Error:
+                pass
+        with self._lock:
+            counters = dict(self._counters)
+            memory_entries = len(self._memory)
+        hits = counters['memory_hits'] + counters['disk_hits']
+        return {
+            'enabled': self.enabled,
+            'memory_entries': memory_entries,
+            'max_memory_entries': self.memory_entries,
+            'disk_entries': disk_entries,
+            'max_disk_entries': self.max_entries,
+            'ttl_hours': self.ttl / 3600,
+            **counters,
+            'hit_rate': hits / counters['lookups'] if counters['lookups'] else 0.0
+        }
+
+
+# Process-wide cache shared by all card generations
+llm_cache = LLMResponseCache()
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+LLM Clients Module
+
+Keeps one long-lived client per LLM provider and API key for the whole
+process, so card generations reuse warm HTTP connections instead of
+building a fresh client (and paying DNS, TCP and TLS setup) for every
+card. Clients are created on first use and replaced when a key changes.
+"""
+
+import atexit
+import hashlib
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import google.generativeai as genai
+import httpx
+from google.generativeai import client as genai_client
+from openai import OpenAI
+
+# Connection pool configuration, overridable via environment
+GEMINI_MODEL = os.environ.get('GEMINI_MODEL', 'gemini-2.5-flash')
+OPENAI_MODEL = os.environ.get('OPENAI_MODEL', 'gpt-4o')
+LLM_POOL_CONNECTIONS = int(os.environ.get('LLM_POOL_CONNECTIONS', 10))
+LLM_POOL_KEEPALIVE = int(os.environ.get('LLM_POOL_KEEPALIVE', LLM_POOL_CONNECTIONS))
+# Idle connections are kept open this long, so cards a minute apart still find a warm connection
+LLM_KEEPALIVE_SECONDS = float(os.environ.get('LLM_KEEPALIVE_SECONDS', 90))
+
+# google-generativeai releases known to create GenerativeModel._client lazily from the default
+# client; only these get the model bound to its client up front (see gemini_model)
+GENAI_BIND_CLIENT_VERSIONS = ((0, 4), (0, 9))
+
+
+def _version(version: str) -> Tuple[int, ...]:
+    """Parse the leading numbers of a version string, e.g. '0.8.3' -> (0, 8, 3)."""
+    return tuple(int(part) for part in re.findall(r'\d+', version.split('+')[0])[:3])
+
+
+def key_fingerprint(api_key: str) -> str:
+    """
+    Identify an API key in logs and stats without revealing it.
+
+    Args:
+        api_key (str): API key
+
+    Returns:
+        str: Short hash of the key
+    """
+    return hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:8]
+
+
+class LLMClientRegistry:
+    """
+    Thread-safe cache of provider clients, one per provider.
+
+    The OpenAI client gets its own keep-alive httpx connection pool. Callers
+    hold it for the length of a call and hand it back with release(), so a
+    client replaced by a key rotation is closed as soon as its last call is
+    done. Gemini is configured through genai.configure, which sets
+    process-global state, so configuring it and binding the model to the
+    resulting client happen under one lock; a bound model keeps its client,
+    so in-flight calls are not affected when the key is rotated.
+    """
+
+    def __init__(self, max_connections: int, max_keepalive: int, keepalive_expiry: float):
+        """
+        Initialize the registry; clients are created on first use.
+
+        Args:
+            max_connections (int): Open connections allowed per provider
+            max_keepalive (int): Idle connections kept open per provider
+            keepalive_expiry (float): Seconds an idle connection is kept open
+        """
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.keepalive_expiry = keepalive_expiry
+        self._lock = threading.Lock()
+        self._clients: Dict[str, Any] = {}
+        self._keys: Dict[str, str] = {}
+        # Calls holding each OpenAI client, by id(), and replaced clients still held by a call
+        self._leases: Dict[int, int] = {}
+        self._retired: List[Any] = []
+        self._counters = {'created': 0, 'reused': 0, 'rotated': 0, 'closed': 0}
+        self._bind_gemini_client = (GENAI_BIND_CLIENT_VERSIONS[0] <= _version(genai.__version__)
+                                    < GENAI_BIND_CLIENT_VERSIONS[1])
+
+    def _cached(self, provider: str, api_key: str) -> Optional[Any]:
+        """Return the provider's client for this key, counting a rotation if the key changed; call with the lock held."""
+        if self._keys.get(provider) == api_key:
+            self._counters['reused'] += 1
+            return self._clients[provider]
+        if provider in self._clients:
+            print(f"[DEBUG] {provider} API key changed ({key_fingerprint(self._keys[provider])} -> "
+                  f"{key_fingerprint(api_key)}), creating a new client")
+            self._counters['rotated'] += 1
+        return None
+
+    def _store(self, provider: str, api_key: str, client: Any) -> Any:
+        """Remember a new client; call with the lock held."""
+        replaced = self._clients.get(provider)
+        if provider == 'openai' and replaced is not None:
+            # Close the replaced client now, or once the calls still using it release it
+            if self._leases.get(id(replaced)):
+                self._retired.append(replaced)
+            else:
+                self._close_client(replaced)
+        self._clients[provider] = client
+        self._keys[provider] = api_key
+        self._counters['created'] += 1
+        return client
+
+    def gemini_model(self, api_key: str) -> Any:
+        """
+        Get the Gemini model for an API key.
+
+        Args:
+            api_key (str): Gemini API key
+
+        Returns:
+            genai.GenerativeModel: Model bound to a long-lived client
+        """
+        with self._lock:
+            model = self._cached('gemini', api_key)
+            if model is None:
+                genai.configure(api_key=api_key)
+                model = genai.GenerativeModel(GEMINI_MODEL)
+                if self._bind_gemini_client and getattr(model, '_client', False) is None:
+                    # Bind the client now, while the configuration is ours; the model would
+                    # otherwise fetch the global client on its first call. _client is private,
+                    # so this is limited to releases known to use it
+                    model._client = genai_client.get_default_generative_client()
+                self._store('gemini', api_key, model)
+            return model
+
+    def openai_client(self, api_key: str) -> OpenAI:
+        """
+        Get the OpenAI client for an API key, for one call.
+
+        Every client handed out must be given back with release() once the
+        call is done, so a client replaced in the meantime can be closed.
+
+        Args:
+            api_key (str): OpenAI API key
+
+        Returns:
+            OpenAI: Client with a keep-alive connection pool
+        """
+        with self._lock:
+            client = self._cached('openai', api_key)
+            if client is None:
+                limits = httpx.Limits(max_connections=self.max_connections,
+                                      max_keepalive_connections=self.max_keepalive,
+                                      keepalive_expiry=self.keepalive_expiry)
+                client = OpenAI(api_key=api_key, http_client=httpx.Client(limits=limits))
+                self._store('openai', api_key, client)
+            self._leases[id(client)] = self._leases.get(id(client), 0) + 1
+            return client
+
+    def release(self, client: OpenAI) -> None:
+        """
+        Hand back an OpenAI client from openai_client(); closes it if it was replaced and is no longer used.
+
+        Args:
+            client (OpenAI): Client the call is done with
+        """
+        with self._lock:
+            leases = self._leases.get(id(client), 0) - 1
+            if leases > 0:
+                self._leases[id(client)] = leases
+                return
+            self._leases.pop(id(client), None)
+            if any(retired is client for retired in self._retired):
+                self._retired = [retired for retired in self._retired if retired is not client]
+                self._close_client(client)
+
+    def _close_client(self, client: Any) -> None:
+        """Close a replaced OpenAI client's connection pool; call with the lock held."""
+        try:
+            client.close()
+        except Exception as e:
+            print(f"[ERROR] Could not close a replaced OpenAI client: {e}")
+        self._counters['closed'] += 1
+
+    def after_fork(self) -> None:
+        """Forget clients inherited from a parent process; their connections cannot be shared."""
+        self._lock = threading.Lock()
+        self._clients = {}
+        self._keys = {}
+        self._leases = {}
+        self._retired = []
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report pool configuration, warm providers and counters.
+
+        Returns:
+            dict: Pool limits, key fingerprint per warm provider and client counters
+        """
+        with self._lock:
+            return {
+                'max_connections': self.max_connections,
+                'max_keepalive': self.max_keepalive,
+                'keepalive_expiry': self.keepalive_expiry,
+                'providers': {provider: key_fingerprint(key) for provider, key in self._keys.items()},
+                'retired_open': len(self._retired),
+                **self._counters
+            }
+
+    def close(self) -> None:
+        """Close open connections; clients are created again on next use."""
+        with self._lock:
+            clients, self._clients, self._keys = self._clients, {}, {}
+            retired, self._retired, self._leases = self._retired, [], {}
+        for client in [clients.get('openai'), *retired]:
+            if client is not None:
+                client.close()
+
+
+# Process-wide registry used by llm_api
+llm_clients = LLMClientRegistry(LLM_POOL_CONNECTIONS, LLM_POOL_KEEPALIVE, LLM_KEEPALIVE_SECONDS)
+atexit.register(llm_clients.close)
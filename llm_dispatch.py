@@ -0,0 +1,567 @@
+#!/usr/bin/env python3
+"""
+LLM Dispatch Module
+
+Runs LLM provider attempts in priority order with optional hedging: when
+the primary provider has not answered within its usual latency (the
+rolling p90 of its recent successful calls), the next provider is started
+as well and whichever returns valid card data first wins. Hedges are
+limited by a budget so a slow primary cannot double the paid calls. A
+circuit breaker per provider skips a provider that keeps failing or timing
+out, probing it now and then until it recovers. Every decision is counted
+for /health.
+"""
+
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from card_deadline import Deadline, DeadlineExceeded
+
+# Dispatch configuration, overridable via environment
+LLM_HEDGE = os.environ.get('LLM_HEDGE', '1').lower() in ('1', 'true', 'yes')
+LLM_HEDGE_PERCENTILE = float(os.environ.get('LLM_HEDGE_PERCENTILE', 90))
+# Hedge delay used until a provider has LLM_HEDGE_MIN_SAMPLES successful calls
+LLM_HEDGE_AFTER = float(os.environ.get('LLM_HEDGE_AFTER', 8))
+LLM_HEDGE_MIN_SAMPLES = int(os.environ.get('LLM_HEDGE_MIN_SAMPLES', 20))
+LLM_HEDGE_MIN_SECONDS = float(os.environ.get('LLM_HEDGE_MIN_SECONDS', 1))
+# Hedges allowed per request on average (0.2 = one in five), with a small burst allowance
+LLM_HEDGE_BUDGET = float(os.environ.get('LLM_HEDGE_BUDGET', 0.2))
+LLM_HEDGE_BURST = float(os.environ.get('LLM_HEDGE_BURST', 3))
+LLM_LATENCY_WINDOW = int(os.environ.get('LLM_LATENCY_WINDOW', 100))
+LLM_DISPATCH_THREADS = int(os.environ.get('LLM_DISPATCH_THREADS', 8))
+# A provider's breaker opens when, over its last LLM_BREAKER_WINDOW calls (and at least
+# LLM_BREAKER_MIN_CALLS), the share of failed or of slow calls reaches these rates
+LLM_BREAKER_WINDOW = int(os.environ.get('LLM_BREAKER_WINDOW', 20))
+LLM_BREAKER_MIN_CALLS = int(os.environ.get('LLM_BREAKER_MIN_CALLS', 5))
+LLM_BREAKER_ERROR_RATE = float(os.environ.get('LLM_BREAKER_ERROR_RATE', 0.5))
+LLM_BREAKER_SLOW_SECONDS = float(os.environ.get('LLM_BREAKER_SLOW_SECONDS', 15))
+LLM_BREAKER_SLOW_RATE = float(os.environ.get('LLM_BREAKER_SLOW_RATE', 0.8))
+# Seconds an open breaker skips its provider before letting a probe call through
+LLM_BREAKER_COOLDOWN = float(os.environ.get('LLM_BREAKER_COOLDOWN', 30))
+
+# Circuit breaker states
+BREAKER_CLOSED = 'closed'
+BREAKER_OPEN = 'open'
+BREAKER_HALF_OPEN = 'half_open'
+
+# A provider attempt: (provider name, callable returning card data or None)
+Attempt = Tuple[str, Callable[[], Optional[Dict[str, Any]]]]
+
+
+class ProviderUnavailable(Exception):
+    """Raised by an attempt that could not be made; the message is the fallback reason."""
+
+
+def percentile(samples: List[float], percent: float) -> float:
+    """
+    Get a percentile of a list of numbers (nearest rank).
+
+    Args:
+        samples (list): Numbers, not necessarily sorted
+        percent (float): Percentile, 0 to 100
+
+    Returns:
+        float: The percentile, or 0.0 for an empty list
+    """
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(percent / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class CircuitBreaker:
+    """
+    Tracks one provider's recent calls and stops using it while it is unhealthy.
+
+    Closed: calls go through and their outcomes are tracked. Open: the
+    provider is skipped until the cooldown has passed. Half-open: one probe
+    call is let through; if it succeeds quickly the breaker closes, otherwise
+    it opens again for another cooldown.
+    """
+
+    def __init__(self, name: str, window: int, min_calls: int, error_rate: float, slow_seconds: float,
+                 slow_rate: float, cooldown: float):
+        """
+        Initialize a closed breaker.
+
+        Args:
+            name (str): Provider name, for logs
+            window (int): Recent calls considered
+            min_calls (int): Calls needed in the window before the breaker can open
+            error_rate (float): Share of failed calls that opens the breaker
+            slow_seconds (float): Calls taking longer than this count as slow
+            slow_rate (float): Share of slow calls that opens the breaker
+            cooldown (float): Seconds to skip the provider before probing it
+        """
+        self.name = name
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_seconds = slow_seconds
+        self.slow_rate = slow_rate
+        self.cooldown = cooldown
+        self.state = BREAKER_CLOSED
+        self._outcomes: Deque[Tuple[bool, bool]] = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        self._counters = {'opened': 0, 'probes': 0, 'released': 0, 'rejected': 0}
+
+    def _cooled_down(self) -> bool:
+        return time.monotonic() - self._opened_at >= self.cooldown
+
+    def available(self) -> bool:
+        """
+        Check whether a call could be made now, without reserving it.
+
+        Returns:
+            bool: False while the breaker is open or a probe is already running
+        """
+        with self._lock:
+            if self.state == BREAKER_CLOSED:
+                return True
+            if self.state == BREAKER_OPEN:
+                return self._cooled_down()
+            return not self._probing
+
+    def acquire(self) -> Tuple[bool, bool]:
+        """
+        Reserve a call, making it the probe if the breaker is not closed.
+
+        The probe must end in record(..., probe=True) or release_probe().
+
+        Returns:
+            tuple: (whether the call may be made, whether it is the probe)
+        """
+        with self._lock:
+            if self.state == BREAKER_CLOSED:
+                return True, False
+            if self.state == BREAKER_OPEN and self._cooled_down():
+                self.state = BREAKER_HALF_OPEN
+            if self.state == BREAKER_HALF_OPEN and not self._probing:
+                self._probing = True
+                self._counters['probes'] += 1
+                return True, True
+            self._counters['rejected'] += 1
+            return False, False
+
+    def release_probe(self) -> None:
+        """
+        Give up the probe without an outcome, e.g. when it was cancelled or the
+        card ran out of time before the call. The breaker goes back to open,
+        already cooled down, so the next request probes again.
+        """
+        with self._lock:
+            if self.state == BREAKER_HALF_OPEN and self._probing:
+                self.state = BREAKER_OPEN
+                self._probing = False
+                self._counters['released'] += 1
+
+    def record(self, ok: bool, seconds: float, probe: bool = False) -> None:
+        """
+        Record a finished call.
+
+        While the breaker is not closed only the probe counts; results of calls
+        started before it opened are ignored, so they cannot close it early.
+
+        Args:
+            ok (bool): Whether the call returned usable card data
+            seconds (float): How long the call took
+            probe (bool): Whether the call held the probe from acquire()
+        """
+        slow = seconds > self.slow_seconds
+        with self._lock:
+            if probe:
+                if self.state != BREAKER_HALF_OPEN or not self._probing:
+                    return
+                if ok and not slow:
+                    print(f"[SUCCESS] {self.name} circuit breaker closed, provider is healthy again")
+                    self.state = BREAKER_CLOSED
+                    self._outcomes.clear()
+                    self._probing = False
+                else:
+                    self._trip("probe call failed")
+            elif self.state == BREAKER_CLOSED:
+                self._outcomes.append((ok, slow))
+                calls = len(self._outcomes)
+                if calls >= self.min_calls:
+                    errors = sum(1 for call_ok, _ in self._outcomes if not call_ok)
+                    slow_calls = sum(1 for _, call_slow in self._outcomes if call_slow)
+                    if errors / calls >= self.error_rate:
+                        self._trip(f"{errors} of the last {calls} calls failed")
+                    elif slow_calls / calls >= self.slow_rate:
+                        self._trip(f"{slow_calls} of the last {calls} calls took over {self.slow_seconds:.0f}s")
+
+    def _trip(self, reason: str) -> None:
+        """Open the breaker; call with the lock held."""
+        print(f"[ERROR] {self.name} circuit breaker opened for {self.cooldown:.0f}s: {reason}")
+        self.state = BREAKER_OPEN
+        self._opened_at = time.monotonic()
+        self._probing = False
+        self._counters['opened'] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report the breaker's state and recent calls.
+
+        Returns:
+            dict: State, calls in the window, error and slow rates, seconds until a probe and counters
+        """
+        with self._lock:
+            calls = len(self._outcomes)
+            return {
+                'state': self.state,
+                'calls': calls,
+                'error_rate': round(sum(1 for ok, _ in self._outcomes if not ok) / calls, 3) if calls else 0.0,
+                'slow_rate': round(sum(1 for _, slow in self._outcomes if slow) / calls, 3) if calls else 0.0,
+                'probe_in': (round(max(0.0, self._opened_at + self.cooldown - time.monotonic()), 1)
+                             if self.state == BREAKER_OPEN else None),
+                **self._counters
+            }
+
+
+class LLMDispatcher:
+    """
+    Runs provider attempts on a thread pool, hedging slow ones within a budget.
+
+    Attempts run on pool threads so the caller can stop waiting for one; an
+    attempt that loses a race is abandoned rather than interrupted, and its
+    result is discarded when it returns. Providers whose circuit breaker is
+    open are skipped, unless every provider's is.
+    """
+
+    def __init__(self, hedge: bool, hedge_percentile: float, hedge_after: float, min_samples: int,
+                 min_delay: float, budget: float, burst: float, window: int, max_workers: int,
+                 breaker: Callable[[str], CircuitBreaker]):
+        """
+        Initialize the dispatcher; the thread pool is created on first use.
+
+        Args:
+            hedge (bool): Start the next provider while a slow one is still running
+            hedge_percentile (float): Latency percentile of a provider after which it is hedged
+            hedge_after (float): Hedge delay in seconds until a provider has enough samples
+            min_samples (int): Successful calls needed before the percentile is used
+            min_delay (float): Shortest hedge delay in seconds
+            budget (float): Hedges allowed per dispatched request on average
+            burst (float): Hedges allowed in a row when the budget has been saved up
+            window (int): Recent successful calls kept per provider
+            max_workers (int): Threads running provider calls
+            breaker (callable): Creates the circuit breaker for a provider name
+        """
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_after = hedge_after
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.budget = budget
+        self.burst = burst
+        self.window = window
+        self.max_workers = max_workers
+        self._tokens = burst
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._counters = {'requests': 0, 'succeeded': 0, 'failed': 0, 'fallbacks': 0,
+                          'timed_out': 0, 'hedges': 0, 'hedges_won': 0, 'hedges_denied': 0,
+                          'abandoned': 0, 'breaker_skips': 0, 'all_breakers_open': 0}
+        self._wins: Dict[str, int] = {}
+        self._new_breaker = breaker
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Create the thread pool on first use."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='llm-call')
+            return self._executor
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    def _record_latency(self, provider: str, seconds: float) -> None:
+        with self._lock:
+            self._latencies.setdefault(provider, deque(maxlen=self.window)).append(seconds)
+
+    def hedge_delay(self, provider: str) -> float:
+        """
+        Get how long to wait for a provider before hedging it.
+
+        Args:
+            provider (str): Provider name
+
+        Returns:
+            float: Seconds; the rolling percentile of its successful calls once there are enough
+        """
+        with self._lock:
+            samples = list(self._latencies.get(provider, ()))
+        if len(samples) < self.min_samples:
+            return self.hedge_after
+        return max(self.min_delay, percentile(samples, self.hedge_percentile))
+
+    def _take_hedge(self) -> bool:
+        """Spend one hedge from the budget, if any is left."""
+        with self._lock:
+            if self._tokens < 1:
+                self._counters['hedges_denied'] += 1
+                return False
+            self._tokens -= 1
+            self._counters['hedges'] += 1
+            return True
+
+    def breaker(self, provider: str) -> CircuitBreaker:
+        """
+        Get a provider's circuit breaker.
+
+        Args:
+            provider (str): Provider name
+
+        Returns:
+            CircuitBreaker: The provider's breaker, created closed on first use
+        """
+        with self._lock:
+            if provider not in self._breakers:
+                self._breakers[provider] = self._new_breaker(provider)
+            return self._breakers[provider]
+
+    def _start(self, provider: str, call: Callable[[], Optional[Dict[str, Any]]], probe: bool = False) -> Future:
+        """
+        Run one attempt on the pool, recording its latency and outcome when it finishes.
+
+        A probe that ends without an outcome, because the card ran out of time
+        or the attempt was cancelled before it started, is released so the
+        provider is probed again by a later request.
+        """
+        breaker = self.breaker(provider)
+        started = time.monotonic()
+
+        def timed_call():
+            ok = None
+            try:
+                result = call()
+                ok = bool(result)
+                return result
+            except DeadlineExceeded:
+                # Not the provider's fault: the card ran out of time before the call
+                raise
+            except Exception:
+                ok = False
+                raise
+            finally:
+                seconds = time.monotonic() - started
+                if ok is not None:
+                    breaker.record(ok, seconds, probe)
+                    if ok:
+                        self._record_latency(provider, seconds)
+                elif probe:
+                    breaker.release_probe()
+
+        try:
+            future = self._get_executor().submit(timed_call)
+        except RuntimeError:
+            # The interpreter is shutting down and the pool takes no new work; call inline
+            future = Future()
+            try:
+                future.set_result(timed_call())
+            except Exception as e:
+                future.set_exception(e)
+        if probe:
+            future.add_done_callback(lambda done: done.cancelled() and breaker.release_probe())
+        return future
+
+    def dispatch(self, attempts: List[Attempt], report: Callable[..., None],
+                 deadline: Optional[Deadline] = None) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """
+        Run provider attempts until one returns card data.
+
+        Attempts are tried in order. Without hedging, the next one starts
+        only after the previous one failed; with hedging, it also starts
+        when the running one exceeds its hedge delay and the budget allows.
+        Attempts still running when the deadline passes are abandoned.
+
+        Args:
+            attempts (list): (provider, call) pairs in priority order; call() returns card data
+                or None, and may raise ProviderUnavailable or any provider error
+            report (callable): Called as report(event, **data) with 'llm_attempt' (provider),
+                'llm_hedge' (provider, after) and 'llm_fallback' (provider, reason)
+            deadline (Deadline, optional): Time by which card data is needed
+
+        Returns:
+            tuple: (provider, card data) of the first success, or (None, None) if all failed
+
+        Raises:
+            DeadlineExceeded: If the deadline passes before any attempt succeeds
+        """
+        with self._lock:
+            self._counters['requests'] += 1
+            self._tokens = min(self.burst, self._tokens + self.budget)
+
+        # Skip providers whose breaker is open; if all are, try them anyway rather than fail outright
+        queue = [attempt for attempt in attempts if self.breaker(attempt[0]).available()]
+        skipped = [provider for provider, _ in attempts if provider not in dict(queue)]
+        ignore_breakers = not queue
+        if ignore_breakers:
+            print("[DEBUG] Circuit breakers are open for every LLM provider, trying them anyway")
+            queue = list(attempts)
+            self._count('all_breakers_open')
+        elif skipped:
+            print(f"[DEBUG] Skipping {', '.join(skipped)}: circuit breaker open")
+            with self._lock:
+                self._counters['breaker_skips'] += len(skipped)
+        running: Dict[Future, Tuple[str, float]] = {}
+        hedged = False
+        may_hedge = self.hedge
+        reason = None
+
+        def start_next(fallback_reason: Optional[str] = None) -> bool:
+            while queue:
+                provider, call = queue.pop(0)
+                allowed, probe = (True, False) if ignore_breakers else self.breaker(provider).acquire()
+                if not allowed:
+                    # Another request is already probing this provider
+                    self._count('breaker_skips')
+                    continue
+                if fallback_reason:
+                    report('llm_fallback', provider=provider, reason=fallback_reason)
+                    self._count('fallbacks')
+                report('llm_attempt', provider=provider)
+                running[self._start(provider, call, probe)] = (provider, time.monotonic())
+                return True
+            return False
+
+        while queue or running:
+            if deadline is not None and deadline.expired:
+                self._abandon(running)
+                raise DeadlineExceeded("Card generation ran out of time while writing the card text, "
+                                       "please try again")
+            if not running and not start_next(reason):
+                break
+
+            # Wait for the newest attempt, but only as long as its hedge delay if a hedge is
+            # possible, and never past the deadline
+            timeout = None
+            if may_hedge and queue:
+                provider, started = list(running.values())[-1]
+                timeout = max(0.0, started + self.hedge_delay(provider) - time.monotonic())
+            if deadline is not None:
+                timeout = deadline.remaining() if timeout is None else min(timeout, deadline.remaining())
+            done, _ = wait(list(running), timeout=timeout, return_when=FIRST_COMPLETED)
+
+            if not done and deadline is not None and deadline.expired:
+                continue
+            if not done:
+                slow_provider, started = list(running.values())[-1]
+                if self._take_hedge():
+                    print(f"[DEBUG] {slow_provider} is slow ({time.monotonic() - started:.1f}s), "
+                          f"also trying {queue[0][0]}")
+                    report('llm_hedge', provider=queue[0][0], after=round(time.monotonic() - started, 1))
+                    hedged = True
+                    start_next()
+                else:
+                    print(f"[DEBUG] {slow_provider} is slow but the hedge budget is spent, waiting")
+                    may_hedge = False
+                continue
+
+            for future in done:
+                provider, _ = running.pop(future)
+                try:
+                    result = future.result()
+                except (ProviderUnavailable, DeadlineExceeded) as e:
+                    result, reason = None, str(e)
+                except Exception as e:
+                    print(f"[ERROR] {provider} call failed: {e}")
+                    result, reason = None, f"{provider} failed: {type(e).__name__}"
+                else:
+                    if not result:
+                        reason = f"{provider} returned no usable card data"
+                if result:
+                    self._finish(provider, hedged and provider != attempts[0][0], running)
+                    return provider, result
+        if deadline is not None and deadline.expired:
+            self._abandon(running)
+            raise DeadlineExceeded("Card generation ran out of time while writing the card text, "
+                                   "please try again")
+        self._count('failed')
+        return None, None
+
+    def _abandon(self, running: Dict[Future, Any]) -> None:
+        """Count a dispatch that ran out of time and drop its running attempts."""
+        for future in running:
+            future.cancel()
+        with self._lock:
+            self._counters['timed_out'] += 1
+            self._counters['abandoned'] += len(running)
+
+    def _finish(self, provider: str, hedge_won: bool, abandoned: Dict[Future, Any]) -> None:
+        """Count a successful dispatch and drop the attempts that lost."""
+        # cancel() only stops attempts that have not started; a running call still completes
+        # its (paid) request, and its result is discarded
+        for future in abandoned:
+            future.cancel()
+        with self._lock:
+            self._counters['succeeded'] += 1
+            self._counters['abandoned'] += len(abandoned)
+            if hedge_won:
+                self._counters['hedges_won'] += 1
+            self._wins[provider] = self._wins.get(provider, 0) + 1
+
+    def breaker_states(self, detail: bool = False) -> Dict[str, Any]:
+        """
+        Report each provider's circuit breaker.
+
+        Args:
+            detail (bool): Include rates and counters, not just the state
+
+        Returns:
+            dict: Provider name to state, or to the breaker's stats with detail
+        """
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {provider: breaker.stats() if detail else breaker.state for provider, breaker in breakers.items()}
+
+    def after_fork(self) -> None:
+        """Forget the thread pool inherited from a parent process."""
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report hedging configuration, counters and provider latencies.
+
+        Returns:
+            dict: Counters, wins per provider and per-provider p50/p90 latency and hedge delay
+        """
+        with self._lock:
+            latencies = {provider: list(samples) for provider, samples in self._latencies.items()}
+            stats = {
+                'hedge': self.hedge,
+                'hedge_budget': self.budget,
+                'hedge_tokens': round(self._tokens, 2),
+                'wins': dict(self._wins),
+                **self._counters
+            }
+        stats['breakers'] = self.breaker_states(detail=True)
+        stats['providers'] = {
+            provider: {
+                'samples': len(samples),
+                'p50': round(percentile(samples, 50), 3),
+                'p90': round(percentile(samples, 90), 3),
+                'hedge_delay': round(self.hedge_delay(provider), 3)
+            }
+            for provider, samples in latencies.items()
+        }
+        return stats
+
+
+# Process-wide dispatcher used by llm_api
+llm_dispatcher = LLMDispatcher(LLM_HEDGE, LLM_HEDGE_PERCENTILE, LLM_HEDGE_AFTER, LLM_HEDGE_MIN_SAMPLES,
+                               LLM_HEDGE_MIN_SECONDS, LLM_HEDGE_BUDGET, LLM_HEDGE_BURST, LLM_LATENCY_WINDOW,
+                               LLM_DISPATCH_THREADS,
+                               lambda provider: CircuitBreaker(provider, LLM_BREAKER_WINDOW, LLM_BREAKER_MIN_CALLS,
+                                                               LLM_BREAKER_ERROR_RATE, LLM_BREAKER_SLOW_SECONDS,
+                                                               LLM_BREAKER_SLOW_RATE, LLM_BREAKER_COOLDOWN))
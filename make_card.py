@@ -12,9 +12,18 @@ import os
 import sys
 from pathlib import Path
 
+from werkzeug.utils import secure_filename
+
 # Import from new modular structure
 from llm_api import generate_card_data
-from card_graphics import create_card_image
+from card_graphics import create_card_image, default_card_filename
+from card_index import card_index
+from card_output import recent_cards
+from card_storage import card_store, photo_store
+from card_uploads import UploadRejected, receive_upload
+from card_deadline import CARD_DEADLINE_SECONDS, CARD_RENDER_RESERVE_SECONDS, Deadline, DeadlineExceeded
+from llm_cache import CACHE_USE
+from render_pool import RenderPoolBusy, render_pool
 
 # Load API keys from environment variables (required for Render deployment)
 OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY')
@@ -73,7 +82,12 @@ def generate_card_descriptor(card_data, custom_descriptor=None):
 
 def save_uploaded_image(uploaded_file, original_filename):
     """
-    Save uploaded image to Original_Photos folder.
+    Validate an uploaded image and save it to the Original_Photos content store.
+    
+    The upload is spooled and hashed in one pass and checked with
+    card_uploads.receive_upload, so unusable files are rejected before any
+    LLM call. Identical uploads are stored once, whatever name they are
+    uploaded under.
     
     Args:
         uploaded_file: Flask file object
@@ -81,30 +95,19 @@ def save_uploaded_image(uploaded_file, original_filename):
         
     Returns:
         str: Path to saved image file
+        
+    Raises:
+        UploadRejected: If the upload is not a usable photo
     """
-    # Ensure Original_Photos directory exists
-    os.makedirs("Original_Photos", exist_ok=True)
-    
-    # Create safe filename
-    safe_filename = original_filename.replace(' ', '_').replace('-', '_')
-    file_path = os.path.join("Original_Photos", safe_filename)
-    
-    # Check if filename was changed (has spaces or hyphens)
-    original_path = os.path.join("Original_Photos", original_filename)
-    filename_was_changed = safe_filename != original_filename
-    
-    # Save the file
-    uploaded_file.save(file_path)
-    
-    # If filename was changed and original file exists, delete it to avoid duplicates
-    if filename_was_changed and os.path.exists(original_path) and original_path != file_path:
-        try:
-            os.remove(original_path)
-            print(f"Deleted original file: {original_path}")
-        except Exception as e:
-            print(f"Warning: Could not delete original file {original_path}: {e}")
-    
-    return file_path
+    upload = receive_upload(uploaded_file.stream)
+    try:
+        # Create safe filename; the client's name must not reach the store as a path
+        safe_filename = secure_filename(original_filename or '').replace('-', '_') or f"upload.{upload.format.lower()}"
+        print(f"[DEBUG] Upload {safe_filename}: {upload.format} {upload.width}x{upload.height}, {upload.size} bytes")
+        name = photo_store.put_named_file(safe_filename, upload.file, upload.digest, upload.size)
+    finally:
+        upload.file.close()
+    return photo_store.local_path(name)
 
 
 def generate_card_web(uploaded_file, traits, custom_descriptor=None, gemini_api_key=None, openai_api_key=None):
@@ -121,9 +124,54 @@ def generate_card_web(uploaded_file, traits, custom_descriptor=None, gemini_api_
     Returns:
         dict: Result with success status, card data, and file path
     """
+    deadline = Deadline(CARD_DEADLINE_SECONDS)
     try:
         print(f"[GENERATE_CARD_WEB] Starting card generation...")
         print(f"[GENERATE_CARD_WEB] File: {uploaded_file.filename if uploaded_file else 'None'}")
+        
+        # Save uploaded image
+        print("[GENERATE_CARD_WEB] Saving uploaded image...")
+        original_filename = uploaded_file.filename
+        image_path = save_uploaded_image(uploaded_file, original_filename)
+        print(f"[GENERATE_CARD_WEB] Image saved to: {image_path}")
+        
+    except UploadRejected as e:
+        print(f"[GENERATE_CARD_WEB] Upload rejected: {str(e)}")
+        return {"success": False, "error": str(e)}
+    except Exception as e:
+        print(f"[GENERATE_CARD_WEB] EXCEPTION: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return {"success": False, "error": f"Unexpected error: {str(e)}"}
+    
+    return generate_card_from_photo(image_path, traits, gemini_api_key, openai_api_key, deadline)
+
+
+def generate_card_from_photo(image_path, traits, gemini_api_key=None, openai_api_key=None, deadline=None,
+                             cache_mode=CACHE_USE, progress=None):
+    """
+    Generate a character card for a saved photo, e.g. as a background job.
+    
+    The LLM calls get what is left of the deadline minus a reserve for
+    rendering, and the render gets the rest.
+    
+    Args:
+        image_path (str): Path to the saved source photo
+        traits (list): List of 5 character traits
+        gemini_api_key (str, optional): Gemini API key for primary LLM service
+        openai_api_key (str, optional): OpenAI API key for fallback LLM service
+        deadline (Deadline, optional): Time by which the card must be stored, defaults to
+            CARD_DEADLINE_SECONDS from now
+        cache_mode (str, optional): Whether to use, reroll or bypass cached card text (see llm_cache)
+        progress (callable, optional): Called as progress(event, **data) as generation advances:
+            'llm', the LLM provider events, 'card_data', 'render' and 'image_ready'
+        
+    Returns:
+        dict: Result with success status, card data, and file path
+    """
+    report = progress or (lambda event, **data: None)
+    deadline = deadline or Deadline(CARD_DEADLINE_SECONDS)
+    try:
         print(f"[GENERATE_CARD_WEB] Traits count: {len(traits) if traits else 0}")
         print(f"[GENERATE_CARD_WEB] Gemini API key available: {'Yes' if gemini_api_key else 'No'}")
         print(f"[GENERATE_CARD_WEB] OpenAI API key available: {'Yes' if openai_api_key else 'No'}")
@@ -137,34 +185,44 @@ def generate_card_web(uploaded_file, traits, custom_descriptor=None, gemini_api_
             print("[GENERATE_CARD_WEB] ERROR: No API keys available")
             return {"success": False, "error": "No API keys configured. Please check your environment variables."}
         
-        # Save uploaded image
-        print("[GENERATE_CARD_WEB] Saving uploaded image...")
-        original_filename = uploaded_file.filename
-        image_path = save_uploaded_image(uploaded_file, original_filename)
-        print(f"[GENERATE_CARD_WEB] Image saved to: {image_path}")
-        
         # Generate card data with AI-generated name using both API keys
         print("[GENERATE_CARD_WEB] Generating card data with AI...")
-        card_data = generate_card_data(traits, effective_gemini_key, effective_openai_key)
+        deadline.check("writing the card text")
+        report('llm')
+        card_data = generate_card_data(traits, effective_gemini_key, effective_openai_key, report,
+                                       deadline.reserve(CARD_RENDER_RESERVE_SECONDS), cache_mode)
         if not card_data:
             print("[GENERATE_CARD_WEB] ERROR: Failed to generate card data")
             return {"success": False, "error": "Failed to generate card data. Check API keys and try again."}
         
         print(f"[GENERATE_CARD_WEB] Card data generated successfully: {card_data.get('card_name', 'Unknown')}")
+        report('card_data', card_name=card_data.get('card_name'), custom_type=card_data.get('custom_type'),
+               category=card_data.get('category'))
         
         # Generate filename using AI-generated card name (before creating image)
         card_name = card_data.get('card_name', 'Unknown Card')
-        import time
-        safe_name = "".join(c if c.isalnum() or c in (' ', '_') else '_' for c in card_name)
-        safe_name = safe_name.replace(' ', '_')
-        timestamp = int(time.time())
-        filename = f"{safe_name}_{timestamp}.png"
+        filename = default_card_filename(card_data)
         
-        # Create card image with the specific filename
+        # Render the card in the render worker pool, off the request thread
         print("[GENERATE_CARD_WEB] Creating card image...")
-        success = create_card_image(image_path, card_data, filename)
+        render_timeout = deadline.timeout("drawing the card")
+        report('render')
+        try:
+            render_result = render_pool.render(image_path, card_data, filename, render_timeout)
+        except RenderPoolBusy as e:
+            print(f"[GENERATE_CARD_WEB] ERROR: {e}")
+            return {"success": False, "error": str(e)}
         
-        if success:
+        if render_result.success:
+            # Store by content hash; the name only changes if it is already taken
+            filename = card_store.put_named(filename, render_result.card.data)
+            # Keep the encoded card so the browser's first fetch is served from memory
+            recent_cards.save(render_result.card._replace(filename=filename))
+            try:
+                card_index.add(filename, render_result.card.size, card_data)
+            except Exception as e:
+                print(f"[GENERATE_CARD_WEB] Warning: Could not add card to gallery index: {e}")
+            report('image_ready', filename=filename)
             print(f"[GENERATE_CARD_WEB] Card generation successful: {filename}")
             return {
                 "success": True,
@@ -174,9 +232,12 @@ def generate_card_web(uploaded_file, traits, custom_descriptor=None, gemini_api_
                 "descriptor": card_data.get('custom_type', 'Vibe')
             }
         else:
-            print("[GENERATE_CARD_WEB] ERROR: Failed to create card image")
+            print(f"[GENERATE_CARD_WEB] ERROR: Failed to create card image: {render_result.error}")
             return {"success": False, "error": "Failed to create card image"}
             
+    except DeadlineExceeded as e:
+        print(f"[GENERATE_CARD_WEB] ERROR: {str(e)} ({deadline.seconds:.0f}s budget)")
+        return {"success": False, "error": str(e)}
     except Exception as e:
         print(f"[GENERATE_CARD_WEB] EXCEPTION: {str(e)}")
         import traceback
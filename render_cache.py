@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Render Cache Module
+
+This module provides a process-wide, byte-budgeted LRU cache for image
+layers that are expensive to build but identical across renders, such as
+panel gradients and rounded-rectangle masks.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable
+from PIL import Image
+
+# Default budget for cached layers, overridable via environment
+DEFAULT_CACHE_MB = 64
+
+
+def _image_nbytes(image: Image.Image) -> int:
+    """
+    Estimate the memory held by an image's pixel buffer.
+
+    Args:
+        image: PIL Image object
+
+    Returns:
+        int: Approximate size in bytes
+    """
+    return image.width * image.height * len(image.getbands())
+
+
+def _readonly_view(image: Image.Image) -> Image.Image:
+    """
+    Wrap a cached image in a read-only view sharing the same pixel buffer.
+
+    Any mutating call on the view (paste, putalpha, ImageDraw, ...) makes
+    Pillow copy the buffer first, so the cached layer itself never changes.
+
+    Args:
+        image: Cached PIL Image object
+
+    Returns:
+        PIL.Image: Copy-on-write view of the image
+    """
+    view = image._new(image.im)
+    view.readonly = 1
+    return view
+
+
+class LayerCache:
+    """
+    Thread-safe LRU cache of image layers with a total byte budget.
+
+    Layers are handed out as copy-on-write views, so callers can use them
+    like any other image without corrupting the shared copy.
+    """
+
+    def __init__(self, max_bytes: int):
+        """
+        Initialize the cache.
+
+        Args:
+            max_bytes (int): Maximum total size of cached pixel buffers
+        """
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, Image.Image]" = OrderedDict()
+        self._current_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], Image.Image]) -> Image.Image:
+        """
+        Return the cached layer for key, building it with factory on a miss.
+
+        Args:
+            key: Hashable cache key describing the layer
+            factory: Zero-argument callable that builds the layer
+
+        Returns:
+            PIL.Image: Read-only view of the cached layer
+        """
+        with self._lock:
+            image = self._entries.get(key)
+            if image is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return _readonly_view(image)
+            self.misses += 1
+
+        # Build outside the lock; a concurrent miss for the same key only
+        # costs a duplicate build, never a wrong result.
+        image = factory()
+        image.load()
+        self._store(key, image)
+        return _readonly_view(image)
+
+    def _store(self, key: Hashable, image: Image.Image) -> None:
+        """Insert a layer and evict least recently used entries over budget."""
+        nbytes = _image_nbytes(image)
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._current_bytes -= _image_nbytes(previous)
+            self._entries[key] = image
+            self._current_bytes += nbytes
+            while self._current_bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._current_bytes -= _image_nbytes(evicted)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop all cached layers and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._current_bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report cache usage counters.
+
+        Returns:
+            dict: Entry count, byte usage, hit/miss/eviction counters
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+
+
+# Process-wide cache shared by all renders
+layer_cache = LayerCache(int(float(os.environ.get('CARD_LAYER_CACHE_MB', DEFAULT_CACHE_MB)) * 1024 * 1024))
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Render Pool Module
+
+Runs card rendering for the web app in a dedicated pool of worker
+processes, so CPU-bound Pillow work never runs on a request thread. The
+pool has its own bounded queue, recycles workers after a number of
+renders and enforces a per-render timeout.
+"""
+
+import atexit
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional
+
+from batch_render import RenderJob, RenderResult, init_render_worker, render_job
+
+# Pool configuration, overridable via environment
+RENDER_POOL_WORKERS = int(os.environ.get('RENDER_POOL_WORKERS', max(1, (os.cpu_count() or 2) - 1)))
+RENDER_POOL_QUEUE = int(os.environ.get('RENDER_POOL_QUEUE', RENDER_POOL_WORKERS * 2))
+RENDER_POOL_MAX_TASKS = int(os.environ.get('RENDER_POOL_MAX_TASKS', 200))
+RENDER_TIMEOUT = float(os.environ.get('RENDER_TIMEOUT', 30))
+
+
+class RenderPoolBusy(Exception):
+    """Raised when the render queue is full."""
+
+
+class RenderPool:
+    """
+    Bounded process pool for rendering cards on behalf of request handlers.
+
+    The executor is created on first use, so importing this module (for
+    example in a preloading gunicorn master) never starts processes.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int, max_tasks_per_child: int, timeout: float):
+        """
+        Initialize the pool.
+
+        Args:
+            max_workers (int): Render processes; 0 renders inline on the calling thread
+            max_queue (int): Renders allowed to wait for a free worker
+            max_tasks_per_child (int): Renders before a worker process is replaced
+            timeout (float): Seconds to wait for a render before giving up
+        """
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.max_tasks_per_child = max_tasks_per_child
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue) if max_workers else None
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._counters = {'submitted': 0, 'completed': 0, 'failed': 0, 'rejected': 0, 'timed_out': 0}
+        self._in_flight = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Create the process pool on first use."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                     initializer=init_render_worker,
+                                                     max_tasks_per_child=self.max_tasks_per_child)
+            return self._executor
+
+    def _discard_executor(self) -> None:
+        """Drop a broken executor so the next render creates a new one."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    def _render_done(self, future: Future) -> None:
+        """Free a render's slot once it has really finished, been cancelled or lost its worker."""
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def render(self, source_image_path: str, card_data: Dict[str, Any], filename: str,
+               timeout: Optional[float] = None) -> RenderResult:
+        """
+        Render a card in the pool and wait for the result.
+
+        The card is returned encoded rather than saved, so the caller decides
+        where it is stored.
+
+        Args:
+            source_image_path (str): Path to the source image file
+            card_data (dict): Generated card data
+            filename (str): Card file name
+            timeout (float, optional): Seconds to wait, if shorter than the pool's timeout
+
+        Returns:
+            RenderResult: Encoded card, or error for the render
+
+        Raises:
+            RenderPoolBusy: If the queue is full
+        """
+        job = RenderJob(source_image_path, card_data, filename)
+        timeout = min(self.timeout, timeout) if timeout is not None else self.timeout
+        if not self.max_workers:
+            result = render_job(0, job, return_card=True, save=False)
+            self._count('completed' if result.success else 'failed')
+            return result
+
+        if not self._slots.acquire(blocking=False):
+            self._count('rejected')
+            raise RenderPoolBusy("Card renderer is busy, please try again shortly")
+
+        try:
+            future = self._get_executor().submit(render_job, 0, job, return_card=True, save=False)
+        except BaseException:
+            self._slots.release()
+            raise
+        self._count('submitted')
+        # The slot is freed when the render ends, not when we stop waiting: a render that
+        # timed out still occupies a worker process, so it stays in flight until it finishes
+        with self._lock:
+            self._in_flight += 1
+        future.add_done_callback(self._render_done)
+
+        try:
+            result = future.result(timeout=timeout)
+        except FutureTimeoutError:
+            # Only stops a render that has not started yet
+            future.cancel()
+            self._count('timed_out')
+            return RenderResult(0, job, None, f"Render timed out after {timeout:.0f}s", timeout)
+        except BrokenProcessPool as e:
+            # A worker died (e.g. out of memory); start a fresh pool for the next render
+            self._discard_executor()
+            self._count('failed')
+            return RenderResult(0, job, None, f"Render worker crashed: {e}", 0.0)
+        self._count('completed' if result.success else 'failed')
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report pool configuration and counters.
+
+        Returns:
+            dict: Pool size, queue limit, renders in flight (timed out ones included) and render counters
+        """
+        with self._lock:
+            return {
+                'workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'max_tasks_per_child': self.max_tasks_per_child,
+                'timeout': self.timeout,
+                'started': self._executor is not None,
+                'in_flight': self._in_flight,
+                **self._counters
+            }
+
+    def shutdown(self) -> None:
+        """Stop the worker processes, cancelling queued renders."""
+        self._discard_executor()
+
+
+# Process-wide pool used by the web app
+render_pool = RenderPool(RENDER_POOL_WORKERS, RENDER_POOL_QUEUE, RENDER_POOL_MAX_TASKS, RENDER_TIMEOUT)
+atexit.register(render_pool.shutdown)
@@ -18,6 +18,11 @@ document.addEventListener('DOMContentLoaded', function() {
     const downloadBtn = document.getElementById('downloadBtn');
     const newCardBtn = document.getElementById('newCardBtn');
 
+    // The generator form only exists on the main page
+    if (!form) {
+        return;
+    }
+
     // Store uploaded file globally for reliable access
     let uploadedFile = null;
 
@@ -184,13 +189,17 @@ document.addEventListener('DOMContentLoaded', function() {
             })
             .then(response => {
                 console.log('Response received:', response.status, response.statusText);
-                if (!response.ok) {
+                if (!response.ok && response.status !== 503) {
                     throw new Error(`HTTP ${response.status}: ${response.statusText}`);
                 }
                 return response.json();
             })
             .then(data => {
                 console.log('Response data:', data);
+                // The card is generated in a background job; follow it until it finishes
+                return data.success ? watchJob(data) : data;
+            })
+            .then(data => {
                 showLoading(false);
                 
                 if (data.success) {
@@ -213,6 +222,89 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
 
+    // Loading message for each job stage
+    const stageMessages = {
+        queued: 'Waiting for a free card generator...',
+        llm: 'Writing your card...',
+        render: 'Rendering your epic card...'
+    };
+
+    function setLoadingMessage(message) {
+        const loadingText = loading.querySelector('span');
+        if (loadingText) {
+            loadingText.textContent = message;
+        }
+    }
+
+    // Follow a generation job's progress events, resolving to its result.
+    // Falls back to polling when EventSource is unavailable or the stream fails.
+    function watchJob(job) {
+        if (!window.EventSource || !job.events_url) {
+            return waitForJob(job.status_url);
+        }
+        return new Promise((resolve, reject) => {
+            const source = new EventSource(job.events_url);
+            let cardNamed = false;
+
+            source.addEventListener('llm', () => setLoadingMessage(stageMessages.llm));
+            source.addEventListener('llm_fallback', () => setLoadingMessage('Still writing your card, trying our backup writer...'));
+            source.addEventListener('llm_hedge', () => setLoadingMessage('Still writing your card, asking our backup writer too...'));
+            source.addEventListener('llm_cached', () => setLoadingMessage('Found card text for these traits...'));
+            source.addEventListener('card_data', (event) => {
+                const card = JSON.parse(event.data);
+                cardNamed = true;
+                setLoadingMessage(`Meet ${card.card_name} (${card.custom_type})! Rendering the card...`);
+            });
+            source.addEventListener('render', () => {
+                if (!cardNamed) {
+                    setLoadingMessage(stageMessages.render);
+                }
+            });
+            source.addEventListener('done', (event) => {
+                source.close();
+                resolve(JSON.parse(event.data).result);
+            });
+            source.addEventListener('failed', (event) => {
+                source.close();
+                resolve({ success: false, error: JSON.parse(event.data).error });
+            });
+            source.onerror = () => {
+                // The browser retries dropped streams itself; only give up on a closed one
+                if (source.readyState === EventSource.CLOSED) {
+                    console.warn('Progress stream closed, polling the job instead');
+                    waitForJob(job.status_url).then(resolve, reject);
+                }
+            };
+        });
+    }
+
+    // Poll a generation job until it is done or failed, resolving to its result
+    async function waitForJob(statusUrl) {
+        const loadingText = loading.querySelector('span');
+        let delay = 500;
+        while (true) {
+            await new Promise(resolve => setTimeout(resolve, delay));
+            delay = Math.min(delay * 1.5, 2000);
+
+            const response = await fetch(statusUrl, { cache: 'no-store' });
+            if (!response.ok) {
+                throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+            }
+            const job = await response.json();
+            console.log('Job stage:', job.stage);
+
+            if (job.stage === 'done') {
+                return job.result;
+            }
+            if (job.stage === 'failed') {
+                return { success: false, error: job.error };
+            }
+            if (loadingText && stageMessages[job.stage]) {
+                loadingText.textContent = stageMessages[job.stage];
+            }
+        }
+    }
+
     function validateForm() {
         console.log('Validating form...');
         
@@ -240,6 +332,10 @@ document.addEventListener('DOMContentLoaded', function() {
 
     function showLoading(show) {
         if (show) {
+            const loadingText = loading.querySelector('span');
+            if (loadingText) {
+                loadingText.textContent = 'Generating your epic card...';
+            }
             generateBtn.style.display = 'none';
             loading.style.display = 'flex';
             resultSection.style.display = 'none';
@@ -419,3 +515,117 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     });
 });
+
+// Gallery: load further pages from /api/cards as the user scrolls
+document.addEventListener('DOMContentLoaded', function() {
+    const cardsGrid = document.getElementById('cardsGrid');
+    const sentinel = document.getElementById('gallerySentinel');
+    if (!cardsGrid || !sentinel) {
+        return;
+    }
+
+    const filters = JSON.parse(cardsGrid.dataset.filters || '{}');
+    const variantWidths = JSON.parse(cardsGrid.dataset.variantWidths || '{}');
+    let nextCursor = cardsGrid.dataset.nextCursor;
+    let loadingPage = false;
+
+    const observer = new IntersectionObserver((entries) => {
+        if (entries.some(entry => entry.isIntersecting)) {
+            loadNextPage();
+        }
+    }, { rootMargin: '600px 0px' });
+    observer.observe(sentinel);
+
+    function variantUrl(variant, filename) {
+        return `/variant/${variant}/${encodeURIComponent(filename)}`;
+    }
+
+    function createCardItem(card) {
+        const item = document.createElement('div');
+        item.className = 'card-item';
+
+        const img = document.createElement('img');
+        img.className = 'card-thumbnail';
+        img.src = variantUrl('thumb', card.filename);
+        img.srcset = Object.entries(variantWidths)
+            .map(([variant, width]) => `${variantUrl(variant, card.filename)} ${width}w`)
+            .join(', ');
+        img.sizes = '250px';
+        img.width = 250;
+        img.height = 350;
+        img.loading = 'lazy';
+        img.decoding = 'async';
+        img.alt = card.card_name || card.filename;
+        item.appendChild(img);
+
+        const name = document.createElement('div');
+        name.className = 'card-filename';
+        name.textContent = card.card_name || card.filename;
+        item.appendChild(name);
+
+        if (card.custom_type) {
+            const type = document.createElement('div');
+            type.className = 'card-type';
+            type.textContent = card.custom_type;
+            item.appendChild(type);
+        }
+
+        const size = document.createElement('div');
+        size.className = 'card-size';
+        size.textContent = `${(card.size / 1024).toFixed(1)} KB`;
+        item.appendChild(size);
+
+        const actions = document.createElement('div');
+        actions.className = 'card-actions';
+        const view = document.createElement('a');
+        view.className = 'btn-small btn-view';
+        view.href = `/card/${encodeURIComponent(card.filename)}`;
+        view.target = '_blank';
+        view.textContent = '👁️ View';
+        const download = document.createElement('a');
+        download.className = 'btn-small btn-download';
+        download.href = `/download/${encodeURIComponent(card.filename)}`;
+        download.textContent = '⬇️ Download';
+        actions.append(view, download);
+        item.appendChild(actions);
+
+        return item;
+    }
+
+    async function loadNextPage() {
+        if (!nextCursor || loadingPage) {
+            return;
+        }
+        loadingPage = true;
+
+        try {
+            const params = new URLSearchParams(filters);
+            params.set('cursor', nextCursor);
+            const response = await fetch(`/api/cards?${params}`);
+            const data = await response.json();
+            if (!response.ok) {
+                throw new Error(data.error || `HTTP ${response.status}`);
+            }
+
+            data.cards.forEach(card => cardsGrid.appendChild(createCardItem(card)));
+            nextCursor = data.next_cursor;
+        } catch (error) {
+            console.error('Error loading more cards:', error);
+            sentinel.textContent = 'Could not load more cards.';
+            nextCursor = null;
+        } finally {
+            loadingPage = false;
+        }
+
+        if (nextCursor) {
+            // Re-check in case the sentinel is still on screen after this page
+            observer.unobserve(sentinel);
+            observer.observe(sentinel);
+        } else {
+            observer.disconnect();
+            if (sentinel.textContent === 'Loading more cards...') {
+                sentinel.remove();
+            }
+        }
+    }
+});
@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+Storage Backends Module
+
+This module defines where stored cards and photos physically live. A
+backend keeps byte blobs under string keys: LocalBackend in a directory and
+S3Backend in an S3-compatible bucket (AWS S3, MinIO, R2...), so several app
+instances can share one store and browsers can be redirected to presigned
+URLs instead of streaming bytes through Python.
+"""
+
+import os
+import shutil
+import tempfile
+from typing import Any, BinaryIO, Iterator, NamedTuple, Optional
+
+# Backend selection, overridable via environment
+CARD_STORAGE_BACKEND = os.environ.get('CARD_STORAGE_BACKEND', 'local')
+CARD_S3_BUCKET = os.environ.get('CARD_S3_BUCKET')
+CARD_S3_PREFIX = os.environ.get('CARD_S3_PREFIX', '')
+CARD_S3_ENDPOINT_URL = os.environ.get('CARD_S3_ENDPOINT_URL')
+CARD_S3_REGION = os.environ.get('CARD_S3_REGION')
+
+
+def check_key(key: str) -> str:
+    """
+    Reject keys that could reach outside the store, such as '../x' or '/etc/x'.
+
+    Args:
+        key (str): Blob key
+
+    Returns:
+        str: The key, unchanged
+
+    Raises:
+        ValueError: If the key is absolute, has a '..' segment or contains a backslash
+    """
+    if key.startswith('/') or '\\' in key or '..' in key.split('/'):
+        raise ValueError(f"Invalid storage key: {key!r}")
+    return key
+
+
+def write_atomic(path: str, data: bytes) -> None:
+    """
+    Write a file so readers never see a partial object.
+
+    Args:
+        path (str): Destination path
+        data (bytes): File content
+    """
+    copy_atomic(path, data)
+
+
+def copy_atomic(path: str, source) -> None:
+    """
+    Write bytes or the rest of a readable file to a temp file, then rename it into place.
+
+    Args:
+        path (str): Destination path
+        source: bytes, or a binary file object to copy from its current position
+    """
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as temp_file:
+            if isinstance(source, (bytes, bytearray)):
+                temp_file.write(source)
+            else:
+                shutil.copyfileobj(source, temp_file)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+class BlobStat(NamedTuple):
+    """Size and modification time of a stored blob."""
+    size: int
+    modified: float
+
+
+class StorageBackend:
+    """
+    Blob storage addressed by '/'-separated keys such as 'objects/ab/cd/abcd....png'.
+
+    Subclasses implement put/get/stat/list/delete; presigned_url and
+    local_path return None when the backend cannot offer them.
+    """
+
+    name = 'abstract'
+
+    def put(self, key: str, data: bytes, content_type: Optional[str] = None) -> None:
+        """
+        Store a blob, replacing any blob with the same key.
+
+        Args:
+            key (str): Blob key
+            data (bytes): Blob content
+            content_type (str, optional): MIME type to record with the blob
+        """
+        raise NotImplementedError
+
+    def put_file(self, key: str, fileobj: BinaryIO, content_type: Optional[str] = None) -> None:
+        """
+        Store a blob from a file object without reading it all into memory.
+
+        Args:
+            key (str): Blob key
+            fileobj: Readable binary file, copied from its current position
+            content_type (str, optional): MIME type to record with the blob
+        """
+        self.put(key, fileobj.read(), content_type)
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Fetch a blob.
+
+        Args:
+            key (str): Blob key
+
+        Returns:
+            Optional[bytes]: Blob content, or None if the key does not exist
+        """
+        raise NotImplementedError
+
+    def stat(self, key: str) -> Optional[BlobStat]:
+        """
+        Get a blob's size and modification time.
+
+        Args:
+            key (str): Blob key
+
+        Returns:
+            Optional[BlobStat]: Blob details, or None if the key does not exist
+        """
+        raise NotImplementedError
+
+    def list(self, prefix: str = '') -> Iterator[str]:
+        """
+        List keys starting with a prefix.
+
+        Args:
+            prefix (str): Key prefix, e.g. 'names/'
+
+        Yields:
+            str: Matching keys
+        """
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        """
+        Remove a blob if it exists.
+
+        Args:
+            key (str): Blob key
+        """
+        raise NotImplementedError
+
+    def presigned_url(self, key: str, expires: int, content_type: Optional[str] = None,
+                      download_name: Optional[str] = None) -> Optional[str]:
+        """
+        Get a time-limited URL a browser can fetch the blob from directly.
+
+        Args:
+            key (str): Blob key
+            expires (int): Seconds the URL stays valid
+            content_type (str, optional): Content-Type the response should carry
+            download_name (str, optional): Serve as an attachment with this file name
+
+        Returns:
+            Optional[str]: URL, or None if the backend cannot serve blobs itself
+        """
+        return None
+
+    def local_path(self, key: str) -> Optional[str]:
+        """
+        Get a file path for a blob, for code that must open files.
+
+        Args:
+            key (str): Blob key
+
+        Returns:
+            Optional[str]: Path on this machine, or None if the blob is not stored locally
+        """
+        return None
+
+
+class LocalBackend(StorageBackend):
+    """Blobs stored as files under a directory."""
+
+    name = 'local'
+
+    def __init__(self, root: str):
+        """
+        Initialize the backend.
+
+        Args:
+            root (str): Directory blobs are stored under
+        """
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, *check_key(key).split('/'))
+
+    def put(self, key: str, data: bytes, content_type: Optional[str] = None) -> None:
+        write_atomic(self._path(key), data)
+
+    def put_file(self, key: str, fileobj: BinaryIO, content_type: Optional[str] = None) -> None:
+        copy_atomic(self._path(key), fileobj)
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._path(key), 'rb') as blob_file:
+                return blob_file.read()
+        except (FileNotFoundError, IsADirectoryError):
+            return None
+
+    def stat(self, key: str) -> Optional[BlobStat]:
+        try:
+            file_stat = os.stat(self._path(key))
+        except OSError:
+            return None
+        return BlobStat(file_stat.st_size, file_stat.st_mtime)
+
+    def list(self, prefix: str = '') -> Iterator[str]:
+        top = self._path(prefix.rsplit('/', 1)[0]) if '/' in prefix else self.root
+        for directory, _, files in os.walk(top):
+            relative = os.path.relpath(directory, self.root).replace(os.sep, '/')
+            for name in files:
+                key = name if relative == '.' else f"{relative}/{name}"
+                if key.startswith(prefix) and not name.endswith('.tmp'):
+                    yield key
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def local_path(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        return path if os.path.isfile(path) else None
+
+
+class S3Backend(StorageBackend):
+    """
+    Blobs stored in an S3-compatible bucket.
+
+    Requires boto3. Credentials come from boto3's usual sources (environment,
+    shared config or instance role); set endpoint_url to use MinIO or another
+    S3-compatible service.
+    """
+
+    name = 's3'
+
+    def __init__(self, bucket: str, prefix: str = '', endpoint_url: Optional[str] = None,
+                 region: Optional[str] = None, client: Any = None):
+        """
+        Initialize the backend.
+
+        Args:
+            bucket (str): Bucket name
+            prefix (str): Prefix added to every key, e.g. 'cards/'
+            endpoint_url (str, optional): Endpoint of an S3-compatible service
+            region (str, optional): Bucket region
+            client (optional): Ready-made boto3 S3 client (or a stand-in with the same
+                methods), used instead of creating one
+
+        Raises:
+            RuntimeError: If no client is given and boto3 is not installed
+        """
+        if client is None:
+            try:
+                import boto3
+                from botocore.config import Config
+            except ImportError as e:
+                raise RuntimeError("The S3 storage backend needs boto3 (pip install -r requirements-s3.txt)") from e
+            # Path-style addressing works with MinIO and other services without bucket DNS names
+            config = Config(s3={'addressing_style': 'path'}) if endpoint_url else None
+            client = boto3.client('s3', endpoint_url=endpoint_url, region_name=region, config=config)
+
+        self.bucket = bucket
+        self.prefix = prefix
+        self._client = client
+        self._client_error = client.exceptions.ClientError
+
+    def _missing(self, error: Exception) -> bool:
+        """Check whether a botocore error means the key does not exist."""
+        return error.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound')
+
+    def put(self, key: str, data: bytes, content_type: Optional[str] = None) -> None:
+        extra = {'ContentType': content_type} if content_type else {}
+        self._client.put_object(Bucket=self.bucket, Key=self.prefix + key, Body=data, **extra)
+
+    def put_file(self, key: str, fileobj: BinaryIO, content_type: Optional[str] = None) -> None:
+        extra = {'ExtraArgs': {'ContentType': content_type}} if content_type else {}
+        self._client.upload_fileobj(fileobj, self.bucket, self.prefix + key, **extra)
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            response = self._client.get_object(Bucket=self.bucket, Key=self.prefix + key)
+        except self._client_error as e:
+            if self._missing(e):
+                return None
+            raise
+        return response['Body'].read()
+
+    def stat(self, key: str) -> Optional[BlobStat]:
+        try:
+            response = self._client.head_object(Bucket=self.bucket, Key=self.prefix + key)
+        except self._client_error as e:
+            if self._missing(e):
+                return None
+            raise
+        return BlobStat(response['ContentLength'], response['LastModified'].timestamp())
+
+    def list(self, prefix: str = '') -> Iterator[str]:
+        paginator = self._client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix + prefix):
+            for entry in page.get('Contents', []):
+                yield entry['Key'][len(self.prefix):]
+
+    def delete(self, key: str) -> None:
+        self._client.delete_object(Bucket=self.bucket, Key=self.prefix + key)
+
+    def presigned_url(self, key: str, expires: int, content_type: Optional[str] = None,
+                      download_name: Optional[str] = None) -> Optional[str]:
+        params = {'Bucket': self.bucket, 'Key': self.prefix + key}
+        if content_type:
+            params['ResponseContentType'] = content_type
+        if download_name:
+            params['ResponseContentDisposition'] = f'attachment; filename="{download_name}"'
+        return self._client.generate_presigned_url('get_object', Params=params, ExpiresIn=expires)
+
+
+def backend_from_env(root: str, prefix: str) -> StorageBackend:
+    """
+    Create the backend selected by CARD_STORAGE_BACKEND.
+
+    Args:
+        root (str): Directory for the local backend
+        prefix (str): Key prefix within the bucket for the S3 backend, e.g. 'cards/'
+
+    Returns:
+        StorageBackend: Configured backend
+
+    Raises:
+        ValueError: If the backend name is unknown or the S3 bucket is not set
+    """
+    if CARD_STORAGE_BACKEND == 'local':
+        return LocalBackend(root)
+    if CARD_STORAGE_BACKEND == 's3':
+        if not CARD_S3_BUCKET:
+            raise ValueError("CARD_S3_BUCKET must be set for the s3 storage backend")
+        return S3Backend(CARD_S3_BUCKET, CARD_S3_PREFIX + prefix, CARD_S3_ENDPOINT_URL, CARD_S3_REGION)
+    raise ValueError(f"Unknown storage backend: {CARD_STORAGE_BACKEND}")
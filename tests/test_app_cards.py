@@ -0,0 +1,99 @@
+"""Tests for card responses in app: content-hash ETags, conditional GET and ranges."""
+
+import io
+import os
+
+import pytest
+from PIL import Image
+
+from card_output import MemorySink, RenderedCard
+from card_storage import ContentStore, content_digest
+
+
+@pytest.fixture(scope='module')
+def app_module(tmp_path_factory):
+    # Importing app migrates and indexes Generated_Cards/ in the working directory
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("app"))
+    try:
+        import app
+    finally:
+        os.chdir(cwd)
+    return app
+
+
+@pytest.fixture
+def card_png():
+    output = io.BytesIO()
+    Image.new('RGB', (60, 84), 'purple').save(output, format='PNG')
+    return output.getvalue()
+
+
+@pytest.fixture
+def client(app_module, tmp_path, monkeypatch):
+    monkeypatch.setattr(app_module, 'card_store', ContentStore(str(tmp_path / "cards")))
+    monkeypatch.setattr(app_module, 'recent_cards', MemorySink(1024 * 1024))
+    monkeypatch.setattr(app_module, 'CARD_PRESIGNED_REDIRECTS', False)
+    return app_module.app.test_client()
+
+
+@pytest.fixture(params=['store', 'memory'])
+def stored_card(request, app_module, client, card_png):
+    """A card served from the card store's file, or from the recent-card memory cache."""
+    name = app_module.card_store.put_named("Soap_Baron_1760000000.png", card_png)
+    if request.param == 'memory':
+        app_module.recent_cards.save(RenderedCard(name, card_png, 'PNG', 60, 84))
+    return name
+
+
+@pytest.mark.parametrize('route', ['/card/', '/download/'])
+def test_card_has_content_hash_etag_and_immutable_caching(client, stored_card, card_png, route):
+    response = client.get(f"{route}{stored_card}?format=png")
+
+    assert response.status_code == 200
+    assert response.data == card_png
+    assert response.headers['ETag'] == f'"{content_digest(card_png)}"'
+    assert 'immutable' in response.headers['Cache-Control']
+    assert 'max-age=31536000' in response.headers['Cache-Control']
+    assert response.headers['Accept-Ranges'] == 'bytes'
+
+
+def test_matching_if_none_match_gets_304(client, stored_card, card_png):
+    response = client.get(f"/card/{stored_card}?format=png",
+                          headers={'If-None-Match': f'"{content_digest(card_png)}"'})
+
+    assert response.status_code == 304
+    assert response.data == b''
+
+
+def test_stale_if_none_match_gets_the_card(client, stored_card, card_png):
+    response = client.get(f"/card/{stored_card}?format=png", headers={'If-None-Match': '"0123"'})
+
+    assert response.status_code == 200
+    assert response.data == card_png
+
+
+def test_range_request_gets_206_with_the_requested_bytes(client, stored_card, card_png):
+    response = client.get(f"/download/{stored_card}", headers={'Range': 'bytes=10-29'})
+
+    assert response.status_code == 206
+    assert response.data == card_png[10:30]
+    assert response.headers['Content-Range'] == f"bytes 10-29/{len(card_png)}"
+
+
+def test_unsatisfiable_range_gets_416(client, stored_card, card_png):
+    response = client.get(f"/download/{stored_card}", headers={'Range': f'bytes={len(card_png) + 10}-'})
+
+    assert response.status_code == 416
+    assert response.headers['Content-Range'] == f"bytes */{len(card_png)}"
+
+
+def test_if_range_with_other_etag_gets_the_whole_card(client, stored_card, card_png):
+    response = client.get(f"/download/{stored_card}", headers={'Range': 'bytes=0-9', 'If-Range': '"0123"'})
+
+    assert response.status_code == 200
+    assert response.data == card_png
+
+
+def test_unknown_card_is_404(client):
+    assert client.get("/download/Nobody_1760000000.png").status_code == 404
@@ -0,0 +1,40 @@
+"""Tests for batch_render.render_job output naming."""
+
+import os
+
+from PIL import Image
+
+import card_graphics
+from batch_render import RenderJob, render_job
+
+CARD = {'card_name': 'Soap Baron', 'custom_type': 'Vibe', 'stat1_name': 'Lather', 'stat1_value': 1200,
+        'stat2_name': 'Hats', 'stat2_value': 900, 'effect_description': 'Smells faintly of lavender.'}
+
+
+def test_same_name_cards_in_the_same_second_do_not_overwrite(tmp_path, monkeypatch):
+    monkeypatch.setattr(card_graphics.time, 'time', lambda: 1760000000.0)
+    photos = []
+    for index, color in enumerate(('red', 'blue')):
+        photo = tmp_path / f"photo{index}.png"
+        Image.new('RGB', (400, 500), color).save(photo)
+        photos.append(str(photo))
+    output_dir = tmp_path / "out"
+
+    results = [render_job(index, RenderJob(photo, CARD), str(output_dir)) for index, photo in enumerate(photos)]
+
+    assert all(result.success for result in results), [result.error for result in results]
+    paths = [result.output_path for result in results]
+    assert paths[0] != paths[1]
+    assert sorted(os.listdir(output_dir)) == sorted(os.path.basename(path) for path in paths)
+    assert all(os.path.basename(path).startswith("Soap_Baron_1760000000_") for path in paths)
+
+
+def test_explicit_output_path_is_kept(tmp_path):
+    photo = tmp_path / "photo.png"
+    Image.new('RGB', (400, 500), 'green').save(photo)
+    output = tmp_path / "cards" / "me.png"
+
+    result = render_job(0, RenderJob(str(photo), CARD, str(output)))
+
+    assert result.output_path == str(output)
+    assert output.exists()
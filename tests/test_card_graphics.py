@@ -0,0 +1,55 @@
+"""Tests for card_graphics gradients."""
+
+import pytest
+from PIL import Image
+
+from card_graphics import create_gradient_background, create_multi_stop_gradient, hex_to_rgb
+
+COLOR1, COLOR2 = '#FFB6C1', '#1E3A5F'
+
+
+def per_pixel_gradient(width, height, color1, color2, direction):
+    """The original per-pixel gradient, kept as the reference output."""
+    rgb1, rgb2 = hex_to_rgb(color1), hex_to_rgb(color2)
+    gradient = Image.new('RGB', (width, height))
+    for y in range(height):
+        for x in range(width):
+            ratio = y / height if direction == 'vertical' else x / width
+            gradient.putpixel((x, y), tuple(int(a + (b - a) * ratio) for a, b in zip(rgb1, rgb2)))
+    return gradient
+
+
+@pytest.mark.parametrize('direction', ['vertical', 'horizontal'])
+@pytest.mark.parametrize('size', [(1, 1), (37, 53), (120, 80)])
+def test_gradient_matches_per_pixel_original(direction, size):
+    expected = per_pixel_gradient(*size, COLOR1, COLOR2, direction)
+
+    actual = create_gradient_background(*size, COLOR1, COLOR2, direction)
+
+    assert actual.mode == 'RGB'
+    assert actual.tobytes() == expected.tobytes()
+
+
+def test_diagonal_gradient_is_constant_along_anti_diagonals():
+    width, height = 40, 25
+    gradient = create_gradient_background(width, height, COLOR1, COLOR2, 'diagonal')
+    ramp = create_multi_stop_gradient(width + height - 1, 1, (COLOR1, COLOR2), 'horizontal')
+
+    for y in range(height):
+        for x in range(width):
+            assert gradient.getpixel((x, y)) == ramp.getpixel((x + y, 0))
+    assert gradient.getpixel((0, 0)) == hex_to_rgb(COLOR1)
+
+
+def test_multi_stop_gradient_passes_through_each_stop():
+    stops = ('#FF0000', '#00FF00', '#0000FF')
+    gradient = create_multi_stop_gradient(1, 100, stops)
+
+    assert gradient.getpixel((0, 0)) == (255, 0, 0)
+    assert gradient.getpixel((0, 50)) == (0, 255, 0)
+    assert gradient.getpixel((0, 99))[2] > 240
+
+
+def test_gradient_needs_two_stops():
+    with pytest.raises(ValueError):
+        create_multi_stop_gradient(10, 10, ('#FFFFFF',))
@@ -0,0 +1,85 @@
+"""Tests for card_index keyset paging and cursors."""
+
+import pytest
+
+from card_index import CardIndex, decode_cursor, encode_cursor
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = CardIndex(str(tmp_path / "card_index.sqlite3"))
+    # Pairs of cards share a creation time and some share a stat, so ties must break on filename
+    for number in range(25):
+        index.add(f"Card_{number:02d}.png", 100 + number,
+                  {'card_name': f"Card {number}", 'custom_type': 'Vibe' if number % 2 else 'Chaos',
+                   'stat1_value': (number % 5) * 100, 'stat2_value': None if number % 3 else number},
+                  created_at=1760000000 + number // 2)
+    return index
+
+
+def all_pages(index, **options):
+    cards, cursor, pages = [], None, 0
+    while True:
+        page, cursor = index.page(cursor=cursor, **options)
+        cards += page
+        pages += 1
+        if cursor is None:
+            return cards, pages
+
+
+def descending(text):
+    """Sort key ordering equal-length strings from last to first."""
+    return tuple(-ord(char) for char in text)
+
+
+@pytest.mark.parametrize('sort', ['newest', 'oldest', 'stat1', 'stat2'])
+def test_pages_cover_every_card_once_in_order(index, sort):
+    cards, pages = all_pages(index, sort=sort, limit=4)
+
+    filenames = [card['filename'] for card in cards]
+    assert sorted(filenames) == [f"Card_{number:02d}.png" for number in range(25)]
+    assert pages == 7
+    keys = {
+        'newest': lambda card: (-card['created_at'], descending(card['filename'])),
+        'oldest': lambda card: (card['created_at'], card['filename']),
+        'stat1': lambda card: (-card['stat1_value'], descending(card['filename'])),
+        'stat2': lambda card: (-(card['stat2_value'] if card['stat2_value'] is not None else -1),
+                               descending(card['filename'])),
+    }
+    assert cards == sorted(cards, key=keys[sort])
+
+
+def test_cards_added_while_paging_do_not_shift_pages(index):
+    first, cursor = index.page('newest', limit=5)
+    index.add("Card_99.png", 1, {'card_name': 'Late'}, created_at=1760009999)
+
+    second, _ = index.page('newest', limit=5, cursor=cursor)
+
+    assert not {card['filename'] for card in first} & {card['filename'] for card in second}
+    assert "Card_99.png" not in [card['filename'] for card in second]
+
+
+def test_filters_apply_across_pages(index):
+    cards, _ = all_pages(index, sort='oldest', limit=3, custom_type='Vibe', since=1760000002, until=1760000010)
+
+    assert cards
+    assert all(card['custom_type'] == 'Vibe' for card in cards)
+    assert all(1760000002 <= card['created_at'] < 1760000010 for card in cards)
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor('stat1', 400, "Sir_Lags_A_Lot_1760000000.png")
+
+    assert '=' not in cursor
+    assert decode_cursor(cursor, 'stat1') == (400, "Sir_Lags_A_Lot_1760000000.png")
+
+
+@pytest.mark.parametrize('cursor', ['not-a-cursor', encode_cursor('newest', 1760000000, 'x.png'), ''])
+def test_invalid_or_foreign_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, 'stat1')
+
+
+def test_page_rejects_unknown_sort(index):
+    with pytest.raises(ValueError):
+        index.page('random')
@@ -0,0 +1,37 @@
+"""Tests for card_jobs.JobRunner."""
+
+import threading
+import time
+
+from card_jobs import SHUTDOWN_ERROR, JobRunner, JobStore
+
+
+def test_shutdown_fails_jobs_still_queued(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    runner = JobRunner(store, 1, 2)
+    started = threading.Event()
+    release = threading.Event()
+
+    def work(progress):
+        started.set()
+        release.wait(5)
+        return {'success': True}
+
+    running = runner.submit(work)
+    started.wait(5)
+    queued = runner.submit(work)
+    shutdown = threading.Thread(target=runner.shutdown)
+    shutdown.start()
+    # Let the running job finish only once the queued one has been cancelled
+    for _ in range(500):
+        if store.get(queued)['stage'] == 'failed':
+            break
+        time.sleep(0.01)
+    release.set()
+    shutdown.join(5)
+
+    assert store.get(running)['stage'] == 'done'
+    job = store.get(queued)
+    assert job['stage'] == 'failed'
+    assert job['error'] == SHUTDOWN_ERROR
+    assert runner.stats()['failed'] == 1
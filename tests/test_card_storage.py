@@ -0,0 +1,72 @@
+"""Tests for card_storage.ContentStore name mapping."""
+
+import io
+import threading
+import time
+
+import pytest
+
+from card_storage import ContentStore, content_digest
+from storage_backends import LocalBackend
+
+
+class SlowNamesBackend(LocalBackend):
+    """Local backend that is slow to write name records, widening any check-then-write race."""
+
+    def put(self, key, data, content_type=None):
+        if key.startswith("names/"):
+            time.sleep(0.05)
+        super().put(key, data, content_type)
+
+
+def test_concurrent_put_named_with_same_name_keeps_both_cards(tmp_path):
+    store = ContentStore(str(tmp_path), SlowNamesBackend(str(tmp_path)))
+    contents = [b"first card", b"second card"]
+    names = [None, None]
+    start = threading.Barrier(2)
+
+    def put(index):
+        start.wait()
+        names[index] = store.put_named("Soap_Baron_1760000000.png", contents[index])
+
+    threads = [threading.Thread(target=put, args=(index,)) for index in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert names[0] != names[1]
+    assert "Soap_Baron_1760000000.png" in names
+    for name, data in zip(names, contents):
+        assert store.read(name) == data
+
+
+def test_put_named_same_content_reuses_name(tmp_path):
+    store = ContentStore(str(tmp_path))
+
+    assert store.put_named("card.png", b"same") == "card.png"
+    assert store.put_named("card.png", b"same") == "card.png"
+    assert store.put_named("card.png", b"other").startswith("card_")
+
+
+def test_names_cannot_escape_the_store(tmp_path):
+    root = tmp_path / "store"
+    store = ContentStore(str(root))
+
+    for name in ("../../escaped.png", "/etc/escaped.png", "..", ".hidden.png"):
+        with pytest.raises(ValueError):
+            store.put_named(name, b"card")
+        with pytest.raises(ValueError):
+            store.put_named_file(name, io.BytesIO(b"card"), content_digest(b"card"), 4)
+
+    assert not (tmp_path / "escaped.png").exists()
+    assert not list(tmp_path.glob("*.png"))
+
+
+def test_local_backend_rejects_keys_outside_root(tmp_path):
+    backend = LocalBackend(str(tmp_path / "store"))
+
+    for key in ("names/../../escaped.png", "/escaped.png", "names\\..\\escaped.png"):
+        with pytest.raises(ValueError):
+            backend.put(key, b"card")
+    assert backend.get("names/a..b.png") is None
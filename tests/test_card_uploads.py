@@ -0,0 +1,89 @@
+"""Tests for card_uploads spooling and image checks."""
+
+import hashlib
+import io
+
+import pytest
+from PIL import Image
+
+import card_uploads
+from card_uploads import MAX_PHOTO_ASPECT, MIN_PHOTO_SIDE, UploadRejected, check_image, receive_upload, spool_upload
+
+
+def image_bytes(size=(300, 400), fmt='JPEG'):
+    output = io.BytesIO()
+    Image.new('RGB', size, 'teal').save(output, format=fmt)
+    return output.getvalue()
+
+
+def test_spool_upload_hashes_and_rewinds():
+    data = b"x" * (card_uploads.SPOOL_MAX_BYTES + 10)
+
+    upload = spool_upload(io.BytesIO(data))
+
+    assert upload.digest == hashlib.sha256(data).hexdigest()
+    assert upload.size == len(data)
+    assert upload.file.read() == data
+    upload.file.close()
+
+
+def test_spool_upload_rejects_empty_upload():
+    with pytest.raises(UploadRejected, match="empty"):
+        spool_upload(io.BytesIO(b""))
+
+
+def test_spool_upload_rejects_upload_over_size_cap():
+    with pytest.raises(UploadRejected, match="too large"):
+        spool_upload(io.BytesIO(b"x" * 2049), max_bytes=2048)
+    assert spool_upload(io.BytesIO(b"x" * 2048), max_bytes=2048).size == 2048
+
+
+@pytest.mark.parametrize('fmt', ['JPEG', 'PNG', 'GIF', 'BMP'])
+def test_check_image_accepts_supported_formats(fmt):
+    assert check_image(io.BytesIO(image_bytes(fmt=fmt))) == (fmt, 300, 400)
+
+
+def test_check_image_rejects_non_images():
+    with pytest.raises(UploadRejected, match="not a supported image"):
+        check_image(io.BytesIO(b"<?php echo 'hi'; ?>" * 10))
+
+
+def test_check_image_rejects_truncated_jpeg():
+    data = image_bytes((800, 800))
+    with pytest.raises(UploadRejected, match="damaged or incomplete"):
+        check_image(io.BytesIO(data[:len(data) // 2]))
+
+
+def test_check_image_rejects_decompression_bomb(monkeypatch):
+    monkeypatch.setattr(Image, 'MAX_IMAGE_PIXELS', 1000)
+    with pytest.raises(UploadRejected, match="too many pixels"):
+        check_image(io.BytesIO(image_bytes((300, 400), 'PNG')))
+
+
+def test_check_image_rejects_more_pixels_than_the_renderer_takes(monkeypatch):
+    monkeypatch.setattr(card_uploads, 'MAX_PHOTO_PIXELS', 300 * 400 - 1)
+    with pytest.raises(UploadRejected, match="too large to process"):
+        check_image(io.BytesIO(image_bytes()))
+
+
+def test_check_image_enforces_min_side():
+    with pytest.raises(UploadRejected, match="too small"):
+        check_image(io.BytesIO(image_bytes((MIN_PHOTO_SIDE - 1, 400), 'PNG')))
+    assert check_image(io.BytesIO(image_bytes((MIN_PHOTO_SIDE, MIN_PHOTO_SIDE), 'PNG')))[1:] == (
+        MIN_PHOTO_SIDE, MIN_PHOTO_SIDE)
+
+
+def test_check_image_enforces_aspect_limit():
+    with pytest.raises(UploadRejected, match="too narrow"):
+        check_image(io.BytesIO(image_bytes((100, 100 * MAX_PHOTO_ASPECT + 1), 'PNG')))
+    assert check_image(io.BytesIO(image_bytes((100, 100 * MAX_PHOTO_ASPECT), 'PNG')))[2] == 100 * MAX_PHOTO_ASPECT
+
+
+def test_receive_upload_fills_in_image_fields():
+    data = image_bytes()
+
+    upload = receive_upload(io.BytesIO(data))
+
+    assert (upload.format, upload.width, upload.height, upload.size) == ('JPEG', 300, 400, len(data))
+    assert upload.file.read() == data
+    upload.file.close()
@@ -0,0 +1,36 @@
+"""Tests for card_variants stored variants."""
+
+import io
+import os
+
+from PIL import Image
+
+import card_variants
+from card_storage import DirectoryBudget
+from card_variants import ensure_variant
+
+
+def noisy_card_png():
+    output = io.BytesIO()
+    Image.frombytes('RGB', (600, 840), os.urandom(600 * 840 * 3)).save(output, format='PNG')
+    return output.getvalue()
+
+
+def test_variants_stay_within_budget(tmp_path, monkeypatch):
+    directory = str(tmp_path / "variants")
+    budget = DirectoryBudget(directory, 2 * 1024 * 1024)
+    monkeypatch.setitem(card_variants._budgets, directory, budget)
+    originals = {f"card{index}.png": noisy_card_png() for index in range(4)}
+
+    paths = [ensure_variant(filename, 'medium', 'png', originals.get, directory) for filename in originals]
+
+    stored = [path for path in paths if os.path.exists(path)]
+    assert len(stored) < len(paths)
+    assert sum(os.path.getsize(path) for path in stored) <= budget.max_bytes
+    assert os.path.exists(paths[-1])
+    # A trimmed variant is made again on request
+    assert os.path.exists(ensure_variant("card0.png", 'medium', 'png', originals.get, directory))
+
+
+def test_missing_original_gives_no_variant(tmp_path):
+    assert ensure_variant("gone.png", 'thumb', 'png', lambda filename: None, str(tmp_path)) is None
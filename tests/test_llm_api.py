@@ -0,0 +1,62 @@
+"""Tests for the Gemini call in llm_api, against a stubbed GenerativeService transport."""
+
+import json
+
+import pytest
+
+genai = pytest.importorskip("google.generativeai")
+pytest.importorskip("openai")
+
+from google.generativeai import client as genai_client  # noqa: E402
+
+import llm_api  # noqa: E402
+
+TRAITS = ["Collects hotel soap", "Talks to plants", "Owns nine hats", "Hates pickleball", "Loves toast"]
+CARD = {
+    "card_name": "Soap Baron",
+    "custom_type": "Vibe",
+    "stat1_name": "Lather",
+    "stat1_value": 1200,
+    "stat2_name": "Hats",
+    "stat2_value": 900,
+    "effect_description": "Leaves every room smelling faintly of lavender.",
+    "visual_effects": ["sparkles"],
+}
+
+
+class FakeGenerativeService:
+    """Stands in for the GenerativeServiceClient a GenerativeModel sends its requests through."""
+
+    def __init__(self, text):
+        self.text = text
+        self.calls = []
+
+    def generate_content(self, request, **kwargs):
+        self.calls.append((request, kwargs))
+        content = genai.protos.Content(role="model", parts=[genai.protos.Part(text=self.text)])
+        return genai.protos.GenerateContentResponse(
+            candidates=[genai.protos.Candidate(content=content, finish_reason=genai.protos.Candidate.FinishReason.STOP)])
+
+
+@pytest.fixture
+def transport(monkeypatch):
+    service = FakeGenerativeService(json.dumps(CARD))
+    monkeypatch.setattr(genai_client, "get_default_generative_client", lambda: service)
+    return service
+
+
+def test_call_gemini_api_sends_timeout_to_transport(transport):
+    card = llm_api._call_gemini_api(TRAITS, genai.GenerativeModel("gemini-test"), timeout=7.5)
+
+    assert card is not None
+    assert card["card_name"] == "Soap Baron"
+    assert len(transport.calls) == 1
+    request, kwargs = transport.calls[0]
+    assert kwargs == {"timeout": 7.5}
+    assert "Hates pickleball" in request.contents[0].parts[0].text
+
+
+def test_call_gemini_api_returns_none_on_unparseable_reply(transport):
+    transport.text = "not json"
+
+    assert llm_api._call_gemini_api(TRAITS, genai.GenerativeModel("gemini-test"), timeout=1.0) is None
@@ -0,0 +1,32 @@
+"""Tests for llm_cache.LLMResponseCache shared between processes."""
+
+from llm_cache import LLMResponseCache
+
+KEY = "a" * 64
+
+
+def test_reroll_in_another_process_replaces_memory_hit(tmp_path):
+    path = str(tmp_path / "llm_cache.sqlite3")
+    first = LLMResponseCache(path, enabled=True)
+    second = LLMResponseCache(path, enabled=True)
+    first.put(KEY, 'gemini', {'card_name': 'Old'})
+    assert second.get([KEY]) == ('gemini', {'card_name': 'Old'})
+
+    first.put(KEY, 'openai', {'card_name': 'Rerolled'})
+
+    assert second.get([KEY]) == ('openai', {'card_name': 'Rerolled'})
+    assert second.get([KEY]) == ('openai', {'card_name': 'Rerolled'})
+    stats = second.stats()
+    assert stats['stale_memory'] == 1
+    assert stats['memory_hits'] == 1
+
+
+def test_cleared_entry_is_not_served_from_memory(tmp_path):
+    path = str(tmp_path / "llm_cache.sqlite3")
+    first = LLMResponseCache(path, enabled=True)
+    second = LLMResponseCache(path, enabled=True)
+    second.put(KEY, 'gemini', {'card_name': 'Old'})
+
+    first.clear()
+
+    assert second.get([KEY]) is None
@@ -0,0 +1,57 @@
+"""Tests for llm_clients.LLMClientRegistry key rotation."""
+
+import pytest
+
+genai = pytest.importorskip("google.generativeai")
+pytest.importorskip("openai")
+
+from llm_clients import LLMClientRegistry  # noqa: E402
+
+
+def make_registry():
+    return LLMClientRegistry(2, 2, 5)
+
+
+def is_closed(client):
+    return client._client.is_closed
+
+
+def test_rotated_openai_client_is_closed_after_its_last_call():
+    registry = make_registry()
+    old = registry.openai_client("sk-old")
+
+    new = registry.openai_client("sk-new")
+    assert new is not old
+    assert not is_closed(old)
+    assert registry.stats()['retired_open'] == 1
+
+    registry.release(old)
+    assert is_closed(old)
+    assert not is_closed(new)
+    assert registry.stats()['retired_open'] == 0
+    assert registry.stats()['closed'] == 1
+    registry.release(new)
+    registry.close()
+
+
+def test_idle_openai_client_is_closed_on_rotation():
+    registry = make_registry()
+    old = registry.openai_client("sk-old")
+    registry.release(old)
+
+    registry.release(registry.openai_client("sk-new"))
+
+    assert is_closed(old)
+    assert registry.stats()['retired_open'] == 0
+    registry.close()
+
+
+def test_gemini_models_keep_the_client_for_their_key():
+    registry = make_registry()
+    first = registry.gemini_model("gemini-key-one")
+    second = registry.gemini_model("gemini-key-two")
+
+    if registry._bind_gemini_client:
+        assert first._client is not None
+        assert first._client is not second._client
+    assert registry.gemini_model("gemini-key-two") is second
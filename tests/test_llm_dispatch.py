@@ -0,0 +1,168 @@
+"""Tests for hedging and the per-provider circuit breakers in llm_dispatch."""
+
+import threading
+import time
+
+import pytest
+
+from card_deadline import Deadline, DeadlineExceeded
+from llm_dispatch import BREAKER_CLOSED, BREAKER_OPEN, CircuitBreaker, LLMDispatcher
+
+CARD = {'card_name': 'Soap Baron'}
+COOLDOWN = 0.05
+
+
+HEDGE_AFTER = 0.1
+
+
+def make_dispatcher(max_workers=4):
+    return LLMDispatcher(False, 90, 8, 20, 1, 0.2, 3, 100, max_workers,
+                         lambda provider: CircuitBreaker(provider, 10, 2, 0.5, 5, 0.8, COOLDOWN))
+
+
+def make_hedging_dispatcher(budget=0.2, burst=3):
+    return LLMDispatcher(True, 90, HEDGE_AFTER, 20, 0.01, budget, burst, 100, 4,
+                         lambda provider: CircuitBreaker(provider, 10, 2, 0.5, 5, 0.8, COOLDOWN))
+
+
+def slow(release, result=CARD):
+    def call():
+        release.wait(5)
+        return result
+    return call
+
+
+def no_report(event, **data):
+    pass
+
+
+def failing():
+    raise RuntimeError("503")
+
+
+def trip_gemini(dispatcher):
+    for _ in range(2):
+        dispatcher.dispatch([('gemini', failing), ('openai', lambda: CARD)], no_report)
+    assert dispatcher.breaker('gemini').state == BREAKER_OPEN
+    time.sleep(COOLDOWN * 2)
+
+
+def test_probe_out_of_time_is_released_and_probed_again():
+    dispatcher = make_dispatcher()
+    trip_gemini(dispatcher)
+
+    def out_of_time():
+        raise DeadlineExceeded("out of time")
+
+    assert dispatcher.dispatch([('gemini', out_of_time), ('openai', lambda: CARD)], no_report) == ('openai', CARD)
+    breaker = dispatcher.breaker('gemini')
+    assert breaker.state == BREAKER_OPEN
+    assert breaker.available()
+
+    calls = []
+    assert dispatcher.dispatch([('gemini', lambda: calls.append('gemini') or CARD),
+                                ('openai', lambda: CARD)], no_report) == ('gemini', CARD)
+    assert calls == ['gemini']
+    assert breaker.state == BREAKER_CLOSED
+    assert breaker.stats()['released'] == 1
+
+
+def test_probe_cancelled_before_it_starts_is_released():
+    dispatcher = make_dispatcher(max_workers=1)
+    trip_gemini(dispatcher)
+
+    # Keep the only pool thread busy so the probe is still queued when the deadline passes
+    release = threading.Event()
+    dispatcher._get_executor().submit(release.wait)
+    with pytest.raises(DeadlineExceeded):
+        dispatcher.dispatch([('gemini', lambda: CARD)], no_report, Deadline(0.05))
+    release.set()
+
+    breaker = dispatcher.breaker('gemini')
+    assert breaker.state == BREAKER_OPEN
+    assert breaker.available()
+    assert breaker.acquire() == (True, True)
+
+
+def test_late_success_does_not_close_open_breaker():
+    breaker = CircuitBreaker('gemini', 10, 2, 0.5, 5, 0.8, 30)
+    breaker.record(False, 0.1)
+    breaker.record(False, 0.1)
+    assert breaker.state == BREAKER_OPEN
+
+    # A call started before the breaker opened finishes quickly
+    breaker.record(True, 0.1)
+
+    assert breaker.state == BREAKER_OPEN
+    assert not breaker.available()
+
+
+def test_failed_probe_reopens_breaker():
+    breaker = CircuitBreaker('gemini', 10, 2, 0.5, 5, 0.8, 0)
+    breaker.record(False, 0.1)
+    breaker.record(False, 0.1)
+
+    assert breaker.acquire() == (True, True)
+    assert breaker.acquire() == (False, False)
+    breaker.record(False, 0.1, probe=True)
+
+    assert breaker.state == BREAKER_OPEN
+    assert breaker.stats()['opened'] == 2
+
+
+def test_hedge_starts_after_hedge_delay_and_faster_provider_wins():
+    dispatcher = make_hedging_dispatcher()
+    events = []
+    release = threading.Event()
+    started = time.monotonic()
+
+    provider, card = dispatcher.dispatch([('gemini', slow(release)), ('openai', lambda: CARD)],
+                                         lambda event, **data: events.append((event, data)))
+    elapsed = time.monotonic() - started
+    release.set()
+
+    assert (provider, card) == ('openai', CARD)
+    assert HEDGE_AFTER <= elapsed < 1
+    hedge = [data for event, data in events if event == 'llm_hedge']
+    assert len(hedge) == 1 and hedge[0]['provider'] == 'openai'
+    stats = dispatcher.stats()
+    assert stats['hedges'] == 1
+    assert stats['hedges_won'] == 1
+    assert stats['abandoned'] == 1
+
+
+def test_primary_finishing_first_after_a_hedge_wins():
+    dispatcher = make_hedging_dispatcher()
+    gemini_done, openai_done = threading.Event(), threading.Event()
+    threading.Timer(HEDGE_AFTER * 2, gemini_done.set).start()
+
+    result = dispatcher.dispatch([('gemini', slow(gemini_done)), ('openai', slow(openai_done))], no_report)
+    openai_done.set()
+
+    assert result == ('gemini', CARD)
+    stats = dispatcher.stats()
+    assert stats['hedges'] == 1
+    assert stats['hedges_won'] == 0
+    assert stats['abandoned'] == 1
+
+
+def test_hedge_denied_once_budget_is_spent():
+    dispatcher = make_hedging_dispatcher(budget=0, burst=1)
+    calls = []
+
+    def openai():
+        calls.append('openai')
+        return CARD
+
+    results = []
+    for _ in range(2):
+        release = threading.Event()
+        threading.Timer(HEDGE_AFTER * 3, release.set).start()
+        results.append(dispatcher.dispatch([('gemini', slow(release, {'card_name': 'Gemini'})),
+                                            ('openai', openai)], no_report))
+
+    assert results == [('openai', CARD), ('gemini', {'card_name': 'Gemini'})]
+    stats = dispatcher.stats()
+    assert stats['hedges'] == 1
+    assert stats['hedges_denied'] == 1
+    assert calls == ['openai']
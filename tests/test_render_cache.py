@@ -0,0 +1,47 @@
+"""Tests for render_cache.LayerCache."""
+
+from PIL import Image, ImageDraw
+
+from render_cache import LayerCache
+
+
+def layer(color, size=(10, 10)):
+    return lambda: Image.new('RGB', size, color)
+
+
+def test_least_recently_used_layer_is_evicted_over_budget():
+    cache = LayerCache(2 * 10 * 10 * 3)
+    cache.get_or_create('red', layer('red'))
+    cache.get_or_create('green', layer('green'))
+    cache.get_or_create('red', layer('red'))
+
+    cache.get_or_create('blue', layer('blue'))
+
+    built = []
+    cache.get_or_create('red', lambda: built.append('red') or Image.new('RGB', (10, 10), 'red'))
+    cache.get_or_create('green', lambda: built.append('green') or Image.new('RGB', (10, 10), 'green'))
+    assert built == ['green']
+    stats = cache.stats()
+    assert stats['evictions'] >= 1
+    assert stats['bytes'] <= stats['max_bytes']
+
+
+def test_layer_larger_than_budget_is_not_cached():
+    cache = LayerCache(100)
+
+    image = cache.get_or_create('big', layer('red', (20, 20)))
+
+    assert image.size == (20, 20)
+    assert cache.stats()['entries'] == 0
+    assert cache.stats()['bytes'] == 0
+
+
+def test_drawing_on_a_cached_layer_leaves_the_cache_unchanged():
+    cache = LayerCache(1024 * 1024)
+    first = cache.get_or_create('white', layer('white'))
+
+    ImageDraw.Draw(first).rectangle([0, 0, 9, 9], fill='black')
+
+    again = cache.get_or_create('white', layer('white'))
+    assert again.getpixel((5, 5)) == (255, 255, 255)
+    assert cache.stats()['hits'] == 1
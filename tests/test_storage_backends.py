@@ -0,0 +1,136 @@
+"""Tests for the S3 storage backend and a content store kept in it, against an S3 stand-in."""
+
+import io
+import os
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from card_storage import ContentStore
+from storage_backends import S3Backend
+
+
+class FakeClientError(Exception):
+    """Shaped like botocore's ClientError: the error code is in response['Error']['Code']."""
+
+    def __init__(self, code):
+        super().__init__(code)
+        self.response = {'Error': {'Code': code}}
+
+
+class FakeS3Client:
+    """In-memory stand-in for the parts of a boto3 S3 client that S3Backend uses."""
+
+    exceptions = SimpleNamespace(ClientError=FakeClientError)
+
+    def __init__(self):
+        self.objects = {}
+        self.calls = []
+
+    def _object(self, bucket, key, code):
+        if (bucket, key) not in self.objects:
+            raise FakeClientError(code)
+        return self.objects[(bucket, key)]
+
+    def put_object(self, Bucket, Key, Body, ContentType=None):
+        self.calls.append(('put_object', Key))
+        self.objects[(Bucket, Key)] = (bytes(Body), datetime.now(timezone.utc))
+
+    def upload_fileobj(self, Fileobj, Bucket, Key, ExtraArgs=None):
+        self.calls.append(('upload_fileobj', Key))
+        self.objects[(Bucket, Key)] = (Fileobj.read(), datetime.now(timezone.utc))
+
+    def get_object(self, Bucket, Key):
+        self.calls.append(('get_object', Key))
+        data, _ = self._object(Bucket, Key, 'NoSuchKey')
+        return {'Body': io.BytesIO(data)}
+
+    def head_object(self, Bucket, Key):
+        self.calls.append(('head_object', Key))
+        data, modified = self._object(Bucket, Key, '404')
+        return {'ContentLength': len(data), 'LastModified': modified}
+
+    def delete_object(self, Bucket, Key):
+        self.calls.append(('delete_object', Key))
+        self.objects.pop((Bucket, Key), None)
+
+    def get_paginator(self, operation):
+        objects = self.objects
+
+        def paginate(Bucket, Prefix):
+            keys = sorted(key for bucket, key in objects if bucket == Bucket and key.startswith(Prefix))
+            yield {'Contents': [{'Key': key} for key in keys]} if keys else {}
+
+        return SimpleNamespace(paginate=paginate)
+
+    def generate_presigned_url(self, operation, Params, ExpiresIn):
+        return f"https://s3.example/{Params['Bucket']}/{Params['Key']}?expires={ExpiresIn}"
+
+
+@pytest.fixture(params=['fake', 'moto'])
+def s3_client(request):
+    if request.param == 'fake':
+        yield FakeS3Client()
+        return
+    moto = pytest.importorskip("moto")
+    boto3 = pytest.importorskip("boto3")
+    with moto.mock_aws():
+        client = boto3.client('s3', region_name='us-east-1')
+        client.create_bucket(Bucket='cards')
+        yield client
+
+
+def test_s3_backend_round_trip(s3_client):
+    backend = S3Backend('cards', 'cards/', client=s3_client)
+
+    backend.put('objects/ab/one.png', b'one', 'image/png')
+    backend.put_file('objects/cd/two.png', io.BytesIO(b'two!'), 'image/png')
+
+    assert backend.get('objects/ab/one.png') == b'one'
+    assert backend.stat('objects/cd/two.png').size == 4
+    assert sorted(backend.list('objects/')) == ['objects/ab/one.png', 'objects/cd/two.png']
+    assert backend.get('objects/missing.png') is None
+    assert backend.stat('objects/missing.png') is None
+    assert 'cards/objects/ab/one.png' in backend.presigned_url('objects/ab/one.png', 60, 'image/png')
+
+    backend.delete('objects/ab/one.png')
+    assert backend.get('objects/ab/one.png') is None
+
+
+def test_content_store_shared_through_s3(s3_client, tmp_path):
+    backend = S3Backend('cards', 'cards/', client=s3_client)
+    first = ContentStore(str(tmp_path / "first"), backend)
+    second = ContentStore(str(tmp_path / "second"), backend)
+
+    name = first.put_named("Soap_Baron_1760000000.png", b"card bytes")
+
+    assert second.read(name) == b"card bytes"
+    path = second.local_path(name)
+    assert path.startswith(second.cache_dir)
+    with open(path, 'rb') as cached:
+        assert cached.read() == b"card bytes"
+
+
+def test_unknown_names_ask_the_backend_once(tmp_path):
+    client = FakeS3Client()
+    store = ContentStore(str(tmp_path), S3Backend('cards', 'cards/', client=client))
+
+    assert store.lookup("wp-login.php") is None
+    assert store.lookup("wp-login.php") is None
+
+    assert client.calls.count(('get_object', 'cards/names/wp-login.php')) == 1
+
+
+def test_download_cache_stays_within_budget(tmp_path):
+    backend = S3Backend('cards', 'cards/', client=FakeS3Client())
+    writer = ContentStore(str(tmp_path / "writer"), backend)
+    reader = ContentStore(str(tmp_path / "reader"), backend, cache_max_bytes=250)
+    names = [writer.put_named(f"card{index}.png", bytes([index]) * 100) for index in range(4)]
+
+    paths = [reader.local_path(name) for name in names]
+
+    cached = [os.path.getsize(path) for path in paths if os.path.exists(path)]
+    assert sum(cached) <= 250
+    assert os.path.exists(paths[-1])
+    assert reader.read(names[0]) == bytes([0]) * 100
@@ -0,0 +1,85 @@
+"""Tests for text_layout wrapping, fitting and truncation."""
+
+import pytest
+from PIL import ImageFont
+
+from text_layout import (ELLIPSIS, fit_text, max_lines_for_height, text_length, truncate_lines,
+                         truncate_to_width, wrap_text)
+
+TEXT = ("Leaves every room smelling faintly of lavender and quietly rearranges "
+        "the hotel soap into a small but growing empire of tiny wrapped bars")
+
+
+def font_for_size(size):
+    return ImageFont.load_default(size)
+
+
+@pytest.fixture
+def font():
+    return font_for_size(20)
+
+
+def test_wrap_text_keeps_lines_within_width(font):
+    lines = wrap_text(TEXT, font, 200)
+
+    assert ' '.join(lines) == TEXT
+    assert len(lines) > 1
+    assert all(text_length(line, font) <= 200 for line in lines)
+
+
+def test_truncate_to_width_keeps_fitting_text(font):
+    assert truncate_to_width("Soap", font, 200) == "Soap"
+
+    cut = truncate_to_width(TEXT, font, 150)
+    assert cut.endswith(ELLIPSIS)
+    assert text_length(cut, font) <= 150
+    assert TEXT.startswith(cut[:-len(ELLIPSIS)])
+
+
+def test_truncate_lines_appends_ellipsis_when_it_fits(font):
+    lines = ["Short line", "another line", "dropped"]
+
+    assert truncate_lines(lines, 2, font, 400) == ["Short line", "another line" + ELLIPSIS]
+    assert truncate_lines(lines, 3, font, 400) == lines
+    assert truncate_lines(lines, 0, font, 400) == []
+
+
+def test_truncate_lines_never_doubles_the_ellipsis(font):
+    # The last line exactly fills the width, so adding the ellipsis overflows it
+    last = "word " * 3 + "word"
+    width = text_length(last, font)
+
+    kept = truncate_lines(["first", last, "dropped"], 2, font, width)
+
+    assert kept[-1].endswith(ELLIPSIS)
+    assert kept[-1].count('.') == len(ELLIPSIS)
+    assert text_length(kept[-1], font) <= width
+    assert last.startswith(kept[-1][:-len(ELLIPSIS)].rstrip())
+
+
+def test_fit_text_uses_largest_size_that_fits():
+    sizes = [28, 24, 20, 16, 12]
+    layout = fit_text(TEXT, font_for_size, sizes, 300, 120)
+
+    assert ' '.join(layout.lines) == TEXT
+    assert len(layout.lines) <= max_lines_for_height(layout.font, 120)
+    larger = [size for size in sizes if size > layout.font.size]
+    for size in larger:
+        font = font_for_size(size)
+        assert len(wrap_text(TEXT, font, 300)) > max_lines_for_height(font, 120)
+
+
+def test_fit_text_prefers_first_size_when_it_fits():
+    layout = fit_text("Soap Baron", font_for_size, [24, 12], 300, 120)
+
+    assert layout.font.size == 24
+    assert layout.lines == ["Soap Baron"]
+
+
+def test_fit_text_truncates_at_smallest_size_when_nothing_fits():
+    layout = fit_text(TEXT * 3, font_for_size, [20, 16, 12], 200, 40)
+
+    assert layout.font.size == 12
+    assert len(layout.lines) == max_lines_for_height(layout.font, 40)
+    assert layout.lines[-1].endswith(ELLIPSIS)
+    assert all(text_length(line, layout.font) <= 200 for line in layout.lines)
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Text Layout Module
+
+This module lays out card text with cached measurements: word wrapping
+from per-word advance widths, fitting text into a box by binary search
+over font sizes, and single-pass ellipsis truncation.
+"""
+
+from functools import lru_cache
+from typing import Callable, List, NamedTuple, Sequence, Tuple
+from PIL import ImageFont
+
+# Pillow's default gap between lines of multiline text
+LINE_SPACING = 4
+
+ELLIPSIS = '...'
+
+
+class TextLayout(NamedTuple):
+    """Wrapped lines of text together with the font they were laid out in."""
+    lines: List[str]
+    font: ImageFont.FreeTypeFont
+
+    @property
+    def text(self) -> str:
+        """Lines joined for ImageDraw.text."""
+        return '\n'.join(self.lines)
+
+
+@lru_cache(maxsize=8192)
+def text_length(text: str, font: ImageFont.FreeTypeFont) -> float:
+    """
+    Measure the advance width of a run of text.
+
+    Args:
+        text (str): Text to measure
+        font: PIL Font object
+
+    Returns:
+        float: Advance width in pixels
+    """
+    return font.getlength(text)
+
+
+@lru_cache(maxsize=4096)
+def text_bbox(text: str, font: ImageFont.FreeTypeFont) -> Tuple[int, int, int, int]:
+    """
+    Measure the ink bounding box of a single line of text drawn at (0, 0).
+
+    Args:
+        text (str): Text to measure
+        font: PIL Font object
+
+    Returns:
+        tuple: (left, top, right, bottom), as ImageDraw.textbbox would report
+    """
+    return font.getbbox(text)
+
+
+def text_width(text: str, font: ImageFont.FreeTypeFont) -> int:
+    """
+    Get the ink width of a single line of text.
+
+    Args:
+        text (str): Text to measure
+        font: PIL Font object
+
+    Returns:
+        int: Width in pixels
+    """
+    bbox = text_bbox(text, font)
+    return bbox[2] - bbox[0]
+
+
+@lru_cache(maxsize=256)
+def line_metrics(font: ImageFont.FreeTypeFont) -> Tuple[int, int]:
+    """
+    Get the height of one line and the distance between line tops.
+
+    Args:
+        font: PIL Font object
+
+    Returns:
+        tuple: (line_height, line_pitch) in pixels
+    """
+    line_height = font.getbbox('Ag')[3]
+    line_pitch = font.getbbox('A')[3] + LINE_SPACING
+    return line_height, line_pitch
+
+
+def max_lines_for_height(font: ImageFont.FreeTypeFont, max_height: int) -> int:
+    """
+    Count how many lines fit in a given height.
+
+    Args:
+        font: PIL Font object
+        max_height (int): Available height in pixels
+
+    Returns:
+        int: Number of lines that fit (0 if not even one does)
+    """
+    line_height, line_pitch = line_metrics(font)
+    if max_height < line_height:
+        return 0
+    return 1 + (max_height - line_height) // line_pitch
+
+
+def wrap_text(text: str, font: ImageFont.FreeTypeFont, max_width: float) -> List[str]:
+    """
+    Greedily wrap text into lines no wider than max_width.
+
+    Each word is measured once and line widths are accumulated from the
+    cached word and space advances, so wrapping is linear in word count.
+    A single word wider than max_width gets a line of its own.
+
+    Args:
+        text (str): Text to wrap
+        font: PIL Font object
+        max_width (float): Maximum line width in pixels
+
+    Returns:
+        list: Wrapped lines
+    """
+    space = text_length(' ', font)
+    lines = []
+    current_line: List[str] = []
+    current_width = 0.0
+
+    for word in text.split():
+        word_width = text_length(word, font)
+        candidate_width = current_width + space + word_width if current_line else word_width
+        if candidate_width <= max_width:
+            current_line.append(word)
+            current_width = candidate_width
+        elif current_line:
+            lines.append(' '.join(current_line))
+            current_line = [word]
+            current_width = word_width
+        else:
+            lines.append(word)
+
+    if current_line:
+        lines.append(' '.join(current_line))
+    return lines
+
+
+def truncate_to_width(text: str, font: ImageFont.FreeTypeFont, max_width: float,
+                      ellipsis: str = ELLIPSIS) -> str:
+    """
+    Shorten a single line with an ellipsis so that it fits max_width.
+
+    Args:
+        text (str): Line to shorten
+        font: PIL Font object
+        max_width (float): Maximum width in pixels
+        ellipsis (str): Suffix marking the cut
+
+    Returns:
+        str: The original text if it fits, otherwise the longest prefix plus ellipsis that does
+    """
+    if text_length(text, font) <= max_width:
+        return text
+    return _cut_to_width(text, font, max_width, ellipsis)
+
+
+def _cut_to_width(text: str, font: ImageFont.FreeTypeFont, max_width: float, ellipsis: str) -> str:
+    """Get the longest prefix of text that fits max_width with the ellipsis appended."""
+    # Binary search for the longest prefix that still fits with the ellipsis
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if font.getlength(text[:middle].rstrip() + ellipsis) <= max_width:
+            low = middle
+        else:
+            high = middle - 1
+    return text[:low].rstrip() + ellipsis
+
+
+def truncate_lines(lines: List[str], max_lines: int, font: ImageFont.FreeTypeFont,
+                   max_width: float, ellipsis: str = ELLIPSIS) -> List[str]:
+    """
+    Keep at most max_lines lines, ending the last kept line with an ellipsis.
+
+    Args:
+        lines (list): Wrapped lines
+        max_lines (int): Maximum number of lines to keep
+        font: PIL Font object
+        max_width (float): Maximum line width in pixels
+        ellipsis (str): Suffix marking the cut
+
+    Returns:
+        list: Lines that fit, truncated in a single pass
+    """
+    if len(lines) <= max_lines:
+        return lines
+    if max_lines <= 0:
+        return []
+    kept = lines[:max_lines]
+    last = kept[-1].rstrip()
+    if text_length(last + ellipsis, font) <= max_width:
+        kept[-1] = last + ellipsis
+    else:
+        # Cut the line itself, so the ellipsis is never part of the prefix that is kept
+        kept[-1] = _cut_to_width(last, font, max_width, ellipsis)
+    return kept
+
+
+def fit_text(text: str, font_for_size: Callable[[int], ImageFont.FreeTypeFont], sizes: Sequence[int],
+             max_width: float, max_height: int) -> TextLayout:
+    """
+    Lay out text in the largest font size at which it fits a box.
+
+    Candidate sizes are binary searched; if the text does not fit even at
+    the smallest size, it is wrapped at that size and truncated.
+
+    Args:
+        text (str): Text to lay out
+        font_for_size: Callable returning the font for a given size
+        sizes (Sequence[int]): Candidate font sizes
+        max_width (float): Box width in pixels
+        max_height (int): Box height in pixels
+
+    Returns:
+        TextLayout: Lines and the font to draw them with
+    """
+    candidates = sorted(set(sizes), reverse=True)
+
+    def layout(size: int) -> Tuple[TextLayout, bool]:
+        font = font_for_size(size)
+        lines = wrap_text(text, font, max_width)
+        return TextLayout(lines, font), len(lines) <= max_lines_for_height(font, max_height)
+
+    # Fast path: the preferred size usually fits
+    best, fits = layout(candidates[0])
+    if fits:
+        return best
+
+    low, high = 1, len(candidates) - 1
+    found = None
+    while low <= high:
+        middle = (low + high) // 2
+        result, fits = layout(candidates[middle])
+        if fits:
+            found = result
+            high = middle - 1
+        else:
+            low = middle + 1
+    if found:
+        return found
+
+    smallest, _ = layout(candidates[-1])
+    max_lines = max_lines_for_height(smallest.font, max_height)
+    return TextLayout(truncate_lines(smallest.lines, max_lines, smallest.font, max_width), smallest.font)